@@ -0,0 +1 @@
+"""Shared data-processing helpers for the SBD (School-Based Distribution) dashboards."""
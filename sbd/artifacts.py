@@ -0,0 +1,152 @@
+"""Chart PNGs saved on disk by dataset version and chart id.
+
+Each dataset version has its own folder under ARTIFACT_DIR, so sessions
+showing different workbooks never overwrite each other's charts. A PNG is
+written to a temporary file in the same folder and renamed into place, so a
+reader never sees half a file, and it is not written at all when the same
+bytes are already there. The dashboard queues its writes on a background
+thread, off the rendering path, and reads a chart back instead of drawing
+it again, also in a new server process, so charts rendered ahead of time by
+``sbd.warmup`` are served straight away. The version folder also depends on
+the sbd sources and on the shapefile and name index the maps are drawn
+from, so charts drawn by other code or before a hand correction are never
+read back; ``prune_artifacts`` deletes the folders no longer used.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from sbd.report import ASSET_DIR
+
+# Folder holding one sub-folder of chart PNGs per dataset version
+ARTIFACT_DIR = os.path.join(ASSET_DIR, "artifacts")
+
+# Dataset folders kept by prune_artifacts, the most recently used ones
+MAX_DATASET_FOLDERS = 20
+
+# Single writer thread shared by every session of the server process
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sbd-artifacts")
+
+
+def _code_version():
+    """Short hash of the sbd package sources"""
+    digest = hashlib.md5()
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(package_dir)):
+        if name.endswith(".py"):
+            with open(os.path.join(package_dir, name), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+# Version of the code drawing the charts, part of every dataset folder name
+CODE_VERSION = _code_version()
+
+
+# Shapefile the maps are drawn from; it is only ever replaced, so its modification time versions it
+SHAPEFILE_INPUTS = [os.path.join(ASSET_DIR, name) for name in ["Chiefdom2021.shp", "Chiefdom2021.shx", "Chiefdom2021.dbf"]]
+
+# Name lookup of the maps; rewritten whenever new names are matched, so only its contents version it
+NAME_INDEX_INPUT = os.path.join(ASSET_DIR, "name_index.csv")
+
+
+def _inputs_version():
+    """Modification time and size of each shapefile file and a hash of the name index, None for a missing file"""
+    versions = []
+    for path in SHAPEFILE_INPUTS:
+        try:
+            stat = os.stat(path)
+            versions.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            versions.append(None)
+    try:
+        with open(NAME_INDEX_INPUT, 'rb') as f:
+            versions.append(hashlib.md5(f.read()).hexdigest())
+    except OSError:
+        versions.append(None)
+    return tuple(versions)
+
+
+def dataset_folder(dataset_key):
+    """Folder name of a dataset version, a short hash of its cache key, the code and the map inputs"""
+    return hashlib.md5(repr((CODE_VERSION, _inputs_version(), dataset_key)).encode()).hexdigest()[:12]
+
+
+def artifact_path(dataset_key, chart_id, root=ARTIFACT_DIR):
+    """Path of the PNG of ``chart_id``, its file name prefix, for a dataset version"""
+    return os.path.join(root, dataset_folder(dataset_key), f"{chart_id}.png")
+
+
+def read_artifact(dataset_key, chart_id, root=ARTIFACT_DIR):
+    """The saved PNG bytes of a chart for a dataset version, or None if it is not saved yet"""
+    path = artifact_path(dataset_key, chart_id, root)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    try:
+        # Mark the folder as used, so prune_artifacts keeps it
+        os.utime(os.path.dirname(path))
+    except OSError:
+        pass
+    return data
+
+
+def _same_bytes(path, data):
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, 'rb') as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+def write_atomic(path, data):
+    """Write ``data`` to ``path`` through a renamed temporary file
+
+    Returns False without writing when ``path`` already holds ``data``.
+    """
+    if _same_bytes(path, data):
+        return False
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return True
+
+
+def save_artifact(dataset_key, chart_id, data, root=ARTIFACT_DIR):
+    """Queue the PNG bytes of a chart to be written and return the write's future"""
+    return _EXECUTOR.submit(write_atomic, artifact_path(dataset_key, chart_id, root), data)
+
+
+def wait_for_artifacts():
+    """Wait until every write queued so far is done; the single writer thread runs them in order"""
+    _EXECUTOR.submit(lambda: None).result()
+
+
+def prune_artifacts(keep=MAX_DATASET_FOLDERS, root=ARTIFACT_DIR):
+    """Delete all but the ``keep`` most recently used dataset folders and return how many were deleted
+
+    Folders of replaced workbooks, older code or older map inputs are never
+    read again.
+    """
+    try:
+        folders = [entry for entry in os.scandir(root) if entry.is_dir()]
+    except OSError:
+        return 0
+    folders.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in folders[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+    return len(folders[keep:])
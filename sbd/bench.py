@@ -0,0 +1,236 @@
+"""Benchmark of the ingestion -> summary -> render pipeline.
+
+Generates synthetic SBD workbooks in the real column layout and times every
+stage of the dashboard pipeline separately:
+
+    python -m sbd.bench --sizes 1000 10000 100000 1000000
+
+Workbooks are cached under ``bench_data/`` so repeat runs only time the
+pipeline. One JSON line per stage is appended to ``bench_results.jsonl``,
+tagged with the git commit, so results can be compared between versions.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+
+from sbd import charts
+from sbd.cli import DEFAULT_SHAPEFILE
+from sbd.extract import build_extracted, iter_sheet_batches, parse_gps
+from sbd.figures import MAP_DISTRICTS
+from sbd.maps import district_map, overall_map
+from sbd.names import shapefile_names
+from sbd.report import ASSET_DIR, build_word_report, excel_bytes
+from sbd.schema import CLASSES, SCHEMAS, resolve_schema
+from sbd.summaries import chiefdom_analysis, district_analysis, generate_summaries
+from sbd.snapshots import TIMESTAMP_FORMAT
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+DATA_DIR = "bench_data"
+RESULTS_FILE = "bench_results.jsonl"
+
+# Districts, chiefdoms and approximate centre coordinates used for synthetic schools
+DISTRICTS = {
+    "Bo": ((7.95, -11.73), ["Kakua", "Bo City", "Jaiama", "Tinkoko", "Valunia", "Bargbo", "Bumpeh", "Lugbu",
+                            "Selenga", "Baoma", "Niawa Lenga", "Bagbwe", "Bongor", "Wonde", "Gbo", "Komboya", "Badjia"]),
+    "Bombali": ((8.89, -12.05), ["Gbanti (Bombali)", "Bombali Sebora", "Makarie", "Makeni City", "Biriwa", "Kamaranka",
+                                 "Safroko Limba", "Ngowahun", "Paki Masabong", "Mara", "Bombali Serry", "Gbendembu",
+                                 "Magbaimba Ndohahun"]),
+}
+
+
+def synthetic_workbook(rows, seed=0):
+    """Build a synthetic SBD export with the v3 form column layout"""
+    rng = np.random.default_rng(seed)
+    spec = SCHEMAS['v3']
+
+    district_names = list(DISTRICTS)
+    district_idx = rng.integers(0, len(district_names), rows)
+    districts = np.array(district_names)[district_idx]
+    chiefdoms = np.empty(rows, dtype=object)
+    for i, district in enumerate(district_names):
+        in_district = district_idx == i
+        chiefdoms[in_district] = rng.choice(DISTRICTS[district][1], in_district.sum())
+    school_ids = pd.Series(np.arange(rows)).astype(str)
+
+    qr_text = (
+        "District: " + pd.Series(districts) +
+        "\nChiefdom: " + pd.Series(chiefdoms) +
+        "\nPHU name: PHU " + (pd.Series(np.arange(rows)) % 500).astype(str) +
+        "\nCommunity name: Community " + (pd.Series(np.arange(rows)) % 2000).astype(str) +
+        "\nName of school: School " + school_ids +
+        "\nEnrollment: 0"
+    )
+
+    created = pd.Timestamp("2025-07-01 08:00") + pd.to_timedelta(rng.integers(0, 14 * 24 * 60, rows), unit='min')
+    df = pd.DataFrame({
+        'Submission Id': "SBD" + school_ids.str.zfill(8),
+        'Owner': pd.Series(chiefdoms),
+        'Created At': created.strftime(TIMESTAMP_FORMAT),
+        'Last Updated At': created.strftime(TIMESTAMP_FORMAT),
+        'Scan QR code': qr_text,
+        'School ownership': np.where(rng.random(rows) < 0.87, "Public", "Private"),
+        'Number of ITNs received in the school': 0,
+    })
+
+    received_total = np.zeros(rows, dtype='int64')
+    for class_num in CLASSES:
+        boys = rng.integers(0, 40, rows)
+        girls = rng.integers(0, 40, rows)
+        boys_received = boys - rng.binomial(boys, 0.05)
+        girls_received = girls - rng.binomial(girls, 0.05)
+        received_total += boys_received + girls_received
+        df[f"Class {class_num}"] = f"Class {class_num}"
+        df[spec['enrollment'].format(n=class_num)] = boys + girls
+        df[f"How many boys are in Class {class_num}?"] = boys
+        df[spec['boys'].format(n=class_num)] = boys_received
+        df[f"How many girls are in Class {class_num}?"] = girls
+        df[spec['girls'].format(n=class_num)] = girls_received
+
+    df['Number of ITNs received in the school'] = received_total
+    df['Total ITNs distributed'] = received_total
+    df[spec['left']] = 0
+    df['ITNs remaining'] = 0
+    df['ITNs taken to the PHU'] = 0
+
+    centres = np.array([DISTRICTS[d][0] for d in district_names])[district_idx]
+    lat = centres[:, 0] + rng.normal(0, 0.15, rows)
+    lon = centres[:, 1] + rng.normal(0, 0.15, rows)
+    df['GPS Location'] = pd.Series(lat).round(7).astype(str) + "," + pd.Series(lon).round(7).astype(str)
+    return df
+
+
+def workbook_path(rows, data_dir=DATA_DIR):
+    """Create the synthetic workbook for a size if it is not cached yet and return its path"""
+    path = os.path.join(data_dir, f"sbd_synthetic_{rows}.xlsx")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        synthetic_workbook(rows).to_excel(path, index=False)
+    return path
+
+
+@contextmanager
+def timed(results, stage):
+    """Record the wall time of the enclosed block under ``stage``"""
+    start = time.perf_counter()
+    yield
+    results.append({'stage': stage, 'seconds': round(time.perf_counter() - start, 4)})
+
+
+def run_pipeline(path, gdf=None, workdir="."):
+    """Run the dashboard pipeline on one workbook and return the per-stage timings"""
+    results = []
+    figures = {}
+
+    # The dashboard streams both at once in read_workbook; timed apart here
+    with timed(results, 'read_excel'):
+        batches = iter_sheet_batches(path)
+        next(batches)  # header-only frame
+        df_original = pd.concat(list(batches), ignore_index=True)
+
+    with timed(results, 'qr_extraction'):
+        extracted_df = build_extracted(df_original, resolve_schema(df_original.columns))
+
+    with timed(results, 'gps_parsing'):
+        gps_coords = parse_gps(extracted_df["GPS Location"])
+        valid_coords = gps_coords[gps_coords["valid"]]
+
+    with timed(results, 'generate_summaries'):
+        summaries = generate_summaries(extracted_df)
+        district_df = district_analysis(extracted_df)
+
+    if gdf is not None:
+        # Matched from scratch into a name index of this workbook's own, as on its first upload
+        with timed(results, 'name_matching'):
+            index_path = os.path.join(workdir, f"name_index_{os.path.basename(path)}.csv")
+            districts = shapefile_names(extracted_df, gdf, index_path)['District']
+
+        with timed(results, 'render_maps'):
+            figures['sierra_leone_overall'] = overall_map(gdf, valid_coords)
+            for district, key in MAP_DISTRICTS:
+                district_gdf = gdf[gdf['FIRST_DNAM'] == district]
+                if len(district_gdf) > 0:
+                    district_coords = valid_coords[districts.loc[valid_coords.index] == district]
+                    figures[key] = district_map(district_gdf, district, district_coords)
+
+    with timed(results, 'render_charts'):
+        figures['gender_overall'] = charts.gender_pie(summaries['overall'])
+        figures['gender_district'] = charts.gender_by_district(summaries['district'])
+        figures['enhanced_enrollment_analysis'] = charts.enrollment_analysis(district_df)
+        figures['overall_distribution_pie'] = charts.distribution_pie(district_df)
+        figures['enrollment_pie'] = charts.district_share_pie(
+            district_df, 'Total_Enrollment', 'Total Enrollment Distribution by District', charts.ENROLLMENT_PIE_COLORS)
+        figures['itn_pie'] = charts.district_share_pie(
+            district_df, 'Total_ITN', 'Total ITN Distribution by District', charts.ITN_PIE_COLORS)
+        for district in district_df['District']:
+            district_chiefdom_df = chiefdom_analysis(extracted_df[extracted_df['District'] == district])
+            for chart in charts.CHIEFDOM_CHARTS:
+                figures[f'{district}_{chart}'] = charts.chiefdom_bars(district, district_chiefdom_df, chart)
+
+    map_images = {}
+    with timed(results, 'save_map_as_png'):
+        for key, fig in figures.items():
+            map_images[key] = charts.save_map_as_png(fig, os.path.join(workdir, key))
+
+    with timed(results, 'word_report'):
+        build_word_report(summaries, map_images, datetime.now())
+
+    with timed(results, 'excel_export'):
+        excel_bytes(extracted_df)
+
+    return results
+
+
+def git_commit():
+    """Short commit hash of the working tree, or None outside a git checkout"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ASSET_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the SBD pipeline on synthetic workbooks.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="workbook row counts to benchmark")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="folder for the cached synthetic workbooks")
+    parser.add_argument('--output', default=RESULTS_FILE, help="JSON lines file the results are appended to")
+    parser.add_argument('--shapefile', default=DEFAULT_SHAPEFILE, help="chiefdom shapefile for the maps; pass '' to skip maps")
+    args = parser.parse_args(argv)
+
+    gdf = None
+    if args.shapefile:
+        import geopandas as gpd
+        gdf = gpd.read_file(args.shapefile)
+
+    run = {
+        'run_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+    }
+
+    with open(args.output, 'a') as out, tempfile.TemporaryDirectory() as workdir:
+        for rows in args.sizes:
+            path = workbook_path(rows, args.data_dir)
+            for result in run_pipeline(path, gdf, workdir):
+                record = {**run, 'rows': rows, **result}
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                print(f"{rows:>9,} rows  {result['stage']:<20} {result['seconds']:>10.3f}s")
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
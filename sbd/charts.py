@@ -0,0 +1,219 @@
+"""Matplotlib charts shared by the dashboard, the Word report and the batch CLI.
+
+Each function returns a finished figure; displaying or saving it is left to
+the caller. Figures are built on their own Agg canvas rather than through
+pyplot, so they share no global state, need no closing and can be drawn by
+several sessions at once. Matplotlib is only imported when the first figure
+is built.
+"""
+import numpy as np
+from io import BytesIO
+
+from sbd.artifacts import write_atomic
+
+# Chiefdom bar charts drawn for every district: measure, title, x label, colours
+CHIEFDOM_CHARTS = {
+    'enrollment': ('Total_Enrollment', 'Total Enrollment by Chiefdom', 'Number of Students', '#4682B4', 'navy'),
+    'itn': ('Total_ITN', 'Total ITN Distributed by Chiefdom', 'Number of ITNs', '#32CD32', 'darkgreen'),
+    'coverage': ('Coverage', 'ITN Coverage by Chiefdom (%)', 'Coverage Percentage (%)', '#FF8C00', 'darkorange'),
+}
+
+# Colour ramps for the district share pie charts
+ENROLLMENT_PIE_COLORS = ['#87CEEB', '#4682B4', '#1E90FF', '#0000CD', '#000080']
+ITN_PIE_COLORS = ['#90EE90', '#32CD32', '#228B22', '#006400', '#004000']
+
+
+def new_figure(figsize):
+    """A figure and its axes on an Agg canvas of their own, outside pyplot's figure list"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def figure_png(fig):
+    """The PNG bytes of a figure at report resolution"""
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png', dpi=300, bbox_inches='tight', facecolor='white', edgecolor='none')
+    return buffer.getvalue()
+
+
+def save_map_as_png(fig, filename_prefix):
+    """Save matplotlib figure as PNG and return BytesIO object
+
+    The figure is rendered once; the same bytes are written to disk, unless
+    that file already holds them.
+    """
+    png = figure_png(fig)
+    write_atomic(f"{filename_prefix}.png", png)
+    return BytesIO(png)
+
+
+def _set_text(texts, **properties):
+    """Set the same properties on every text artist, like ``matplotlib.artist.setp``"""
+    for text in texts:
+        text.set(**properties)
+
+
+def _label_bars(ax, bars, fontsize, positive_only=False):
+    """Write the value above each vertical bar"""
+    for bar in bars:
+        height = bar.get_height()
+        if positive_only and height <= 0:
+            continue
+        ax.annotate(f'{int(height):,}',
+                    xy=(bar.get_x() + bar.get_width() / 2, height),
+                    xytext=(0, 3),
+                    textcoords="offset points",
+                    ha='center', va='bottom', fontsize=fontsize, fontweight='bold')
+
+
+def gender_pie(overall_summary):
+    """Overall gender distribution pie chart"""
+    fig, ax = new_figure((10, 8))
+    labels = ['Boys', 'Girls']
+    sizes = [overall_summary['total_boys'], overall_summary['total_girls']]
+    colors = ['#4A90E2', '#F39C12']
+
+    wedges, texts, autotexts = ax.pie(sizes, labels=labels, autopct='%1.1f%%',
+                                      colors=colors, startangle=90)
+    ax.set_title('Overall Gender Distribution', fontsize=16, fontweight='bold', pad=20)
+    _set_text(autotexts, size=14, weight="bold")
+    _set_text(texts, size=12, weight="bold")
+    fig.tight_layout()
+    return fig
+
+
+def gender_by_district(district_summary):
+    """Grouped bar chart of boys and girls by district"""
+    districts = [d['district'] for d in district_summary]
+    boys_counts = [d['boys'] for d in district_summary]
+    girls_counts = [d['girls'] for d in district_summary]
+
+    fig, ax = new_figure((14, 8))
+    x = np.arange(len(districts))
+    width = 0.35
+
+    bars1 = ax.bar(x - width/2, boys_counts, width, label='Boys', color='#4A90E2', edgecolor='navy', linewidth=1)
+    bars2 = ax.bar(x + width/2, girls_counts, width, label='Girls', color='#F39C12', edgecolor='darkorange', linewidth=1)
+
+    ax.set_title('Gender Distribution by District', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel('Districts', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Number of Students', fontsize=12, fontweight='bold')
+    ax.set_xticks(x)
+    ax.set_xticklabels(districts, rotation=45, ha='right')
+    ax.legend(fontsize=12)
+    ax.grid(axis='y', alpha=0.3, linestyle='--')
+
+    # Add value labels on bars
+    _label_bars(ax, bars1, 10)
+    _label_bars(ax, bars2, 10)
+
+    fig.tight_layout()
+    return fig
+
+
+def enrollment_analysis(district_df):
+    """Enrollment vs distributed vs remaining ITNs by district"""
+    fig, ax = new_figure((16, 8))
+
+    x = np.arange(len(district_df['District']))
+    width = 0.25
+
+    # Create bars for each category
+    bars1 = ax.bar(x - width, district_df['Total_Enrollment'], width,
+                   label='Total Enrollment', color='#47B5FF', edgecolor='navy', linewidth=1)
+    bars2 = ax.bar(x, district_df['Total_ITN'], width,
+                   label='ITNs Distributed (Boys + Girls)', color='lightcoral', edgecolor='darkred', linewidth=1)
+    bars3 = ax.bar(x + width, district_df['ITN_Remaining'], width,
+                   label='ITNs Remaining', color='hotpink', edgecolor='darkmagenta', linewidth=1)
+
+    # Customize the chart
+    ax.set_title('District Analysis: Enrollment vs ITN Distribution', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel('Districts', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Number of Students/ITNs', fontsize=12, fontweight='bold')
+    ax.set_xticks(x)
+    ax.set_xticklabels(district_df['District'], rotation=45, ha='right')
+    ax.legend(fontsize=12)
+    ax.grid(axis='y', alpha=0.3, linestyle='--')
+
+    # Add value labels on bars, only positive remaining values
+    _label_bars(ax, bars1, 9)
+    _label_bars(ax, bars2, 9)
+    _label_bars(ax, bars3, 9, positive_only=True)
+
+    fig.tight_layout()
+    return fig
+
+
+def distribution_pie(district_df):
+    """Overall ITNs distributed vs remaining pie chart"""
+    overall_enrollment = district_df['Total_Enrollment'].sum()
+    overall_distributed = district_df['Total_ITN'].sum()
+    overall_remaining = district_df['ITN_Remaining'].sum()
+
+    fig, ax = new_figure((10, 8))
+
+    sizes = [overall_distributed, overall_remaining]
+    labels = [f'ITNs Distributed\n({overall_distributed:,})', f'ITNs Remaining\n({overall_remaining:,})']
+    colors = ['lightcoral', 'hotpink']
+    explode = (0.05, 0)  # Slightly separate the distributed slice
+
+    wedges, texts, autotexts = ax.pie(sizes, labels=labels, autopct='%1.1f%%',
+                                      colors=colors, startangle=90, explode=explode)
+    ax.set_title(f'Overall ITN Distribution Status\nTotal Enrollment: {overall_enrollment:,}',
+                 fontsize=16, fontweight='bold', pad=20)
+
+    # Enhance text styling
+    _set_text(autotexts, size=12, weight="bold", color='white')
+    _set_text(texts, size=11, weight="bold")
+
+    fig.tight_layout()
+    return fig
+
+
+def district_share_pie(district_df, column, title, colors):
+    """Pie chart of each district's share of a measure, skipping zero districts"""
+    data = district_df[district_df[column] > 0]
+
+    fig, ax = new_figure((10, 8))
+    wedges, texts, autotexts = ax.pie(data[column],
+                                      labels=data['District'],
+                                      autopct='%1.1f%%',
+                                      colors=colors[:len(data)],
+                                      startangle=90)
+    ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+    _set_text(autotexts, size=12, weight="bold")
+    _set_text(texts, size=11, weight="bold")
+    fig.tight_layout()
+    return fig
+
+
+def chiefdom_bars(district, district_chiefdom_df, chart):
+    """Horizontal bar chart of one measure across a district's chiefdoms"""
+    column, title, xlabel, color, edgecolor = CHIEFDOM_CHARTS[chart]
+    values = district_chiefdom_df[column]
+
+    fig, ax = new_figure((16, 10))
+    ax.barh(district_chiefdom_df['Chiefdom'], values,
+            color=color, edgecolor=edgecolor, linewidth=1.5)
+    ax.set_title(f'{district} District - {title}', fontsize=18, fontweight='bold', pad=20)
+    ax.set_xlabel(xlabel, fontsize=14, fontweight='bold')
+    ax.set_ylabel('Chiefdoms', fontsize=14, fontweight='bold')
+
+    # Add value labels
+    for i, v in enumerate(values):
+        if v > 0:  # Only show label if value is greater than 0
+            label = f'{v:.1f}%' if chart == 'coverage' else f'{int(v):,}'
+            ax.text(v + max(values) * 0.02, i,
+                    label, va='center', fontweight='bold', fontsize=12)
+
+    # Customize appearance
+    ax.grid(axis='x', alpha=0.3, linestyle='--')
+    ax.tick_params(axis='both', which='major', labelsize=11)
+    if chart == 'coverage':
+        ax.set_xlim(0, max(values) * 1.15)  # Add some space for labels
+    fig.tight_layout()
+    return fig
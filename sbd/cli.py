@@ -0,0 +1,104 @@
+"""Headless batch generation of the SBD report, exports and charts.
+
+Runs the same extraction, summary and chart code as the dashboard without
+Streamlit, one worker process per workbook:
+
+    python -m sbd.cli "sbd_1019.xlsx" "Sbd_1080.xlsx" --output-dir reports --jobs 4
+
+Each workbook gets its own folder under the output directory with the
+extracted CSV/XLSX, the summary CSVs, every chart as PNG and the Word report.
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')
+import pandas as pd
+
+from sbd.charts import save_map_as_png
+from sbd.extract import load_workbook
+from sbd.figures import chart_specs
+from sbd.maps import add_label_points, district_boundaries
+from sbd.names import shapefile_names
+from sbd.report import ASSET_DIR, build_word_report, excel_bytes
+from sbd.summaries import district_analysis, generate_summaries
+
+DEFAULT_SHAPEFILE = os.path.join(ASSET_DIR, "Chiefdom2021.shp")
+
+
+def render_charts(extracted_df, summaries, gdf, target):
+    """Render every dashboard chart and map into ``target`` and return the PNG buffers by key"""
+    boundaries, districts = None, None
+    if gdf is not None:
+        boundaries = district_boundaries(gdf)
+        districts = shapefile_names(extracted_df, gdf)['District']
+    specs = chart_specs(extracted_df, summaries, district_analysis(extracted_df), gdf, boundaries, districts)
+
+    map_images = {}
+    for key, (filename_prefix, build) in specs.items():
+        fig = build()
+        map_images[key] = save_map_as_png(fig, os.path.join(target, filename_prefix))
+    return map_images
+
+
+def generate_artifacts(workbook, output_dir, shapefile=DEFAULT_SHAPEFILE):
+    """Generate every artifact for one workbook and return its output folder"""
+    name = os.path.splitext(os.path.basename(workbook))[0]
+    target = os.path.join(output_dir, name)
+    os.makedirs(target, exist_ok=True)
+
+    extracted_df, _ = load_workbook(workbook)
+    summaries = generate_summaries(extracted_df)
+
+    # Data exports
+    extracted_df.to_csv(os.path.join(target, "complete_extracted_data.csv"), index=False)
+    with open(os.path.join(target, "complete_extracted_data.xlsx"), 'wb') as f:
+        f.write(excel_bytes(extracted_df))
+    pd.DataFrame(summaries['district']).to_csv(os.path.join(target, "district_summary.csv"), index=False)
+    pd.DataFrame(summaries['chiefdom']).to_csv(os.path.join(target, "chiefdom_summary.csv"), index=False)
+
+    # Charts, maps and the Word report
+    gdf = None
+    if shapefile:
+        import geopandas as gpd
+        gdf = add_label_points(gpd.read_file(shapefile))
+    map_images = render_charts(extracted_df, summaries, gdf, target)
+
+    current_datetime = datetime.now()
+    report_name = f"SBD_Complete_Report_Maps_Summaries_{current_datetime.strftime('%Y%m%d_%H%M')}.docx"
+    with open(os.path.join(target, report_name), 'wb') as f:
+        f.write(build_word_report(summaries, map_images, current_datetime))
+
+    return target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate SBD reports, exports and charts without the dashboard.")
+    parser.add_argument('workbooks', nargs='+', help="SBD workbook exports (.xlsx)")
+    parser.add_argument('--output-dir', default="reports", help="folder for the generated artifacts (default: reports)")
+    parser.add_argument('--shapefile', default=DEFAULT_SHAPEFILE, help="chiefdom shapefile for the maps; pass '' to skip maps")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="number of worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=min(args.jobs, len(args.workbooks))) as pool:
+        futures = {
+            pool.submit(generate_artifacts, workbook, args.output_dir, args.shapefile): workbook
+            for workbook in args.workbooks
+        }
+        for future in as_completed(futures):
+            workbook = futures[future]
+            try:
+                print(f"{workbook}: {future.result()}")
+            except Exception as e:
+                failures += 1
+                print(f"{workbook}: failed - {e}", file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""Detection of schools submitted more than once.
+
+Repeated QR scans and overlapping snapshots can submit the same school
+several times. Candidate pairs are only generated inside small blocks, the
+same GPS grid cell or, without GPS, the same chiefdom and community, and
+all scored in one rapidfuzz batch, so the cost grows with the block sizes
+rather than with all pairs of schools. Pairs with similar school and
+community names that are also close together, or lack GPS, are linked, and
+every linked group becomes one canonical school.
+"""
+import numpy as np
+import pandas as pd
+
+from sbd.extract import parse_gps
+from sbd.snapshots import TIMESTAMP_FORMAT
+from sbd.spatial import normalize_names
+
+# Lowest rapidfuzz token_sort_ratio for two school or community names to be the same
+NAME_SCORE = 90
+
+# Furthest apart two submissions of the same school can be, in metres
+DUPLICATE_DISTANCE_M = 100
+
+# GPS blocking cell, twice the duplicate distance so shifted grids catch every close pair
+BLOCK_CELL_DEG = 2 * DUPLICATE_DISTANCE_M / 111000
+
+# Columns of the canonical school table
+CANONICAL_COLUMNS = ['school_id', 'District', 'Chiefdom', 'Community Name', 'School Name', 'GPS Location',
+                     'enrollment', 'itn', 'submissions', 'Submission Ids']
+
+
+def _name_keys(names):
+    """Upper case names with punctuation as spaces; unlike ``normalize_names``
+    parenthesised school codes are kept, since they tell schools apart"""
+    return (names.astype('string').str.upper()
+            .str.replace(r"[^A-Z0-9]+", " ", regex=True)
+            .str.strip().fillna('').to_numpy(dtype=object))
+
+
+def _trailing_numbers(names):
+    """The number or Roman numeral ending each name key, or '' if it has none"""
+    return (pd.Series(names, dtype='string').str.extract(r"(\d+|\b[IVXLC]+)$", expand=False)
+            .fillna('').to_numpy(dtype=object))
+
+
+def _block_pairs(blocks):
+    """Every pair of row positions that share a block
+
+    ``blocks`` is one block key per row, or a list of key arrays; rows with
+    a missing key are in no block.
+    """
+    keys = pd.DataFrame(dict(enumerate(blocks)) if isinstance(blocks, list) else {0: blocks})
+    codes = keys.groupby(list(keys.columns), sort=False, dropna=False).ngroup().to_numpy(copy=True)
+    codes[keys.isna().any(axis=1).to_numpy()] = -1
+
+    # Rows sorted by block; rows d places apart in the same block form the pairs at distance d
+    order = np.argsort(codes, kind='stable')
+    order = order[codes[order] >= 0]
+    sorted_codes = codes[order]
+    firsts, seconds = [np.empty(0, dtype='int64')], [np.empty(0, dtype='int64')]
+    for d in range(1, len(order)):
+        same = sorted_codes[d:] == sorted_codes[:-d]
+        if not same.any():
+            break
+        firsts.append(order[:-d][same])
+        seconds.append(order[d:][same])
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+def _similar(names, first, second):
+    """Whether the names of each pair are similar, scored in one batch; empty names are never similar"""
+    from rapidfuzz import fuzz, process
+
+    if len(first) == 0:
+        return np.zeros(0, dtype=bool)
+    scores = process.cpdist(names[first], names[second], scorer=fuzz.token_sort_ratio, workers=-1)
+    return (scores >= NAME_SCORE) & (names[first] != '') & (names[second] != '')
+
+
+def _similar_pairs(names, blocks):
+    """Pairs of row positions in the same block whose names are similar"""
+    first, second = _block_pairs(blocks)
+    similar = _similar(names, first, second)
+    return first[similar], second[similar]
+
+
+def _distance_m(lat1, lon1, lat2, lon2):
+    """Haversine distance in metres between coordinate arrays"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371000 * np.arcsin(np.sqrt(a))
+
+
+def _components(n, first, second):
+    """Connected component label of each of ``n`` nodes, the smallest node of its component"""
+    labels = np.arange(n)
+    while True:
+        linked = np.minimum(labels[first], labels[second])
+        updated = labels.copy()
+        np.minimum.at(updated, first, linked)
+        np.minimum.at(updated, second, linked)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def find_duplicates(df):
+    """Canonical school id of every submission, aligned to ``df``
+
+    Two submissions are the same school when their school and community
+    names are similar, any number ending their school names is the same,
+    and their GPS points are at most DUPLICATE_DISTANCE_M apart, or one of
+    them has no valid GPS and both are in the same community of the same
+    chiefdom. Empty names never match. Ids are 0..n-1 in order of first submission.
+    """
+    n = len(df)
+    if n == 0:
+        return pd.Series(np.empty(0, dtype='int64'), index=df.index, name='school_id')
+
+    school_names = _name_keys(df['School Name'])
+    community_names = _name_keys(df['Community Name'])
+    # Rows missing any part of the block, such as failed QR parses, are in no block
+    block_parts = [normalize_names(df[column]).fillna('') for column in ['District', 'Chiefdom', 'Community Name']]
+    complete = np.logical_and.reduce([(part != '').to_numpy(dtype=bool) for part in block_parts])
+    community_block = (block_parts[0] + "|" + block_parts[1] + "|" + block_parts[2]).to_numpy(dtype=object)
+    community_block = np.where(complete, community_block, None)
+
+    if "GPS Location" in df.columns:
+        coords = parse_gps(df["GPS Location"]).reset_index(drop=True)
+    else:
+        coords = pd.DataFrame({'lat': np.nan, 'lon': np.nan, 'valid': False}, index=range(n))
+    lat = coords['lat'].to_numpy(dtype=float)
+    lon = coords['lon'].to_numpy(dtype=float)
+    valid = coords['valid'].to_numpy(dtype=bool)
+
+    # Without GPS on one side: the same community of the same chiefdom
+    has_missing_gps = pd.Series(~valid).groupby(community_block, dropna=False).transform('any').to_numpy(dtype=bool)
+    first, second = _similar_pairs(school_names, np.where(has_missing_gps, community_block, None))
+    no_gps = ~(valid[first] & valid[second])
+    pairs = [(first[no_gps], second[no_gps])]
+
+    # With GPS: the same grid cell, whatever the names' spelling; four shifted grids catch pairs across cell edges
+    for shift_lat, shift_lon in [(0, 0), (0.5, 0), (0, 0.5), (0.5, 0.5)]:
+        # Rows without valid GPS have NaN cells and are left out of the blocks
+        cells = [np.floor(np.where(valid, lat, np.nan) / BLOCK_CELL_DEG + shift_lat),
+                 np.floor(np.where(valid, lon, np.nan) / BLOCK_CELL_DEG + shift_lon)]
+        cell_first, cell_second = _similar_pairs(school_names, cells)
+        close = _distance_m(lat[cell_first], lon[cell_first], lat[cell_second], lon[cell_second]) <= DUPLICATE_DISTANCE_M
+        pairs.append((cell_first[close], cell_second[close]))
+
+    # Schools of the same name in different communities are different schools, and so are
+    # numbered schools sharing a compound, "RC Primary School 1" and "2"
+    first, second = np.concatenate([p[0] for p in pairs]), np.concatenate([p[1] for p in pairs])
+    numbers = _trailing_numbers(school_names)
+    same_school = _similar(community_names, first, second) & (numbers[first] == numbers[second])
+    first, second = first[same_school], second[same_school]
+    labels = _components(n, first, second)
+    school_ids = pd.factorize(labels)[0]
+    return pd.Series(school_ids, index=df.index, name='school_id')
+
+
+def _latest_first(df):
+    """Row positions with the most recently updated submission first"""
+    if 'Last Updated At' in df.columns:
+        updated = pd.to_datetime(df['Last Updated At'], format=TIMESTAMP_FORMAT, errors='coerce').reset_index(drop=True)
+        return updated.sort_values(ascending=False, kind='stable', na_position='last').index.to_numpy()
+    return np.arange(len(df))[::-1]
+
+
+def deduplicate(df, school_ids=None):
+    """Keep only the most recently updated submission of each school"""
+    if school_ids is None:
+        school_ids = find_duplicates(df)
+    order = _latest_first(df)
+    keep = ~school_ids.iloc[order].duplicated().to_numpy()
+    return df.iloc[np.sort(order[keep])]
+
+
+def canonical_schools(df, school_ids=None):
+    """One row per school: its latest submission, the number of submissions and their ids"""
+    if school_ids is None:
+        school_ids = find_duplicates(df)
+    if len(df) == 0:
+        return pd.DataFrame(columns=CANONICAL_COLUMNS)
+
+    schools = deduplicate(df, school_ids).assign(school_id=school_ids)
+    groups = df.assign(school_id=school_ids).groupby('school_id')
+    schools = schools.join(groups.size().rename('submissions'), on='school_id')
+    if 'Submission Id' in df.columns:
+        schools = schools.join(groups['Submission Id'].agg(lambda ids: ", ".join(ids.astype(str))).rename('Submission Ids'),
+                               on='school_id')
+    columns = [column for column in CANONICAL_COLUMNS if column in schools.columns]
+    return schools[columns].sort_values('school_id').reset_index(drop=True)
@@ -0,0 +1,161 @@
+"""Extraction of administrative fields from the SBD QR code text."""
+import pandas as pd
+
+from sbd.schema import MEASURE_COLUMNS, add_measures, resolve_schema
+
+# Fields encoded in the school QR code, in display order
+QR_FIELDS = {
+    "District": r"District:\s*([^\n]+)",
+    "Chiefdom": r"Chiefdom:\s*([^\n]+)",
+    "PHU Name": r"PHU name:\s*([^\n]+)",
+    "Community Name": r"Community name:\s*([^\n]+)",
+    "School Name": r"Name of school:\s*([^\n]+)",
+}
+
+# Rows parsed at a time when streaming a workbook
+BATCH_ROWS = 20000
+
+# Raw rows kept from the start of a streamed workbook for display
+SAMPLE_ROWS = 5
+
+# Valid coordinate range for Sierra Leone
+LAT_RANGE = (6.0, 11.0)
+LON_RANGE = (-14.0, -10.0)
+
+
+def extract_qr_fields(qr_text, fields=QR_FIELDS):
+    """Extract the QR code fields from a column of QR text into a DataFrame"""
+    text = qr_text.dropna().astype(str)
+    extracted = pd.DataFrame(index=qr_text.index)
+    for name, pattern in fields.items():
+        values = text.str.extract(pattern, expand=False).str.strip()
+        extracted[name] = values.reindex(qr_text.index)
+    return extracted
+
+
+def build_extracted(df_original, schema, fields=QR_FIELDS, include_left=False):
+    """Build the extracted dataset: QR fields, the remaining columns and the canonical measures"""
+    extracted_df = extract_qr_fields(df_original[schema['qr_column']], fields)
+
+    # Add all other columns from the original DataFrame
+    other_columns = df_original.drop(columns=[schema['qr_column']])
+    extracted_df = pd.concat([extracted_df, other_columns], axis=1)
+
+    return add_measures(extracted_df, schema, include_left=include_left)
+
+
+def _column_names(header):
+    """Sheet header as DataFrame column names, named and de-duplicated the way ``pd.read_excel`` does"""
+    names, counts = [], {}
+    for i, name in enumerate(header):
+        name = f"Unnamed: {i}" if name is None else name
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        counts[name] = count + 1
+        names.append(name)
+    return names
+
+
+def _cell_value(value):
+    """Cell value as ``pd.read_excel`` passes it on: whole numbers as int"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _parse_rows(rows, columns):
+    """Rows of cell values as a DataFrame, with the type inference of ``pd.read_excel``"""
+    from pandas.io.parsers import TextParser
+
+    return TextParser(rows, names=columns, header=None).read()
+
+
+def iter_sheet_batches(source, batch_size=BATCH_ROWS):
+    """Yield the first sheet of a workbook as DataFrames of at most ``batch_size`` rows
+
+    The sheet is read in openpyxl's read-only mode, which parses the XML as
+    it goes, so only one batch of cell values is held at a time. Blank rows
+    are skipped. The first item is an empty frame with the header columns.
+    """
+    from openpyxl import load_workbook as open_workbook
+
+    book = open_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = book.worksheets[0].iter_rows(values_only=True)
+        columns = _column_names(next(rows, ()))
+        yield pd.DataFrame(columns=columns)
+
+        batch = []
+        for row in rows:
+            if any(value is not None for value in row):
+                batch.append([_cell_value(value) for value in row[:len(columns)]])
+            if len(batch) == batch_size:
+                yield _parse_rows(batch, columns)
+                batch = []
+        if batch:
+            yield _parse_rows(batch, columns)
+    finally:
+        book.close()
+
+
+def read_workbook(source, fields=QR_FIELDS, include_left=False, columns=None, batch_size=BATCH_ROWS, progress=None):
+    """Stream an SBD workbook in row batches and return ``(sample, extracted_df, schema)``
+
+    QR fields are extracted and the per-class counts coerced batch by batch,
+    and of the raw columns only ``columns`` (all when None) are kept, so
+    peak memory grows with the batch size and the kept columns rather than
+    with the whole sheet. ``sample`` holds the first raw rows of the sheet.
+    ``progress(rows)`` is called after each batch.
+    """
+    batches = iter_sheet_batches(source, batch_size)
+    header = next(batches)
+    schema = resolve_schema(header.columns)
+    keep = None
+    if columns is not None:
+        keep = list(fields) + [col for col in header.columns if col in columns] + MEASURE_COLUMNS
+
+    sample = header
+    parts = []
+    rows = 0
+    for batch in batches:
+        if rows == 0:
+            sample = batch.head(SAMPLE_ROWS).copy()
+        rows += len(batch)
+        part = build_extracted(batch, schema, fields, include_left)
+        parts.append(part if keep is None else part[keep])
+        if progress is not None:
+            progress(rows)
+
+    if not parts:
+        part = build_extracted(header, schema, fields, include_left)
+        parts.append(part if keep is None else part[keep])
+    # Columns that were empty in some batches are object typed until all batches are joined
+    extracted_df = pd.concat(parts, ignore_index=True).infer_objects()
+    return sample.infer_objects(), extracted_df, schema
+
+
+def load_workbook(path, fields=QR_FIELDS, include_left=False, columns=None):
+    """Read an SBD workbook and return the extracted dataset and its resolved schema"""
+    _, extracted_df, schema = read_workbook(path, fields, include_left, columns)
+    return extracted_df, schema
+
+
+def parse_gps(gps_location):
+    """Parse "lat,lon" GPS strings into lat/lon floats and a Sierra Leone validity flag
+
+    Entries that cannot be parsed get NaN coordinates; ``valid`` is only set
+    for coordinates inside the Sierra Leone bounding box.
+    """
+    text = gps_location.dropna().astype(str).str.strip()
+    parts = text.str.split(',')
+    pair = parts.str.len() == 2
+    coords = pd.DataFrame({
+        'lat': pd.to_numeric(parts.str[0].str.strip(), errors='coerce').where(pair),
+        'lon': pd.to_numeric(parts.str[1].str.strip(), errors='coerce').where(pair),
+    })
+    coords = coords.reindex(gps_location.index)
+    coords['valid'] = coords['lat'].between(*LAT_RANGE) & coords['lon'].between(*LON_RANGE)
+    return coords
@@ -0,0 +1,137 @@
+"""Registry of every chart and map shown in the dashboard and the Word report.
+
+``chart_specs`` lists each figure once with its report key, PNG file name
+and a builder, without drawing anything. The dashboard renders the figures
+of the section that is open, the Word report renders the rest on demand
+and the batch CLI renders them all. The map builders, and matplotlib with
+them, are only imported once map specs are listed.
+"""
+from functools import partial
+
+import pandas as pd
+
+from sbd.charts import (
+    CHIEFDOM_CHARTS, ENROLLMENT_PIE_COLORS, ITN_PIE_COLORS, chiefdom_bars, distribution_pie, district_share_pie,
+    enrollment_analysis, gender_by_district, gender_pie
+)
+from sbd.extract import parse_gps
+from sbd.spatial import MEASURE_LABELS
+from sbd.summaries import chiefdom_analysis
+
+# Districts that get their own map, with the report key used for each
+MAP_DISTRICTS = [("BO", 'bo_district'), ("BOMBALI", 'bombali_district')]
+
+# File name used for each chiefdom chart
+CHIEFDOM_CHART_FILES = {'enrollment': 'Enrollment', 'itn': 'ITN', 'coverage': 'Coverage'}
+
+
+def map_specs(extracted_df, gdf, boundaries=None, districts=None):
+    """Overall and district map specs; ``boundaries`` reuses a district dissolve
+
+    ``districts`` is each row's district in shapefile spelling, as returned
+    by ``sbd.names.shapefile_names``; the submitted District is used if not given.
+    """
+    from sbd.maps import district_map, overall_map
+
+    if districts is None:
+        districts = extracted_df["District"]
+    if "GPS Location" in extracted_df.columns:
+        gps_coords = parse_gps(extracted_df["GPS Location"])
+        valid_coords = gps_coords[gps_coords["valid"]]
+    else:
+        valid_coords = pd.DataFrame(columns=["lat", "lon", "valid"])
+
+    specs = {'sierra_leone_overall': ("Sierra_Leone_Overall_Map", partial(overall_map, gdf, valid_coords, boundaries))}
+    for district, key in MAP_DISTRICTS:
+        district_gdf = gdf[gdf['FIRST_DNAM'] == district]
+        if len(district_gdf) > 0:
+            district_coords = valid_coords[districts.loc[valid_coords.index] == district]
+            specs[key] = (f"{district}_District_Map", partial(district_map, district_gdf, district, district_coords))
+    return specs
+
+
+def overview_specs(gdf, cells, chiefdom_table, boundaries=None):
+    """Aggregated national overview specs, keyed ``overview_<grid|chiefdom>_<measure>``
+
+    ``cells`` and ``chiefdom_table`` come from ``sbd.spatial``.
+    """
+    from sbd.maps import chiefdom_overview_map, grid_overview_map
+
+    specs = {}
+    for measure in MEASURE_LABELS:
+        specs[f'overview_grid_{measure}'] = (f"Sierra_Leone_Grid_{measure}",
+                                             partial(grid_overview_map, gdf, cells, measure, boundaries))
+        specs[f'overview_chiefdom_{measure}'] = (f"Sierra_Leone_Chiefdom_{measure}",
+                                                 partial(chiefdom_overview_map, gdf, chiefdom_table, measure, boundaries))
+    return specs
+
+
+def choropleth_specs(joined, measure='coverage', boundaries=None):
+    """National and per-district chiefdom choropleths, all drawn from one joined GeoDataFrame
+
+    ``joined`` comes from ``sbd.spatial.join_chiefdom_metrics``; keys are
+    ``choropleth_<measure>`` and ``choropleth_<measure>_<DISTRICT>``.
+    """
+    from sbd.maps import chiefdom_overview_map, district_choropleth_map
+
+    specs = {f'choropleth_{measure}': (f"Sierra_Leone_Chiefdom_Choropleth_{measure}",
+                                       partial(chiefdom_overview_map, joined, joined, measure, boundaries))}
+    for district in sorted(joined['FIRST_DNAM'].dropna().unique()):
+        specs[f'choropleth_{measure}_{district}'] = (f"{district}_Chiefdom_Choropleth_{measure}",
+                                                     partial(district_choropleth_map, joined, district, measure))
+    return specs
+
+
+def summary_specs(summaries, district_df):
+    """Gender and district distribution chart specs"""
+    specs = {}
+    if summaries['overall']['total_boys'] + summaries['overall']['total_girls'] > 0:
+        specs['gender_overall'] = ("Overall_Gender_Distribution", partial(gender_pie, summaries['overall']))
+    specs['gender_district'] = ("Gender_Distribution_by_District", partial(gender_by_district, summaries['district']))
+    specs['enhanced_enrollment_analysis'] = ("Enhanced_Enrollment_Analysis", partial(enrollment_analysis, district_df))
+    if district_df['Total_Enrollment'].sum() > 0:
+        specs['overall_distribution_pie'] = ("Overall_Distribution_Pie", partial(distribution_pie, district_df))
+        specs['enrollment_pie'] = ("Enrollment_Distribution_Pie", partial(
+            district_share_pie, district_df, 'Total_Enrollment', 'Total Enrollment Distribution by District', ENROLLMENT_PIE_COLORS))
+    if district_df['Total_ITN'].sum() > 0:
+        specs['itn_pie'] = ("ITN_Distribution_Pie", partial(
+            district_share_pie, district_df, 'Total_ITN', 'Total ITN Distribution by District', ITN_PIE_COLORS))
+    return specs
+
+
+def chiefdom_specs(district, district_chiefdom_df):
+    """The enrollment, ITN and coverage chiefdom chart specs of one district"""
+    return {
+        f'{district}_{chart}': (f"{district}_{CHIEFDOM_CHART_FILES[chart]}_by_Chiefdom",
+                                partial(chiefdom_bars, district, district_chiefdom_df, chart))
+        for chart in CHIEFDOM_CHARTS
+    }
+
+
+def chart_specs(extracted_df, summaries, district_df, gdf=None, boundaries=None, districts=None):
+    """Every chart of the dashboard as report key -> (PNG file name, figure builder)"""
+    specs = {}
+    if gdf is not None:
+        specs.update(map_specs(extracted_df, gdf, boundaries, districts))
+    specs.update(summary_specs(summaries, district_df))
+    for district in extracted_df[extracted_df['Chiefdom'].notna()]['District'].unique():
+        district_chiefdom_df = chiefdom_analysis(extracted_df[extracted_df['District'] == district])
+        if len(district_chiefdom_df) > 0:
+            specs.update(chiefdom_specs(district, district_chiefdom_df))
+    return specs
+
+
+def dashboard_specs(extracted_df, summaries, district_df, gdf=None, boundaries=None, districts=None, aggregates=None,
+                    joined=None):
+    """Every chart the dashboard can show: ``chart_specs`` and the national overview and chiefdom choropleth maps
+
+    ``aggregates`` is the ``(cells, chiefdom_table)`` pair of the overview
+    maps and ``joined`` the GeoDataFrame of the coverage choropleths; the
+    maps of either are left out when it is not given.
+    """
+    specs = chart_specs(extracted_df, summaries, district_df, gdf, boundaries, districts)
+    if gdf is not None and aggregates is not None:
+        specs.update(overview_specs(gdf, *aggregates, boundaries))
+    if joined is not None:
+        specs.update(choropleth_specs(joined, 'coverage', boundaries))
+    return specs
@@ -0,0 +1,422 @@
+"""School location maps drawn over the Chiefdom2021 shapefile.
+
+The shapefile layers of the point and grid maps never change with the data,
+so they are rendered once per process to a raster the size of the map's
+axes, at a fixed extent, and pasted under the school points or grid cells
+each time a map is drawn.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+from matplotlib.artist import Artist
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+
+from sbd.charts import new_figure
+from sbd.spatial import MEASURE_LABELS
+
+# Padding around the district maps, in degrees
+DISTRICT_MARGIN = 0.05
+
+# Most base layer rasters kept in memory, one per layer, extent and output size
+MAX_BASE_LAYERS = 16
+
+# Rendered base layers by (layer, pixel size, view limits, dpi)
+_BASE_LAYERS = {}
+_BASE_LAYERS_LOCK = threading.Lock()
+
+# Columns holding each polygon's label point, stored with the geometry by ``add_label_points``
+LABEL_COLUMNS = ['label_x', 'label_y']
+
+# Most labels drawn on one map, whatever the number of polygons or schools
+MAX_LABELS = 60
+
+# Approximate label size for collision tests, as fractions of the font size: bold character width,
+# line height and the padding of the label box on each side
+CHAR_WIDTH = 0.62
+LINE_HEIGHT = 1.25
+LABEL_PAD = 0.4
+
+
+def label_points(gdf):
+    """One label point inside each polygon as (x, y) arrays, from the stored columns or one vectorized call"""
+    if all(column in gdf.columns for column in LABEL_COLUMNS):
+        return gdf['label_x'].to_numpy(dtype=float), gdf['label_y'].to_numpy(dtype=float)
+    points = gdf.geometry.representative_point()
+    return points.x.to_numpy(), points.y.to_numpy()
+
+
+def add_label_points(gdf):
+    """The GeoDataFrame with the label point of every polygon stored alongside its geometry"""
+    x, y = label_points(gdf.drop(columns=LABEL_COLUMNS, errors='ignore'))
+    return gdf.assign(label_x=x, label_y=y)
+
+
+def district_boundaries(gdf):
+    """District outlines, dissolved from the chiefdom polygons by FIRST_DNAM, with their label points"""
+    return add_label_points(gdf.drop(columns=LABEL_COLUMNS, errors='ignore').dissolve(by='FIRST_DNAM'))
+
+
+def cull_labels(ax, x, y, texts, fontsize, offset=(0, 0), ha='center', va='center', max_labels=MAX_LABELS):
+    """Positions of the labels that fit on the axes without overlapping, in the order given
+
+    Labels earlier in ``texts`` win collisions; each label's box is
+    estimated from its text and ``fontsize`` and placed like an annotation
+    at ``offset`` points from (x, y). The axes limits must already be set.
+    """
+    texts = [str(text) for text in texts]
+    if len(texts) == 0:
+        return []
+    ax.apply_aspect()
+    points = ax.transData.transform(np.column_stack([x, y]))
+    pixels = ax.figure.dpi / 72
+    lines = [text.split("\n") for text in texts]
+    pad = 2 * LABEL_PAD * fontsize * pixels
+    width = np.array([max(len(line) for line in text_lines) for text_lines in lines]) * CHAR_WIDTH * fontsize * pixels + pad
+    height = np.array([len(text_lines) for text_lines in lines]) * LINE_HEIGHT * fontsize * pixels + pad
+    x0 = points[:, 0] + offset[0] * pixels - width * {'left': 0, 'center': 0.5, 'right': 1}[ha]
+    y0 = points[:, 1] + offset[1] * pixels - height * {'bottom': 0, 'baseline': 0, 'center': 0.5, 'top': 1}[va]
+    x1, y1 = x0 + width, y0 + height
+
+    # Points outside the axes are not annotated, so they take no room
+    bbox = ax.bbox
+    inside = (points[:, 0] >= bbox.x0) & (points[:, 0] <= bbox.x1) & (points[:, 1] >= bbox.y0) & (points[:, 1] <= bbox.y1)
+
+    # Greedy placement against the boxes kept so far
+    kept = []
+    for i in np.flatnonzero(inside):
+        if len(kept) >= max_labels:
+            break
+        if kept:
+            k = np.array(kept)
+            if np.any((x0[i] < x1[k]) & (x1[i] > x0[k]) & (y0[i] < y1[k]) & (y1[i] > y0[k])):
+                continue
+        kept.append(i)
+    return kept
+
+
+def _aspect(gdf):
+    """The axes aspect geopandas gives the shapefile, 1/cos(latitude) for geographic coordinates"""
+    if gdf.crs is not None and gdf.crs.is_geographic:
+        return 1 / np.cos(np.radians((gdf.total_bounds[1] + gdf.total_bounds[3]) / 2))
+    return 1.0
+
+
+def _render_layer(draw, width, height, xlim, ylim, dpi):
+    """Draw a layer on its own canvas of ``width`` x ``height`` pixels and return its RGBA pixels, bottom row first"""
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_axis_off()
+
+    # Limits are set first so labels can be culled at the final scale, and again after plotting
+    ax.set_xlim(xlim)
+    ax.set_ylim(ylim)
+    ax.set_aspect('auto')
+    draw(ax)
+    ax.set_xlim(xlim)
+    ax.set_ylim(ylim)
+    ax.set_aspect('auto')
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba())[::-1].copy()
+
+
+class _BaseLayer(Artist):
+    """Static map layers rasterised once at the axes' pixel size and pasted unscaled on every draw
+
+    ``name`` identifies the layer and its shapefile; ``draw(ax)`` draws it.
+    """
+
+    def __init__(self, name, draw):
+        super().__init__()
+        self.name = name
+        self.draw_layer = draw
+        self.set_zorder(0)
+
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+        ax = self.axes
+        # Keyed on the rounded size alone; the corner moves by a fraction of a pixel between
+        # the tight-bbox and final draws of savefig, which would otherwise rasterise twice
+        width, height = int(round(ax.bbox.width)), int(round(ax.bbox.height))
+        key = (self.name, width, height, ax.get_xlim(), ax.get_ylim(), self.figure.dpi)
+        with _BASE_LAYERS_LOCK:
+            image = _BASE_LAYERS.get(key)
+        if image is None:
+            # Maps drawn in other threads may render the same layer meanwhile; either copy is kept
+            image = _render_layer(self.draw_layer, width, height, ax.get_xlim(), ax.get_ylim(), self.figure.dpi)
+            with _BASE_LAYERS_LOCK:
+                if len(_BASE_LAYERS) >= MAX_BASE_LAYERS:
+                    _BASE_LAYERS.clear()
+                _BASE_LAYERS[key] = image
+        gc = renderer.new_gc()
+        renderer.draw_image(gc, int(np.floor(ax.bbox.x0)), int(np.floor(ax.bbox.y0)), image)
+        gc.restore()
+        self.stale = False
+
+
+def _add_base_layer(ax, gdf, name, extent, draw):
+    """Put the cached base layer of ``gdf`` under the axes and show ``extent`` (x0, x1, y0, y1)"""
+    ax.add_artist(_BaseLayer((name, len(gdf), tuple(gdf.total_bounds)), draw))
+    ax.set_aspect(_aspect(gdf))
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+
+
+def _draw_districts(ax, gdf, boundaries=None):
+    """Chiefdom base layer with labelled district outlines, limited to the country"""
+    def draw(base_ax):
+        # Plot all chiefdoms with gray edges (base layer)
+        gdf.plot(ax=base_ax, color='white', edgecolor='gray', alpha=0.8, linewidth=0.5)
+        _draw_district_outlines(base_ax, gdf, boundaries)
+
+    # Set axis limits to show full country
+    bounds = gdf.total_bounds
+    _add_base_layer(ax, gdf, 'national', (bounds[0] - 0.1, bounds[2] + 0.1, bounds[1] - 0.1, bounds[3] + 0.1), draw)
+
+
+def _draw_district_outlines(ax, gdf, boundaries=None):
+    """Thick district boundaries with the district names that fit, at their label points
+
+    The axes limits must already be set.
+    """
+    # Get district boundaries by dissolving chiefdoms by FIRST_DNAM
+    if 'FIRST_DNAM' not in gdf.columns:
+        return
+    if boundaries is None:
+        boundaries = district_boundaries(gdf)
+    boundaries.plot(ax=ax, facecolor='none', edgecolor='black', linewidth=3, alpha=1.0)
+
+    # Add district labels, largest districts first
+    x, y = label_points(boundaries)
+    names = boundaries.index.to_numpy()
+    order = np.argsort(-boundaries.geometry.area.to_numpy(), kind='stable')
+    for i in cull_labels(ax, x[order], y[order], names[order], 12):
+        ax.annotate(
+            names[order][i],  # District name
+            (x[order][i], y[order][i]),
+            fontsize=12,
+            fontweight='bold',
+            ha='center',
+            va='center',
+            color='black',
+            bbox=dict(boxstyle='round,pad=0.3', facecolor='white', alpha=0.8, edgecolor='black')
+        )
+
+
+def _finish_national_map(ax, title):
+    ax.set_title(title, fontsize=18, fontweight='bold', pad=20)
+    ax.set_xlabel('Longitude', fontsize=14)
+    ax.set_ylabel('Latitude', fontsize=14)
+
+    # Add grid for reference
+    ax.grid(True, alpha=0.3, linestyle='--')
+    ax.figure.tight_layout()
+
+
+def overall_map(gdf, coords, boundaries=None):
+    """Sierra Leone map with district boundaries and every valid school location
+
+    ``coords`` holds the valid ``lat``/``lon`` school coordinates. Pass the
+    result of ``district_boundaries`` as ``boundaries`` to reuse a dissolve.
+    """
+    fig, ax = new_figure((16, 10))
+    _draw_districts(ax, gdf, boundaries)
+
+    # Plot GPS points on the overall map
+    if len(coords) > 0:
+        ax.scatter(
+            coords['lon'], coords['lat'],
+            c='#47B5FF',
+            s=100,
+            alpha=0.9,
+            edgecolors='white',
+            linewidth=2,
+            zorder=100,
+            label=f'Schools ({len(coords)})',
+            marker='o'
+        )
+
+        # Add legend
+        ax.legend(fontsize=14, loc='best')
+
+    _finish_national_map(ax, 'Sierra Leone - School Distribution by District')
+    return fig
+
+
+def grid_overview_map(gdf, cells, measure='schools', boundaries=None):
+    """Sierra Leone map with schools aggregated into square grid cells
+
+    ``cells`` is the output of ``sbd.spatial.grid_aggregate``; each occupied
+    cell is one polygon coloured by ``measure``, whatever the school count.
+    """
+    fig, ax = new_figure((16, 10))
+    _draw_districts(ax, gdf, boundaries)
+
+    if len(cells) > 0:
+        # Cell corners as one (n, 4, 2) vertex array
+        lon0 = cells['lon0'].to_numpy(dtype=float)
+        lat0 = cells['lat0'].to_numpy(dtype=float)
+        size = cells['cell_deg'].to_numpy(dtype=float)
+        verts = np.stack([
+            np.column_stack([lon0, lat0]),
+            np.column_stack([lon0 + size, lat0]),
+            np.column_stack([lon0 + size, lat0 + size]),
+            np.column_stack([lon0, lat0 + size]),
+        ], axis=1)
+        collection = PolyCollection(verts, array=cells[measure].to_numpy(dtype=float),
+                                    cmap='YlOrRd', edgecolors='none', alpha=0.85, zorder=50)
+        ax.add_collection(collection)
+        fig.colorbar(collection, ax=ax, shrink=0.7, label=MEASURE_LABELS[measure])
+
+    _finish_national_map(ax, f'Sierra Leone - {MEASURE_LABELS[measure]} by Grid Cell '
+                             f'({int(cells["schools"].sum()) if len(cells) else 0} schools)')
+    return fig
+
+
+def chiefdom_overview_map(gdf, chiefdom_table, measure='schools', boundaries=None):
+    """Sierra Leone choropleth of chiefdoms coloured by an aggregated measure
+
+    ``chiefdom_table`` has one row per ``gdf`` polygon, in the same order,
+    as returned by ``sbd.spatial.chiefdom_aggregate``.
+    """
+    fig, ax = new_figure((16, 10))
+
+    # Chiefdoms without schools are drawn as missing rather than as zero
+    values = chiefdom_table[measure].where(chiefdom_table['schools'] > 0)
+    shaded = gdf.assign(value=values.to_numpy(dtype=float))
+    shaded.plot(ax=ax, column='value', cmap='YlOrRd', edgecolor='gray', linewidth=0.5,
+                legend=True, legend_kwds={'shrink': 0.7, 'label': MEASURE_LABELS[measure]},
+                missing_kwds={'color': 'whitesmoke', 'edgecolor': 'gray', 'linewidth': 0.5, 'label': 'No schools'})
+    ax.set_xlim(gdf.total_bounds[0] - 0.1, gdf.total_bounds[2] + 0.1)
+    ax.set_ylim(gdf.total_bounds[1] - 0.1, gdf.total_bounds[3] + 0.1)
+    _draw_district_outlines(ax, gdf, boundaries)
+
+    _finish_national_map(ax, f'Sierra Leone - {MEASURE_LABELS[measure]} by Chiefdom')
+    return fig
+
+
+def district_choropleth_map(joined, district, measure='coverage'):
+    """One district's chiefdoms coloured by a measure, with chiefdom labels
+
+    ``joined`` is the shapefile with the chiefdom measures attached, as
+    returned by ``sbd.spatial.join_chiefdom_metrics``.
+    """
+    district_gdf = joined[joined['FIRST_DNAM'] == district]
+    fig, ax = new_figure((14, 8))
+
+    values = district_gdf[measure].where(district_gdf['schools'] > 0)
+    shaded = district_gdf.assign(value=values.to_numpy(dtype=float))
+    shaded.plot(ax=ax, column='value', cmap='YlOrRd', edgecolor='black', linewidth=1.5,
+                legend=True, legend_kwds={'shrink': 0.7, 'label': MEASURE_LABELS[measure]},
+                missing_kwds={'color': 'whitesmoke', 'edgecolor': 'black', 'linewidth': 1.5, 'label': 'No schools'})
+
+    # Add chiefdom labels with their value, chiefdoms with schools first
+    named = district_gdf['FIRST_CHIE'].notna().to_numpy()
+    x, y = label_points(district_gdf)
+    labels = [name if pd.isna(value) else name + (f"\n{value:.1f}%" if measure == 'coverage' else f"\n{int(value):,}")
+              for name, value in zip(district_gdf['FIRST_CHIE'][named], values[named])]
+    order = np.argsort(values[named].isna().to_numpy(), kind='stable')
+    x, y, labels = x[named][order], y[named][order], [labels[i] for i in order]
+    ax.autoscale_view()
+    for i in cull_labels(ax, x, y, labels, 8):
+        ax.annotate(labels[i], (x[i], y[i]), fontsize=8, ha='center', va='center',
+                    bbox=dict(boxstyle='round,pad=0.2', facecolor='white', alpha=0.7))
+
+    ax.set_title(f'{district} District - {MEASURE_LABELS[measure]} by Chiefdom', fontsize=16, fontweight='bold')
+    ax.set_xlabel('Longitude', fontsize=12)
+    ax.set_ylabel('Latitude', fontsize=12)
+    ax.grid(True, alpha=0.3, linestyle='--')
+    fig.tight_layout()
+    return fig
+
+
+def district_map(district_gdf, district, coords):
+    """District map with chiefdom boundaries and labelled school locations
+
+    The map covers the whole district, widened to any school outside it.
+    """
+    fig, ax = new_figure((14, 8))
+    bounds = district_gdf.total_bounds
+    extent = (bounds[0] - DISTRICT_MARGIN, bounds[2] + DISTRICT_MARGIN, bounds[1] - DISTRICT_MARGIN, bounds[3] + DISTRICT_MARGIN)
+
+    def draw(base_ax):
+        # Plot chiefdom boundaries in white with black edges
+        district_gdf.plot(ax=base_ax, color='white', edgecolor='black', alpha=0.8, linewidth=2)
+
+        # Add chiefdom labels
+        if 'FIRST_CHIE' not in district_gdf.columns:
+            return
+        named = district_gdf['FIRST_CHIE'].notna().to_numpy()
+        x, y = label_points(district_gdf)
+        x, y, names = x[named], y[named], district_gdf['FIRST_CHIE'].to_numpy()[named]
+        for i in cull_labels(base_ax, x, y, names, 9, offset=(5, 5), ha='left', va='bottom'):
+            base_ax.annotate(
+                names[i],
+                (x[i], y[i]),
+                xytext=(5, 5),
+                textcoords='offset points',
+                fontsize=9,
+                ha='left',
+                bbox=dict(boxstyle='round,pad=0.3', facecolor='lightblue', alpha=0.7)
+            )
+
+    x0, x1, y0, y1 = extent
+
+    # Plot GPS points on the shapefile
+    if len(coords) > 0:
+        lats, lons = coords['lat'], coords['lon']
+
+        # Plot GPS points with high visibility
+        ax.scatter(
+            lons, lats,
+            c='red',
+            s=150,
+            alpha=1.0,
+            edgecolors='white',
+            linewidth=3,
+            zorder=100,  # Very high z-order to ensure visibility
+            label=f'Schools ({len(coords)})',
+            marker='o'
+        )
+
+        # Widen the map extent to schools outside the district
+        x0, x1 = min(x0, lons.min() - DISTRICT_MARGIN), max(x1, lons.max() + DISTRICT_MARGIN)
+        y0, y1 = min(y0, lats.min() - DISTRICT_MARGIN), max(y1, lats.max() + DISTRICT_MARGIN)
+
+    _add_base_layer(ax, district_gdf, ('district', district), (x0, x1, y0, y1), draw)
+
+    # Add text labels for the school points that have room for one
+    if len(coords) > 0:
+        lats, lons = lats.to_numpy(dtype=float), lons.to_numpy(dtype=float)
+        names = [f'S{i+1}' for i in range(len(coords))]
+        for i in cull_labels(ax, lons, lats, names, 10, offset=(5, 5), ha='left', va='bottom'):
+            ax.annotate(names[i],
+                        (lons[i], lats[i]),
+                        xytext=(5, 5),
+                        textcoords='offset points',
+                        fontsize=10,
+                        fontweight='bold',
+                        color='red',
+                        bbox=dict(boxstyle='round,pad=0.2', facecolor='white', alpha=0.8))
+
+    # Customize plot
+    title_text = f'{district} District - Chiefdoms: {len(district_gdf)}'
+    if len(coords) > 0:
+        title_text += f' | GPS Points: {len(coords)}'
+    ax.set_title(title_text, fontsize=16, fontweight='bold')
+    ax.set_xlabel('Longitude', fontsize=12)
+    ax.set_ylabel('Latitude', fontsize=12)
+
+    # Add legend if GPS points exist
+    if len(coords) > 0:
+        ax.legend(fontsize=12, loc='best')
+
+    # Add grid for reference
+    ax.grid(True, alpha=0.3, linestyle='--')
+
+    fig.tight_layout()
+    return fig
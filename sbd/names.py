@@ -0,0 +1,153 @@
+"""Reconciliation of the QR-code district and chiefdom names with the shapefile.
+
+Submitted names are free text ("Bo", "Makarie Chiefdom", "Tinkoko") while
+the Chiefdom2021 shapefile has its own spellings ("BO", "MAKARI",
+"TIKONKO"). Each distinct name is scored once with rapidfuzz, against the
+shapefile chiefdoms of its own district only, and the result is saved as a
+lookup table, so later runs are plain lookups. Rows of the table can be
+corrected by hand, e.g. for a renamed chiefdom such as Bo City / BO TOWN.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from sbd.artifacts import write_atomic
+from sbd.report import ASSET_DIR
+from sbd.spatial import normalize_names
+
+NAME_INDEX = os.path.join(ASSET_DIR, "name_index.csv")
+
+# Lowest rapidfuzz WRatio score accepted as a match
+MATCH_SCORE = 75
+
+# Score above which a chiefdom already submitted under its exact name is still preferred
+STRONG_SCORE = 90
+
+KEY_COLUMNS = ['district_key', 'chiefdom_key']
+INDEX_COLUMNS = KEY_COLUMNS + ['FIRST_DNAM', 'FIRST_CHIE', 'score']
+
+
+def _normalized(names):
+    """``normalize_names`` applied once per distinct name, with '' for missing names"""
+    distinct = pd.Series(names.dropna().unique())
+    return names.map(dict(zip(distinct, normalize_names(distinct)))).fillna('')
+
+
+def _best_matches(queries, choices):
+    """Best choice and its score for each query, scored as one matrix"""
+    from rapidfuzz import fuzz, process
+
+    scores = process.cdist(queries, choices, scorer=fuzz.WRatio, workers=-1)
+    best = scores.argmax(axis=1)
+    return np.asarray(choices, dtype=object)[best], scores[np.arange(len(queries)), best]
+
+
+def _match_keys(queries, choices):
+    """Map normalized query names to normalized choices, exact matches first
+
+    A fuzzy match below STRONG_SCORE prefers the choices no exact match has
+    taken, so "BOMBALI SERRY" falls on "BOMBALI SIARI" rather than on
+    "BOMBALI SEBORA" when that chiefdom was submitted under its own name.
+    Returns key -> (choice, score).
+    """
+    exact = {name: (name, 100.0) for name in queries if name in choices}
+    fuzzy = [name for name in queries if name not in exact]
+    free = [name for name in choices if name not in exact]
+    matches = dict(exact)
+    if not fuzzy:
+        return matches
+
+    best, scores = _best_matches(fuzzy, choices)
+    if free:
+        free_best, free_scores = _best_matches(fuzzy, free)
+        taken = np.isin(best, list(exact)) & (scores < STRONG_SCORE) & (free_scores >= MATCH_SCORE)
+        best = np.where(taken, free_best, best)
+        scores = np.where(taken, free_scores, scores)
+    matches.update({name: (match, round(float(score), 1))
+                    for name, match, score in zip(fuzzy, best, scores) if score >= MATCH_SCORE})
+    return matches
+
+
+def match_names(pairs, gdf):
+    """Match distinct normalized (district, chiefdom) key pairs to shapefile names
+
+    Districts are matched against the shapefile districts, then chiefdoms
+    against the chiefdoms of their matched district only. Returns one index
+    row per pair with the shapefile ``FIRST_DNAM``/``FIRST_CHIE`` spelling
+    and the chiefdom score; unmatched names are kept with missing values so
+    they are not scored again.
+    """
+    shape = pd.DataFrame({
+        'FIRST_DNAM': gdf['FIRST_DNAM'],
+        'FIRST_CHIE': gdf['FIRST_CHIE'],
+        'district_key': normalize_names(gdf['FIRST_DNAM']),
+        'chiefdom_key': normalize_names(gdf['FIRST_CHIE']),
+    }).dropna(subset=KEY_COLUMNS).drop_duplicates(KEY_COLUMNS)
+    district_names = shape.drop_duplicates('district_key').set_index('district_key')['FIRST_DNAM']
+
+    index = pd.DataFrame(pairs[KEY_COLUMNS]).reset_index(drop=True)
+    districts = _match_keys(list(index['district_key'].unique()), list(district_names.index))
+    index['shape_district'] = index['district_key'].map({key: match for key, (match, _) in districts.items()})
+    index['FIRST_DNAM'] = index['shape_district'].map(district_names)
+    index['FIRST_CHIE'] = pd.Series(pd.NA, index=index.index, dtype=object)
+    index['score'] = np.nan
+
+    # Blocking: each chiefdom is only compared with the chiefdoms of its district
+    for shape_district, block in index.dropna(subset=['shape_district']).groupby('shape_district'):
+        candidates = shape[shape['district_key'] == shape_district].set_index('chiefdom_key')['FIRST_CHIE']
+        chiefdoms = _match_keys([key for key in block['chiefdom_key'].unique() if key], list(candidates.index))
+        matched = block['chiefdom_key'].map({key: match for key, (match, _) in chiefdoms.items()})
+        index.loc[block.index, 'FIRST_CHIE'] = matched.map(candidates)
+        index.loc[block.index, 'score'] = block['chiefdom_key'].map({key: score for key, (_, score) in chiefdoms.items()})
+
+    return index[INDEX_COLUMNS]
+
+
+def load_name_index(path=NAME_INDEX):
+    """Read the saved lookup table, or an empty one if there is none yet"""
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    index = pd.read_csv(path, dtype={column: str for column in INDEX_COLUMNS[:-1]})
+    index[KEY_COLUMNS] = index[KEY_COLUMNS].fillna('')
+    return index
+
+
+def save_name_index(index, path=NAME_INDEX):
+    """Write the lookup table through a temporary file of its own so it is never left half written
+
+    Dashboard sessions, the warm-up and the CLI's worker processes may save
+    it at the same time; the last complete table written wins.
+    """
+    write_atomic(path, index.sort_values(KEY_COLUMNS).to_csv(index=False).encode())
+
+
+def shapefile_names(df, gdf, path=NAME_INDEX):
+    """Shapefile spelling of every row's District and Chiefdom
+
+    Names already in the saved lookup table are only looked up; new ones
+    are matched and added to the table. Rows without a match keep their
+    submitted name. Returns ``District`` and ``Chiefdom`` aligned to ``df``.
+    """
+    keys = pd.DataFrame({
+        'district_key': _normalized(df['District']),
+        'chiefdom_key': _normalized(df['Chiefdom']),
+    }, index=df.index)
+
+    index = load_name_index(path)
+    pairs = keys.drop_duplicates()
+    new_pairs = pairs[~pd.MultiIndex.from_frame(pairs).isin(pd.MultiIndex.from_frame(index[KEY_COLUMNS]))]
+    if len(new_pairs) > 0:
+        new_index = match_names(new_pairs, gdf)
+        index = pd.concat([index, new_index], ignore_index=True) if len(index) > 0 else new_index
+        try:
+            save_name_index(index, path)
+        except OSError:
+            pass
+
+    lookup = index.set_index(KEY_COLUMNS)[['FIRST_DNAM', 'FIRST_CHIE']]
+    matched = lookup.reindex(pd.MultiIndex.from_frame(keys))
+    return pd.DataFrame({
+        'District': matched['FIRST_DNAM'].to_numpy(dtype=object),
+        'Chiefdom': matched['FIRST_CHIE'].to_numpy(dtype=object),
+    }, index=df.index).fillna({'District': df['District'], 'Chiefdom': df['Chiefdom']})
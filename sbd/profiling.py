@@ -0,0 +1,167 @@
+"""Stage-level timing and memory instrumentation for the dashboard.
+
+Each major section of a rerun is wrapped in ``stage``, which records wall
+time, CPU time, the peak RSS of the process so far and, when memory tracing
+is on, the tracemalloc peak allocated inside the stage. The RSS peak is the
+process's lifetime maximum, so it only shows which stage first pushed it
+higher, not how much memory a stage used. The records of a rerun are
+shown in the "Performance" expander and appended to a local JSON lines log.
+
+Startup cost is profiled separately, from the command line:
+
+    python -m sbd.profiling streamlit_appv2.py
+
+lists the import time of every package the dashboard imports at startup,
+measured with ``python -X importtime`` in a fresh interpreter, and of the
+heavy libraries it only imports in the sections that need them.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PERFORMANCE_LOG = "performance_log.jsonl"
+
+# Heavy libraries the dashboard only imports when a section needs them
+DEFERRED_IMPORTS = ['matplotlib.figure', 'geopandas', 'docx', 'altair', 'pydeck', 'rapidfuzz']
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process since it started in MB, or None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def start_memory_tracing():
+    """Turn on tracemalloc so stages also record their allocation peaks"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def stop_memory_tracing():
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+@contextmanager
+def stage(records, name):
+    """Record wall time, CPU time and memory of the enclosed block into ``records``
+
+    Stages must not be nested: the tracemalloc peak is reset at the start
+    of every stage.
+    """
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        start_traced = tracemalloc.get_traced_memory()[0]
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    try:
+        yield
+    finally:
+        record = {
+            'stage': name,
+            'wall_s': round(time.perf_counter() - start_wall, 4),
+            'cpu_s': round(time.process_time() - start_cpu, 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'traced_peak_mb': None,
+        }
+        if tracing and tracemalloc.is_tracing():
+            record['traced_peak_mb'] = round((tracemalloc.get_traced_memory()[1] - start_traced) / (1024 * 1024), 2)
+        records.append(record)
+
+
+def performance_table(records):
+    """Stage records as a DataFrame, slowest stage first, with each stage's share of the rerun"""
+    table = pd.DataFrame(records, columns=['stage', 'wall_s', 'cpu_s', 'peak_rss_mb', 'traced_peak_mb'])
+    total = table['wall_s'].sum()
+    table['share_pct'] = (table['wall_s'] / total * 100).round(1) if total > 0 else 0.0
+    return table.sort_values('wall_s', ascending=False, ignore_index=True)
+
+
+def append_log(records, path=PERFORMANCE_LOG, **context):
+    """Append the stage records of one rerun to the JSON lines log"""
+    run_at = datetime.now().isoformat(timespec='seconds')
+    try:
+        with open(path, 'a') as f:
+            for record in records:
+                f.write(json.dumps({'run_at': run_at, 'pid': os.getpid(), **context, **record}) + "\n")
+    except OSError:
+        # Logging must never break the dashboard, e.g. on a read-only deployment
+        pass
+
+
+def startup_imports(script):
+    """Modules a script imports at module level, in order"""
+    with open(script) as f:
+        tree = ast.parse(f.read(), script)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return modules
+
+
+def import_profile(modules, deferred=(), cwd=None):
+    """Import time of each package imported by ``modules``, then by ``deferred``, in a fresh interpreter
+
+    One row per package imported at the top level, with its own and its
+    cumulative import time in seconds; packages already imported by an
+    earlier module cost nothing again, so each row of ``deferred`` is the
+    extra time that import adds once the dashboard has started.
+    """
+    code = "\n".join(f"import {module}" for module in [*modules, *deferred])
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=cwd,
+                            capture_output=True, text=True, check=True)
+    deferred_roots = {module.split('.')[0] for module in deferred}
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented under the module that imported them
+        if name.startswith("  ") or not self_us.strip().isdigit():
+            continue
+        name = name.strip()
+        rows.append({'module': name, 'self_s': int(self_us) / 1e6, 'cumulative_s': int(cumulative_us) / 1e6,
+                     'deferred': name.split('.')[0] in deferred_roots})
+    table = pd.DataFrame(rows, columns=['module', 'self_s', 'cumulative_s', 'deferred'])
+    return table.sort_values(['deferred', 'cumulative_s'], ascending=[True, False], ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the import time of the dashboard's startup.")
+    parser.add_argument('script', nargs='?', default="streamlit_appv2.py", help="dashboard script")
+    parser.add_argument('--top', type=int, default=15, help="number of startup packages listed")
+    args = parser.parse_args(argv)
+
+    table = import_profile(startup_imports(args.script), DEFERRED_IMPORTS,
+                           cwd=os.path.dirname(os.path.abspath(args.script)))
+    startup, deferred = table[~table['deferred']], table[table['deferred']]
+    print(f"Startup imports of {args.script}: {startup['cumulative_s'].sum():.2f}s")
+    print(startup.head(args.top)[['module', 'self_s', 'cumulative_s']].to_string(index=False, float_format='{:.3f}'.format))
+    print(f"\nDeferred until a section needs them: {deferred['cumulative_s'].sum():.2f}s")
+    print(deferred[['module', 'self_s', 'cumulative_s']].to_string(index=False, float_format='{:.3f}'.format))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
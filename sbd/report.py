@@ -0,0 +1,169 @@
+"""Word report builder for the SBD analysis."""
+import os
+from io import BytesIO
+
+import pandas as pd
+
+# Logos live next to the apps at the repository root
+ASSET_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_word_report(summaries, map_images, current_datetime):
+    """Build the comprehensive Word report and return it as bytes
+
+    ``map_images`` maps chart keys to PNG buffers as returned by
+    ``save_map_as_png``. python-docx is only imported when a report is built.
+    """
+    from docx import Document
+    from docx.shared import Inches, Pt
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    doc = Document()
+
+    # Add logos to header (if available)
+    try:
+        # Create header section with logos
+        header_para = doc.add_paragraph()
+        header_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+        # Try to add logos
+        try:
+            logo_run1 = header_para.add_run()
+            logo_run1.add_picture(os.path.join(ASSET_DIR, "NMCP.png"), width=Inches(1.5))
+            header_para.add_run("    ")  # Space between logos
+        except:
+            header_para.add_run("NMCP    ")
+
+        try:
+            logo_run2 = header_para.add_run()
+            logo_run2.add_picture(os.path.join(ASSET_DIR, "icf_sl.png"), width=Inches(1.5))
+            header_para.add_run("    ")  # Space between logos
+        except:
+            header_para.add_run("ICF Sierra Leone    ")
+
+        header_para.add_run("Partner Logo")
+
+        doc.add_paragraph()  # Add space after logos
+    except:
+        # If logos fail, add text headers
+        header_para = doc.add_paragraph()
+        header_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        header_run = header_para.add_run("NMCP | ICF Sierra Leone | Partner Organization")
+        header_run.font.size = Pt(12)
+        header_run.bold = True
+
+    # Add title page
+    title = doc.add_heading('School-Based Distribution (SBD)', 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    subtitle = doc.add_heading('Comprehensive Analysis Report with Maps and Summaries', level=1)
+    subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # Add date and time
+    date_para = doc.add_paragraph()
+    date_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    date_run = date_para.add_run(f"Generated on: {current_datetime.strftime('%B %d, %Y at %I:%M %p')}")
+    date_run.font.size = Pt(12)
+    date_run.bold = True
+
+    # Add page break
+    doc.add_page_break()
+
+    # Add executive summary
+    doc.add_heading('Executive Summary', level=1)
+
+    summary_text = f"""
+    This comprehensive report presents the analysis of School-Based Distribution (SBD) data collected across Sierra Leone, 
+    covering {summaries['overall']['total_districts']} districts and {summaries['overall']['total_chiefdoms']} chiefdoms with a total of {summaries['overall']['total_schools']} school records.
+
+    KEY FINDINGS:
+    • Total Schools Surveyed: {summaries['overall']['total_schools']:,}
+    • Districts Covered: {summaries['overall']['total_districts']}
+    • Chiefdoms Covered: {summaries['overall']['total_chiefdoms']}
+    • Total Student Enrollment: {summaries['overall']['total_enrollment']:,}
+    • Total Boys: {summaries['overall']['total_boys']:,}
+    • Total Girls: {summaries['overall']['total_girls']:,}
+    • Total ITNs Distributed: {summaries['overall']['total_itn']:,}
+    • Overall Coverage Rate: {summaries['overall']['coverage']:.1f}%
+
+    This report provides detailed analysis of enrollment patterns, gender distribution, ITN distribution effectiveness, 
+    and geographic coverage across administrative boundaries with comprehensive maps and visualizations.
+    """
+    doc.add_paragraph(summary_text)
+
+    # Add geographic maps section
+    doc.add_heading('Geographic Distribution Maps', level=1)
+
+    # Add Overall Sierra Leone map FIRST
+    if 'sierra_leone_overall' in map_images:
+        doc.add_heading('Sierra Leone - Overall Distribution', level=2)
+        doc.add_paragraph("Overview of school distribution across all districts in Sierra Leone:")
+        chart_para = doc.add_paragraph()
+        chart_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        chart_run = chart_para.add_run()
+        map_images['sierra_leone_overall'].seek(0)
+        chart_run.add_picture(map_images['sierra_leone_overall'], width=Inches(6.5))
+        doc.add_paragraph()  # Add spacing
+
+    # Add BO District map
+    if 'bo_district' in map_images:
+        doc.add_heading('BO District Map', level=2)
+        doc.add_paragraph("Geographic distribution of schools and chiefdoms in BO District:")
+        chart_para = doc.add_paragraph()
+        chart_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        chart_run = chart_para.add_run()
+        map_images['bo_district'].seek(0)
+        chart_run.add_picture(map_images['bo_district'], width=Inches(6))
+        doc.add_paragraph()  # Add spacing after BO map
+
+    # Add BOMBALI District map
+    if 'bombali_district' in map_images:
+        doc.add_heading('BOMBALI District Map', level=2)
+        doc.add_paragraph("Geographic distribution of schools and chiefdoms in BOMBALI District:")
+        chart_para = doc.add_paragraph()
+        chart_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        chart_run = chart_para.add_run()
+        map_images['bombali_district'].seek(0)
+        chart_run.add_picture(map_images['bombali_district'], width=Inches(6))
+        doc.add_paragraph()  # Add spacing after BOMBALI map
+
+    # Add page break before charts
+    doc.add_page_break()
+
+    # Add overall summary charts
+    doc.add_heading('Overall Analysis Charts', level=1)
+
+    # Add enhanced enrollment analysis chart
+    if 'enhanced_enrollment_analysis' in map_images:
+        doc.add_heading('Enhanced Enrollment vs ITN Distribution Analysis', level=2)
+        doc.add_paragraph("Comprehensive analysis showing total enrollment, ITNs distributed (boys + girls), and remaining ITNs needed across districts:")
+        chart_para = doc.add_paragraph()
+        chart_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        chart_run = chart_para.add_run()
+        map_images['enhanced_enrollment_analysis'].seek(0)
+        chart_run.add_picture(map_images['enhanced_enrollment_analysis'], width=Inches(6.5))
+        doc.add_paragraph()  # Add spacing
+
+    # Add overall distribution pie chart
+    if 'overall_distribution_pie' in map_images:
+        doc.add_heading('Overall ITN Distribution Status', level=2)
+        doc.add_paragraph("Overall distribution status showing the proportion of students who have received ITNs versus those still waiting:")
+        chart_para = doc.add_paragraph()
+        chart_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        chart_run = chart_para.add_run()
+        map_images['overall_distribution_pie'].seek(0)
+        chart_run.add_picture(map_images['overall_distribution_pie'], width=Inches(5.5))
+        doc.add_paragraph()  # Add spacing
+
+    # Save to BytesIO
+    word_buffer = BytesIO()
+    doc.save(word_buffer)
+    return word_buffer.getvalue()
+
+
+def excel_bytes(df, sheet_name='Extracted Data'):
+    """Write a DataFrame to an in-memory Excel workbook"""
+    excel_buffer = BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name=sheet_name, index=False)
+    return excel_buffer.getvalue()
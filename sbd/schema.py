@@ -0,0 +1,108 @@
+"""Questionnaire schema registry for SBD workbooks.
+
+The SBD form was revised during the campaign, so workbooks exported on
+different dates name the per-class counts differently. Every version is
+registered here once; the version is detected when a workbook is loaded and
+the rest of the app works on the canonical measure columns added by
+``add_measures``.
+"""
+import pandas as pd
+
+CLASSES = range(1, 6)
+
+# Canonical per-school measures added to the extracted data at load
+MEASURE_COLUMNS = ['enrollment', 'boys', 'girls', 'left', 'itn']
+
+# Column names used for the QR code text across form versions
+QR_COLUMNS = ["Scan QR code", "Scan the QR code"]
+
+# Registered questionnaire versions, most recent first. Per-class columns use
+# "{n}" as the class number placeholder.
+SCHEMAS = {
+    # Revised form with the ITNs left at school for absent pupils
+    'v3': {
+        'enrollment': "How many pupils are enrolled in Class {n}?",
+        'boys': "How many boys in Class {n} received ITNs?",
+        'girls': "How many girls in Class {n} received ITNs?",
+        'left': "ITNs left at the school for pupils who were absent.",
+    },
+    # Revised form, per-class ITNs received by boys and girls
+    'v2': {
+        'enrollment': "How many pupils are enrolled in Class {n}?",
+        'boys': "How many boys in Class {n} received ITNs?",
+        'girls': "How many girls in Class {n} received ITNs?",
+        'left': None,
+    },
+    # Original pilot form
+    'v1': {
+        'enrollment': "Number of enrollments in class {n}",
+        'boys': "Number of boys in class {n}",
+        'girls': "Number of girls in class {n}",
+        'left': None,
+    },
+}
+
+
+def detect_version(columns):
+    """Return the most recent registered form version matching the columns"""
+    columns = set(columns)
+    for version, spec in SCHEMAS.items():
+        if spec['enrollment'].format(n=1) not in columns:
+            continue
+        if spec['left'] is not None and spec['left'] not in columns:
+            continue
+        return version
+    raise ValueError("Workbook does not match any registered SBD questionnaire version")
+
+
+def resolve_schema(columns):
+    """Resolve the form version and the concrete columns present in a workbook
+
+    The returned dict lists only columns that exist, so aggregation code can
+    use it directly without membership checks.
+    """
+    columns = list(columns)
+    present = set(columns)
+    version = detect_version(columns)
+    spec = SCHEMAS[version]
+
+    qr_column = next((col for col in QR_COLUMNS if col in present), None)
+    if qr_column is None:
+        raise ValueError("Workbook has no QR code column")
+
+    schema = {
+        'version': version,
+        'qr_column': qr_column,
+        'enrollment': [],
+        'boys': [],
+        'girls': [],
+        'left': [spec['left']] if spec['left'] is not None else [],
+        'class_columns': [],
+    }
+    for class_num in CLASSES:
+        for measure in ['enrollment', 'boys', 'girls']:
+            col = spec[measure].format(n=class_num)
+            if col in present:
+                schema[measure].append(col)
+                schema['class_columns'].append(col)
+    return schema
+
+
+def add_measures(df, schema, include_left=False):
+    """Add the canonical measure columns to the extracted data
+
+    ``itn`` is boys + girls, plus the ITNs left at school when
+    ``include_left`` is set and the form records them.
+    """
+    for measure in ['enrollment', 'boys', 'girls', 'left']:
+        cols = schema[measure]
+        if cols:
+            values = df[cols].apply(pd.to_numeric, errors='coerce').fillna(0).sum(axis=1)
+            df[measure] = values.astype('int64')
+        else:
+            df[measure] = 0
+
+    df['itn'] = df['boys'] + df['girls']
+    if include_left:
+        df['itn'] += df['left']
+    return df
@@ -0,0 +1,133 @@
+"""Campaign progress across the archive of dated SBD workbook snapshots.
+
+Every export contains all submissions made so far, so the snapshots are
+merged into one submission-level store indexed by submission time, and the
+per-day, per-district progress table is precomputed from that store once.
+"""
+import glob
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from openpyxl.utils.exceptions import InvalidFileException
+
+from sbd.extract import QR_FIELDS, load_workbook
+
+# Campaign exports are named after the SBD form, e.g. "SBD_07_08_2025.xlsx" or "sbd_1019.xlsx"
+SNAPSHOT_PATTERN = "*[Ss][Bb][Dd]*.xlsx"
+
+# Form versions used during the campaign; the v1 pilot workbooks are not part of its progress
+SNAPSHOT_VERSIONS = ['v2', 'v3']
+
+# Timestamp format of the "Created At" / "Last Updated At" columns
+TIMESTAMP_FORMAT = "%d-%m-%Y %I:%M %p"
+
+# Columns kept in the store; everything else in a snapshot is dropped
+STORE_COLUMNS = ['Submission Id', 'Created At', 'Last Updated At', 'GPS Location'] + list(QR_FIELDS) + ['enrollment', 'boys', 'girls', 'left', 'itn']
+
+PROGRESS_MEASURES = ['schools', 'enrollment', 'itn']
+
+
+def find_snapshots(directory=".", pattern=SNAPSHOT_PATTERN):
+    """List the workbook snapshots in a directory, sorted by file name
+
+    Excel's ``~$`` lock files of open workbooks are left out.
+    """
+    paths = glob.glob(os.path.join(directory, pattern))
+    return sorted(path for path in paths if not os.path.basename(path).startswith("~$"))
+
+
+def load_snapshot(path):
+    """Load one snapshot, keeping only the columns used by the store
+
+    Raises ValueError for a workbook that is not a campaign export.
+    """
+    extracted_df, schema = load_workbook(path, columns=STORE_COLUMNS)
+    if schema['version'] not in SNAPSHOT_VERSIONS:
+        raise ValueError(f"{path} is a {schema['version']} workbook, not a campaign export")
+    snapshot = extracted_df[[col for col in STORE_COLUMNS if col in extracted_df.columns]].copy()
+    snapshot['Snapshot'] = os.path.basename(path)
+    return snapshot
+
+
+def _load_snapshot_or_none(path):
+    """Load one snapshot, or None for a workbook that is not a campaign export or not a workbook at all"""
+    try:
+        return load_snapshot(path)
+    except (ValueError, zipfile.BadZipFile, InvalidFileException):
+        return None
+
+
+def load_snapshots(paths, workers=None):
+    """Load snapshots concurrently, one worker process per workbook, as one frame tagged by ``Snapshot``
+
+    ``workers`` defaults to one per CPU core; with a single worker or a
+    single workbook everything is loaded in this process. Workers are
+    spawned rather than forked, as the dashboard calls this from a threaded
+    server. Workbooks that are not campaign exports are skipped.
+    """
+    paths = list(paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(paths))
+
+    if workers <= 1:
+        snapshots = [_load_snapshot_or_none(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            snapshots = list(executor.map(_load_snapshot_or_none, paths))
+
+    frames = [snapshot for snapshot in snapshots if snapshot is not None]
+    if not frames:
+        return pd.DataFrame(columns=STORE_COLUMNS + ['Snapshot'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_store(paths, workers=None):
+    """Merge snapshots into one store of unique submissions indexed by submission time
+
+    A submission appears in every later export, so only its most recently
+    updated record is kept. Workbooks that are not campaign exports are skipped.
+    """
+    store = load_snapshots(paths, workers)
+    if store.empty or 'Created At' not in store.columns:
+        return pd.DataFrame(columns=STORE_COLUMNS + ['Snapshot'])
+
+    store['Submitted'] = pd.to_datetime(store['Created At'], format=TIMESTAMP_FORMAT, errors='coerce')
+    store['Updated'] = pd.to_datetime(store['Last Updated At'], format=TIMESTAMP_FORMAT, errors='coerce')
+    store = store.dropna(subset=['Submitted'])
+
+    store = store.sort_values('Updated', kind='stable').drop_duplicates('Submission Id', keep='last')
+    return store.set_index('Submitted').sort_index()
+
+
+def daily_progress(store):
+    """Precompute per-day, per-district daily deltas and cumulative totals
+
+    Every district gets a row for every day of the campaign, so progress
+    curves can be drawn straight from the table.
+    """
+    columns = ['District', 'date'] + PROGRESS_MEASURES + ['cum_' + m for m in PROGRESS_MEASURES] + ['coverage']
+    submissions = store.dropna(subset=['District'])
+    if submissions.empty:
+        return pd.DataFrame(columns=columns)
+
+    submissions = submissions.assign(date=submissions.index.normalize())
+    daily = submissions.groupby(['District', 'date']).agg(
+        schools=('Submission Id', 'size'),
+        enrollment=('enrollment', 'sum'),
+        itn=('itn', 'sum')
+    )
+
+    # Complete the calendar so cumulative totals carry over days without submissions
+    dates = pd.date_range(submissions['date'].min(), submissions['date'].max(), freq='D')
+    calendar = pd.MultiIndex.from_product([daily.index.levels[0], dates], names=['District', 'date'])
+    daily = daily.reindex(calendar, fill_value=0)
+
+    cumulative = daily.groupby(level='District').cumsum().add_prefix('cum_')
+    progress = daily.join(cumulative).reset_index()
+    cum_enrollment = progress['cum_enrollment']
+    progress['coverage'] = (progress['cum_itn'] / cum_enrollment.where(cum_enrollment > 0) * 100).fillna(0)
+    return progress[columns]
@@ -0,0 +1,132 @@
+"""Spatial aggregation of school GPS points for the national overview maps.
+
+At national scale individual school markers overlap, so the overview can be
+drawn from aggregates instead: a square grid of cells and the chiefdom
+polygons of the shapefile, each with school counts, enrollment and ITN
+sums. Both are computed in one vectorized pass per workbook version.
+"""
+import numpy as np
+import pandas as pd
+
+from sbd.extract import parse_gps
+
+# Columns of the school point table
+POINT_COLUMNS = ['lon', 'lat', 'school', 'district', 'enrollment', 'itn']
+
+# Grid cell size in degrees, about 5.5 km
+GRID_CELL_DEG = 0.05
+
+AGGREGATE_MEASURES = {'schools': ('itn', 'size'), 'enrollment': ('enrollment', 'sum'), 'itn': ('itn', 'sum')}
+
+# Legend labels of the aggregated overview measures
+MEASURE_LABELS = {'schools': 'Schools', 'enrollment': 'Enrollment', 'itn': 'ITNs Distributed', 'coverage': 'ITN Coverage (%)'}
+
+
+def school_points(extracted_df):
+    """Valid school coordinates with school, district, enrollment and ITNs"""
+    if "GPS Location" not in extracted_df.columns:
+        return pd.DataFrame(columns=POINT_COLUMNS)
+    coords = parse_gps(extracted_df["GPS Location"])
+    valid = coords["valid"]
+    points = pd.DataFrame({
+        # 5 decimals is about 1 m, enough for a school and much shorter to send
+        'lon': coords.loc[valid, 'lon'].round(5),
+        'lat': coords.loc[valid, 'lat'].round(5),
+        'school': extracted_df.loc[valid, 'School Name'],
+        'district': extracted_df.loc[valid, 'District'],
+        'enrollment': extracted_df.loc[valid, 'enrollment'],
+        'itn': extracted_df.loc[valid, 'itn'],
+    })
+    return points.reset_index(drop=True)
+
+
+def _with_coverage(table):
+    enrollment = table['enrollment']
+    table['coverage'] = (table['itn'] / enrollment.where(enrollment > 0) * 100).fillna(0)
+    return table
+
+
+def grid_aggregate(points, cell_deg=GRID_CELL_DEG):
+    """Bin school points into square grid cells
+
+    Returns one row per occupied cell with its lower-left corner
+    (``lon0``/``lat0``), the cell size, school count, enrollment, ITNs and
+    coverage.
+    """
+    columns = ['lon0', 'lat0', 'cell_deg'] + list(AGGREGATE_MEASURES) + ['coverage']
+    if len(points) == 0:
+        return pd.DataFrame(columns=columns)
+
+    binned = points.assign(
+        col=np.floor(points['lon'] / cell_deg).astype('int64'),
+        row=np.floor(points['lat'] / cell_deg).astype('int64'),
+    )
+    cells = binned.groupby(['col', 'row']).agg(**AGGREGATE_MEASURES).reset_index()
+    cells['lon0'] = cells['col'] * cell_deg
+    cells['lat0'] = cells['row'] * cell_deg
+    cells['cell_deg'] = cell_deg
+    return _with_coverage(cells)[columns]
+
+
+def chiefdom_aggregate(points, gdf):
+    """Assign school points to chiefdom polygons and total them per chiefdom
+
+    The point-in-polygon assignment is one spatial join using the
+    shapefile's spatial index. Returns one row per chiefdom polygon,
+    including chiefdoms without schools, keyed by ``FIRST_DNAM`` and
+    ``FIRST_CHIE``.
+    """
+    import geopandas as gpd
+
+    chiefdoms = gdf[['FIRST_DNAM', 'FIRST_CHIE', 'geometry']]
+    totals = pd.DataFrame(0, index=chiefdoms.index, columns=list(AGGREGATE_MEASURES))
+
+    if len(points) > 0:
+        school_gdf = gpd.GeoDataFrame(points, geometry=gpd.points_from_xy(points['lon'], points['lat']), crs=gdf.crs)
+        joined = gpd.sjoin(school_gdf, chiefdoms, how='inner', predicate='within')
+        sums = joined.groupby('index_right').agg(**AGGREGATE_MEASURES)
+        totals.loc[sums.index] = sums.values
+
+    table = pd.concat([chiefdoms[['FIRST_DNAM', 'FIRST_CHIE']], totals], axis=1)
+    return _with_coverage(table)
+
+
+def normalize_names(names):
+    """Normalized join keys for district and chiefdom names
+
+    Upper case, without parenthesised qualifiers, punctuation, the words
+    "District" and "Chiefdom" and repeated spaces, so "Gbanti (Bombali)
+    Chiefdom" matches "GBANTI" and "Ngowahun" matches "N'GOWAHUN".
+    """
+    return (names.astype('string').str.upper()
+            .str.replace(r"\(.*?\)", " ", regex=True)
+            .str.replace(r"[^A-Z0-9 ]", "", regex=True)
+            .str.replace(r"\b(?:DISTRICT|CHIEFDOM)\b", " ", regex=True)
+            .str.split().str.join(" "))
+
+
+def join_chiefdom_metrics(gdf, chiefdom_table):
+    """Attach chiefdom aggregates to the shapefile polygons in one merge
+
+    ``chiefdom_table`` is an ``aggregate(df, ['District', 'Chiefdom'])``
+    table. Both sides are keyed on the normalized district and chiefdom
+    names; polygons without a matching chiefdom get missing measures. The
+    result keeps the polygon order of ``gdf``.
+    """
+    measures = list(AGGREGATE_MEASURES) + ['coverage']
+    table = chiefdom_table.assign(
+        district_key=normalize_names(chiefdom_table['District']),
+        chiefdom_key=normalize_names(chiefdom_table['Chiefdom']),
+    )
+    # Several spellings can normalize to the same chiefdom
+    table = table.groupby(['district_key', 'chiefdom_key'], as_index=False)[list(AGGREGATE_MEASURES)].sum()
+    table = _with_coverage(table)
+
+    polygons = gdf.assign(
+        district_key=normalize_names(gdf['FIRST_DNAM']),
+        chiefdom_key=normalize_names(gdf['FIRST_CHIE']),
+    )
+    joined = polygons.merge(table[['district_key', 'chiefdom_key'] + measures],
+                            on=['district_key', 'chiefdom_key'], how='left')
+    joined.index = gdf.index
+    return joined
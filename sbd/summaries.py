@@ -0,0 +1,103 @@
+"""Aggregation of the canonical SBD measures by administrative level."""
+import pandas as pd
+
+from sbd.schema import MEASURE_COLUMNS
+
+
+def aggregate(df, keys):
+    """Sum the canonical measures per group, with school counts and coverage"""
+    grouped = df.groupby(keys, sort=False)
+    table = grouped[MEASURE_COLUMNS].sum()
+    table.insert(0, 'schools', grouped.size())
+    enrollment = table['enrollment']
+    table['coverage'] = (table['itn'] / enrollment.where(enrollment > 0) * 100).fillna(0)
+    table['itn_remaining'] = table['enrollment'] - table['itn']
+    return table.reset_index()
+
+
+def generate_summaries(df):
+    """Generate District, Chiefdom, and Gender summaries"""
+    summaries = {}
+
+    totals = {measure: int(df[measure].sum()) for measure in MEASURE_COLUMNS}
+    overall_summary = {
+        'total_schools': len(df),
+        'total_districts': df['District'].nunique(),
+        'total_chiefdoms': df['Chiefdom'].nunique(),
+        'total_boys': totals['boys'],
+        'total_girls': totals['girls'],
+        'total_left': totals['left'],
+        'total_enrollment': totals['enrollment'],
+        'total_itn': totals['itn'],
+    }
+    overall_summary['coverage'] = (overall_summary['total_itn'] / overall_summary['total_enrollment'] * 100) if overall_summary['total_enrollment'] > 0 else 0
+    overall_summary['itn_remaining'] = overall_summary['total_enrollment'] - overall_summary['total_itn']
+    overall_summary['gender_ratio'] = (overall_summary['total_girls'] / overall_summary['total_boys'] * 100) if overall_summary['total_boys'] > 0 else 0
+    summaries['overall'] = overall_summary
+
+    # District Summary
+    district_table = aggregate(df, ['District'])
+    chiefdom_counts = df.groupby('District')['Chiefdom'].nunique()
+    district_table.insert(2, 'chiefdoms', district_table['District'].map(chiefdom_counts))
+    summaries['district'] = _records(district_table.rename(columns={'District': 'district'}))
+
+    # Chiefdom Summary
+    chiefdom_table = aggregate(df, ['District', 'Chiefdom'])
+    summaries['chiefdom'] = _records(chiefdom_table.rename(columns={'District': 'district', 'Chiefdom': 'chiefdom'}))
+
+    return summaries
+
+
+def _records(table):
+    """Convert an aggregate table to a list of dicts with plain Python scalars"""
+    return [
+        {key: (value.item() if hasattr(value, 'item') else value) for key, value in row.items()}
+        for row in table.to_dict('records')
+    ]
+
+
+def district_analysis(df):
+    """District totals in the layout used by the district charts"""
+    return aggregate(df, ['District']).rename(columns={
+        'enrollment': 'Total_Enrollment',
+        'itn': 'Total_ITN',
+        'itn_remaining': 'ITN_Remaining',
+        'coverage': 'Coverage'
+    })[['District', 'Total_Enrollment', 'Total_ITN', 'ITN_Remaining', 'Coverage']]
+
+
+def chiefdom_analysis(district_data):
+    """Chiefdom totals for one district, largest enrollment first"""
+    district_chiefdom_df = aggregate(district_data, ['Chiefdom']).rename(columns={
+        'enrollment': 'Total_Enrollment',
+        'itn': 'Total_ITN',
+        'coverage': 'Coverage'
+    })[['Chiefdom', 'Total_Enrollment', 'Total_ITN', 'Coverage']]
+    return district_chiefdom_df.sort_values('Total_Enrollment', ascending=False)
+
+
+def rollup(df, levels, measures=('enrollment', 'itn')):
+    """Sum the measures at every level of a hierarchy in one table, with subtotals
+
+    ``levels`` runs from the coarsest to the finest key, e.g. District,
+    Chiefdom, School Name. The data is grouped once at the finest level and
+    each coarser subtotal is summed from that result. The ``level`` column
+    names the level of each row; columns below it are empty. Rows are in
+    hierarchy order, with each subtotal directly before its members.
+    Schools with a missing key at any level are left out, as in the detailed
+    summary.
+    """
+    levels = list(levels)
+    measures = list(measures)
+    finest = df.groupby(levels)[measures].sum()
+
+    parts = []
+    for depth in range(1, len(levels) + 1):
+        keys = levels[:depth]
+        part = finest if depth == len(levels) else finest.groupby(level=keys).sum()
+        part = part.reset_index().reindex(columns=levels + measures)
+        part.insert(0, 'level', levels[depth - 1])
+        parts.append(part)
+
+    table = pd.concat(parts, ignore_index=True)
+    return table.sort_values(levels, na_position='first', kind='stable', ignore_index=True)
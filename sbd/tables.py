@@ -0,0 +1,58 @@
+"""Server-side paging of the dashboard tables.
+
+Only one page of a table is sent to the browser. Search and sort run on the
+server: every row's text is joined and lower-cased once per dataset into a
+search index, so a search is one vectorized substring match, and only the
+matching rows are sorted before the page is cut out.
+"""
+import numpy as np
+import pandas as pd
+
+# Page sizes offered in the dashboard
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def search_index(df):
+    """One lower-case string per row joining its values, aligned to ``df``
+
+    Values are separated by newlines, which a search box cannot contain, so
+    a search never matches across two cells.
+    """
+    if len(df.columns) == 0:
+        return pd.Series('', index=df.index, dtype=object)
+    text = df.astype('string').fillna('')
+    joined = text.iloc[:, 0]
+    for column in text.columns[1:]:
+        joined = joined + "\n" + text[column]
+    return joined.str.lower()
+
+
+def page_rows(df, page=1, page_size=PAGE_SIZES[0], search="", sort_by=None, ascending=True, index=None):
+    """One page of ``df`` after search and sort, and the number of matching rows
+
+    ``search`` keeps rows whose text contains it, ignoring case; ``index``
+    is the search index of ``df``, or of a frame ``df`` is a row subset of,
+    from ``search_index``. Pages are numbered from 1 and past the last page
+    the last page is returned.
+    """
+    rows = np.arange(len(df))
+    if search:
+        if index is None:
+            index = search_index(df)
+        elif not index.index.equals(df.index):
+            index = index.loc[df.index]
+        matches = index.str.contains(search.lower(), regex=False, na=False)
+        rows = rows[matches.to_numpy(dtype=bool)]
+
+    if sort_by is not None and sort_by in df.columns and len(rows) > 0:
+        values = df[sort_by].iloc[rows].reset_index(drop=True)
+        try:
+            order = values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+        except TypeError:
+            # Columns mixing numbers and text are sorted as text
+            order = values.astype('string').sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+        rows = rows[order]
+
+    page_count = max(1, -(-len(rows) // page_size))
+    start = (min(max(page, 1), page_count) - 1) * page_size
+    return df.iloc[rows[start:start + page_size]], len(rows)
@@ -0,0 +1,87 @@
+"""Background parsing of uploaded SBD workbooks.
+
+An uploaded workbook is streamed, matched to its questionnaire version and
+extracted batch by batch in a worker thread, so the dashboard keeps showing
+the current dataset and only polls the job for progress. A finished job
+holds the whole new dataset, which the dashboard swaps in with a single
+assignment. Jobs are shared by content, so sessions uploading the same
+workbook parse it once and hold the same read-only frames.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from sbd.extract import read_workbook
+
+# Worker threads shared by every session of the server process
+_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sbd-upload")
+
+# Most recent upload jobs kept for sharing by content version; sessions keep their own reference
+MAX_SHARED_UPLOADS = 4
+
+_JOBS = OrderedDict()
+_JOBS_LOCK = threading.Lock()
+
+
+def _no_progress(fraction, message):
+    pass
+
+
+def parse_workbook(data, progress=None):
+    """Parse workbook bytes into ``(original_sample, schema, extracted_df)``
+
+    The workbook is streamed in row batches; ``progress(fraction, message)``
+    is called after each batch with a ``None`` fraction, since the number
+    of rows is only known at the end, and with 1.0 when parsing is done.
+    """
+    if progress is None:
+        progress = _no_progress
+
+    def rows_parsed(rows):
+        progress(None, f"Parsed {rows:,} rows...")
+
+    progress(None, "Reading workbook...")
+    original_sample, extracted_df, schema = read_workbook(io.BytesIO(data), progress=rows_parsed)
+    progress(1.0, f"Parsed {len(extracted_df):,} submissions")
+    return original_sample, schema, extracted_df
+
+
+def start_upload(name, data):
+    """Start parsing an uploaded workbook in the background and return its job
+
+    The job is a dict with the file ``name``, a content hash ``version``,
+    the latest ``progress`` fraction and ``message``, and the ``future``.
+    A workbook already parsed or being parsed for another session is not
+    parsed again; that job, with the name it was first uploaded under, is
+    returned instead.
+    """
+    version = hashlib.md5(data).hexdigest()[:12]
+    with _JOBS_LOCK:
+        job = _JOBS.get(version)
+        if job is not None and not (job['future'].done() and job['future'].exception() is not None):
+            _JOBS.move_to_end(version)
+            return job
+
+        job = {'name': name, 'version': version, 'progress': 0.0, 'message': "Waiting..."}
+
+        def progress(fraction, message):
+            job['progress'], job['message'] = fraction, message
+
+        job['future'] = _EXECUTOR.submit(parse_workbook, data, progress)
+        _JOBS[version] = job
+        while len(_JOBS) > MAX_SHARED_UPLOADS:
+            _JOBS.popitem(last=False)
+    return job
+
+
+def upload_result(job):
+    """The parsed dataset of a finished job, or None while it is still running
+
+    Errors raised while parsing, such as an unknown questionnaire version
+    or a file that is not a workbook, are raised again here.
+    """
+    if not job['future'].done():
+        return None
+    return job['future'].result()
@@ -0,0 +1,117 @@
+"""Cache warm-up, so the first visitor after a deploy or restart gets a warm dashboard.
+
+Rendering the charts and maps is the slowest part of a cold dashboard. Run
+once after a deploy, from the dashboard's working directory:
+
+    python -m sbd.warmup "sbd_1019 (1).xlsx" --merged
+
+Every chart and map of each workbook is rendered into the artifact store,
+where the dashboard reads them instead of drawing them again, and dataset
+folders no longer used are deleted. Workbook paths are part of the dataset
+version, so they must be given as the dashboard opens them. The dashboard also starts this warm-up for its default workbook,
+in a low-priority process, as soon as it runs in a new server process, and
+fills its in-memory workbook, shapefile and aggregate caches in a background
+thread.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from sbd.artifacts import artifact_path, dataset_folder, prune_artifacts, write_atomic
+from sbd.charts import figure_png
+from sbd.dedup import deduplicate
+from sbd.extract import read_workbook
+from sbd.figures import dashboard_specs
+from sbd.names import shapefile_names
+from sbd.spatial import chiefdom_aggregate, grid_aggregate, join_chiefdom_metrics, school_points
+from sbd.summaries import aggregate, district_analysis, generate_summaries
+
+# Workbook the dashboard opens until a newer one is uploaded
+DEFAULT_WORKBOOK = "sbd_1019 (1).xlsx"
+
+
+def workbook_key(path):
+    """Cache key of a workbook version, as used by the dashboard"""
+    return (path, os.path.getmtime(path))
+
+
+def warm_charts(dataset_key, extracted_df, gdf=None, boundaries=None):
+    """Render every dashboard chart of a dataset version that is not in the artifact store yet
+
+    Returns the number of charts rendered and the number of charts.
+    """
+    districts, aggregates, joined = None, None, None
+    if gdf is not None:
+        names = shapefile_names(extracted_df, gdf)
+        districts = names['District']
+        points = school_points(extracted_df)
+        aggregates = (grid_aggregate(points), chiefdom_aggregate(points, gdf))
+        joined = join_chiefdom_metrics(gdf, aggregate(extracted_df.assign(**names), ['District', 'Chiefdom']))
+    specs = dashboard_specs(extracted_df, generate_summaries(extracted_df), district_analysis(extracted_df), gdf,
+                            boundaries, districts, aggregates, joined)
+
+    rendered = 0
+    for filename_prefix, build in specs.values():
+        path = artifact_path(dataset_key, filename_prefix)
+        if not os.path.exists(path):
+            write_atomic(path, figure_png(build()))
+            rendered += 1
+    return rendered, len(specs)
+
+
+def render_in_background(workbook):
+    """Start the chart warm-up of a workbook in a low-priority process and return the process
+
+    Rendering in another process leaves the dashboard's interpreter, and
+    where processes have a niceness most of the CPU, to its visitors. The
+    caller has to ``wait()`` for the process so it does not linger.
+    """
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package_root, os.environ.get('PYTHONPATH')])))
+    process = subprocess.Popen([sys.executable, '-m', 'sbd.warmup', workbook], env=env)
+    # Lowered from here rather than in the child before exec, which is unsafe in a threaded server
+    if hasattr(os, 'setpriority'):
+        try:
+            os.setpriority(os.PRIO_PROCESS, process.pid, 19)
+        except OSError:
+            pass
+    return process
+
+
+def main(argv=None):
+    from sbd.cli import DEFAULT_SHAPEFILE
+
+    parser = argparse.ArgumentParser(description="Render the dashboard charts ahead of the first visitor.")
+    parser.add_argument('workbooks', nargs='*', default=[DEFAULT_WORKBOOK],
+                        help="SBD workbooks, as the dashboard opens them (default: %(default)s)")
+    parser.add_argument('--shapefile', default=DEFAULT_SHAPEFILE, help="chiefdom shapefile for the maps; pass '' to skip maps")
+    parser.add_argument('--merged', action='store_true', help="also warm the versions with duplicate submissions merged")
+    args = parser.parse_args(argv)
+
+    gdf, boundaries = None, None
+    if args.shapefile:
+        import geopandas as gpd
+        from sbd.maps import add_label_points, district_boundaries
+
+        gdf = add_label_points(gpd.read_file(args.shapefile))
+        boundaries = district_boundaries(gdf) if 'FIRST_DNAM' in gdf.columns else None
+
+    for path in args.workbooks:
+        key = workbook_key(path)
+        _, extracted_df, _ = read_workbook(path)
+        versions = [(key, extracted_df)]
+        if args.merged:
+            versions.append((key + ("merged",), deduplicate(extracted_df)))
+        for version_key, df in versions:
+            rendered, total = warm_charts(version_key, df, gdf, boundaries)
+            print(f"{path}{' (merged)' if len(version_key) > 2 else ''}: {rendered} of {total} charts rendered "
+                  f"into {dataset_folder(version_key)}")
+    pruned = prune_artifacts()
+    if pruned:
+        print(f"{pruned} unused dataset folders deleted")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
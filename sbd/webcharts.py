@@ -0,0 +1,123 @@
+"""Interactive Altair versions of the dashboard charts, drawn in the browser.
+
+Each chart takes the same arguments as the matplotlib chart it replaces in
+``sbd.charts``, but only its small aggregate table is sent to the browser,
+where Vega-Lite draws it, instead of a 300 dpi PNG rendered on the server.
+The matplotlib charts are still used for the Word report and the batch CLI.
+"""
+import pandas as pd
+
+from sbd.charts import (
+    CHIEFDOM_CHARTS, chiefdom_bars, distribution_pie, district_share_pie, enrollment_analysis, gender_by_district,
+    gender_pie
+)
+
+GENDER_COLORS = {'Boys': '#4A90E2', 'Girls': '#F39C12'}
+
+
+def _pie(data, category, value, title, colors):
+    """Pie chart of ``value`` by ``category`` with the share of each slice in its tooltip"""
+    import altair as alt
+
+    data = data.assign(Share=data[value] / data[value].sum())
+    return alt.Chart(data, title=title).mark_arc(stroke='white').encode(
+        theta=alt.Theta(f'{value}:Q'),
+        color=alt.Color(f'{category}:N', sort=None, scale=alt.Scale(domain=list(data[category]), range=colors)),
+        tooltip=[f'{category}:N', alt.Tooltip(f'{value}:Q', format=','), alt.Tooltip('Share:Q', format='.1%')],
+    ).properties(height=400)
+
+
+def _grouped_bars(data, categories, title, y_title, colors):
+    """Bars of each district grouped side by side by ``Measure``, in ``categories`` order"""
+    import altair as alt
+
+    return alt.Chart(data, title=title).mark_bar().encode(
+        x=alt.X('District:N', sort=None, title='Districts', axis=alt.Axis(labelAngle=-45)),
+        xOffset=alt.XOffset('Measure:N', sort=categories),
+        y=alt.Y('Value:Q', title=y_title),
+        color=alt.Color('Measure:N', sort=categories, scale=alt.Scale(domain=categories, range=colors), title=None),
+        tooltip=['District:N', 'Measure:N', alt.Tooltip('Value:Q', format=',')],
+    ).properties(height=450)
+
+
+def gender_pie_chart(overall_summary):
+    """Overall gender distribution pie chart"""
+    data = pd.DataFrame({'Gender': list(GENDER_COLORS),
+                         'Students': [overall_summary['total_boys'], overall_summary['total_girls']]})
+    return _pie(data, 'Gender', 'Students', 'Overall Gender Distribution', list(GENDER_COLORS.values()))
+
+
+def gender_by_district_chart(district_summary):
+    """Grouped bar chart of boys and girls by district"""
+    data = pd.DataFrame([
+        {'District': d['district'], 'Measure': gender, 'Value': d[gender.lower()]}
+        for d in district_summary for gender in GENDER_COLORS
+    ], columns=['District', 'Measure', 'Value'])
+    return _grouped_bars(data, list(GENDER_COLORS), 'Gender Distribution by District', 'Number of Students',
+                         list(GENDER_COLORS.values()))
+
+
+def enrollment_analysis_chart(district_df):
+    """Enrollment vs distributed vs remaining ITNs by district"""
+    measures = {'Total_Enrollment': 'Total Enrollment', 'Total_ITN': 'ITNs Distributed (Boys + Girls)',
+                'ITN_Remaining': 'ITNs Remaining'}
+    data = (district_df[['District'] + list(measures)].rename(columns=measures)
+            .melt(id_vars='District', var_name='Measure', value_name='Value'))
+    return _grouped_bars(data, list(measures.values()), 'District Analysis: Enrollment vs ITN Distribution',
+                         'Number of Students/ITNs', ['#47B5FF', 'lightcoral', 'hotpink'])
+
+
+def distribution_pie_chart(district_df):
+    """Overall ITNs distributed vs remaining pie chart"""
+    data = pd.DataFrame({'Status': ['ITNs Distributed', 'ITNs Remaining'],
+                         'ITNs': [district_df['Total_ITN'].sum(), district_df['ITN_Remaining'].sum()]})
+    title = f"Overall ITN Distribution Status - Total Enrollment: {district_df['Total_Enrollment'].sum():,}"
+    return _pie(data, 'Status', 'ITNs', title, ['lightcoral', 'hotpink'])
+
+
+def district_share_pie_chart(district_df, column, title, colors):
+    """Pie chart of each district's share of a measure, skipping zero districts"""
+    data = district_df.loc[district_df[column] > 0, ['District', column]]
+    return _pie(data, 'District', column, title, colors)
+
+
+def chiefdom_bars_chart(district, district_chiefdom_df, chart):
+    """Horizontal bar chart of one measure across a district's chiefdoms"""
+    import altair as alt
+
+    column, title, xlabel, color, edgecolor = CHIEFDOM_CHARTS[chart]
+    data = district_chiefdom_df[['Chiefdom', column]]
+    value_format = '.1f' if chart == 'coverage' else ','
+    base = alt.Chart(data, title=f'{district} District - {title}').encode(
+        y=alt.Y('Chiefdom:N', sort=None, title='Chiefdoms'),
+        x=alt.X(f'{column}:Q', title=xlabel),
+        tooltip=['Chiefdom:N', alt.Tooltip(f'{column}:Q', format=value_format)],
+    )
+    bars = base.mark_bar(color=color, stroke=edgecolor, strokeWidth=1.5)
+    labels = base.mark_text(align='left', dx=4, fontWeight='bold').encode(
+        text=alt.Text(f'{column}:Q', format=value_format)
+    ).transform_filter(f"datum['{column}'] > 0")
+    return (bars + labels).properties(height=max(250, 28 * len(data)))
+
+
+# Browser version of each matplotlib chart builder
+WEB_CHARTS = {
+    gender_pie: gender_pie_chart,
+    gender_by_district: gender_by_district_chart,
+    enrollment_analysis: enrollment_analysis_chart,
+    distribution_pie: distribution_pie_chart,
+    district_share_pie: district_share_pie_chart,
+    chiefdom_bars: chiefdom_bars_chart,
+}
+
+
+def web_chart(build):
+    """The Altair chart for a ``sbd.figures`` figure builder, or None if it has no browser version
+
+    ``build`` is the ``functools.partial`` of a chart spec; the browser
+    version is called with the same arguments.
+    """
+    web_builder = WEB_CHARTS.get(getattr(build, 'func', None))
+    if web_builder is None:
+        return None
+    return web_builder(*build.args, **build.keywords)
@@ -0,0 +1,53 @@
+"""Interactive WebGL school map drawn in the browser with pydeck (deck.gl).
+
+Only the frame from ``sbd.spatial.school_points`` is sent to the browser:
+the valid school coordinates, rounded, and a few short attributes. deck.gl
+does the hexagon or grid aggregation and the drawing on the client, so the
+server cost does not grow with the number of points on screen.
+"""
+# Initial view over Sierra Leone
+SIERRA_LEONE_VIEW = {'latitude': 8.5, 'longitude': -11.8, 'zoom': 6.5, 'pitch': 40}
+
+# Map layer choices offered in the dashboard
+LAYER_TYPES = ["Hexagons", "Grid", "Schools"]
+
+
+def school_deck(points, layer_type="Hexagons", cell_size=2000):
+    """Build the pydeck map of school points; ``cell_size`` is the bin size in metres"""
+    import pydeck as pdk
+
+    if layer_type == "Schools":
+        layer = pdk.Layer(
+            "ScatterplotLayer",
+            data=points,
+            get_position=['lon', 'lat'],
+            get_fill_color=[71, 181, 255, 200],
+            get_line_color=[255, 255, 255],
+            line_width_min_pixels=1,
+            stroked=True,
+            radius_min_pixels=3,
+            radius_max_pixels=12,
+            get_radius=150,
+            pickable=True,
+        )
+        tooltip = {"text": "{school}\n{district}\nEnrollment: {enrollment}\nITNs: {itn}"}
+    else:
+        layer = pdk.Layer(
+            "HexagonLayer" if layer_type == "Hexagons" else "GridLayer",
+            data=points,
+            get_position=['lon', 'lat'],
+            radius=cell_size,
+            cell_size=cell_size,
+            elevation_scale=20,
+            extruded=True,
+            coverage=0.9,
+            pickable=True,
+        )
+        tooltip = {"text": "{elevationValue} schools"}
+
+    return pdk.Deck(
+        layers=[layer],
+        initial_view_state=pdk.ViewState(**SIERRA_LEONE_VIEW),
+        map_style="light",
+        tooltip=tooltip,
+    )
@@ -2,13 +2,19 @@
 
 import streamlit as st
 import pandas as pd
-import re
 import numpy as np
 import matplotlib.pyplot as plt
 import geopandas as gpd
 from io import BytesIO
 import base64
 
+from sbd.extract import QR_FIELDS, build_extracted
+from sbd.schema import resolve_schema
+from sbd.summaries import aggregate, generate_summaries
+
+# QR code fields, including the enrollment figure encoded on revised QR codes
+qr_fields = {**QR_FIELDS, "Enrollment": r"(?i)Enrollment:\s*([^\n]+)"}
+
 # Custom CSS with blue and white theme and zoom functionality
 st.markdown("""
 <style>
@@ -173,145 +179,6 @@ def save_map_as_png(fig, filename_prefix):
     
     return buffer
 
-# Function to generate comprehensive summaries
-def generate_summaries(df):
-    """Generate District, Chiefdom, and Gender summaries"""
-    summaries = {}
-    
-    # Overall Summary
-    overall_summary = {
-        'total_schools': len(df),
-        'total_districts': len(df['District'].dropna().unique()),
-        'total_chiefdoms': len(df['Chiefdom'].dropna().unique()),
-        'total_boys': 0,
-        'total_girls': 0,
-        'total_enrollment': 0,
-        'total_itn': 0,
-        'total_left': 0
-    }
-    
-    # Calculate totals using the correct columns
-    for class_num in range(1, 6):
-        # Total enrollment from "Number of enrollments in class X"
-        enrollment_col = f"How many pupils are enrolled in Class {class_num}?"
-        if enrollment_col in df.columns:
-            overall_summary['total_enrollment'] += int(df[enrollment_col].fillna(0).sum())
-        
-        # Boys and girls for gender analysis AND ITN calculation
-        boys_col = f"How many boys in Class {class_num} received ITNs?"
-        girls_col = f"How many girls in Class {class_num} received ITNs?"
-        itn_left_col = f"ITNs left at the school for pupils who were absent."
-        
-        if boys_col in df.columns:
-            overall_summary['total_boys'] += int(df[boys_col].fillna(0).sum())
-        if girls_col in df.columns:
-            overall_summary['total_girls'] += int(df[girls_col].fillna(0).sum())
-        if itn_left_col in df.columns:
-            overall_summary['total_left'] += int(df[itn_left_col].fillna(0).sum())
-    
-    # Total ITNs = boys + girls (actual beneficiaries)
-    overall_summary['total_itn'] = overall_summary['total_boys'] + overall_summary['total_girls'] + overall_summary['total_left']
-    
-    # Calculate coverage
-    overall_summary['coverage'] = (overall_summary['total_itn'] / overall_summary['total_enrollment'] * 100) if overall_summary['total_enrollment'] > 0 else 0
-    overall_summary['itn_remaining'] = overall_summary['total_enrollment'] - overall_summary['total_itn']
-    
-    summaries['overall'] = overall_summary
-    
-    # District Summary
-    district_summary = []
-    for district in df['District'].dropna().unique():
-        district_data = df[df['District'] == district]
-        district_stats = {
-            'district': district,
-            'schools': len(district_data),
-            'chiefdoms': len(district_data['Chiefdom'].dropna().unique()),
-            'boys': 0,
-            'girls': 0,
-            'enrollment': 0,
-            'itn': 0,
-            'left': 0
-        }
-        
-        for class_num in range(1, 6):
-            # Total enrollment from "Number of enrollments in class X"
-            enrollment_col = f"How many pupils are enrolled in Class {class_num}?"
-            if enrollment_col in district_data.columns:
-                district_stats['enrollment'] += int(district_data[enrollment_col].fillna(0).sum())
-            
-            # Boys and girls for gender analysis AND ITN calculation
-            boys_col = f"How many boys in Class {class_num} received ITNs?"
-            girls_col = f"How many girls in Class {class_num} received ITNs?"
-            itn_left_col = f"ITNs left at the school for pupils who were absent."
-            
-            if boys_col in district_data.columns:
-                district_stats['boys'] += int(district_data[boys_col].fillna(0).sum())
-            if girls_col in district_data.columns:
-                district_stats['girls'] += int(district_data[girls_col].fillna(0).sum())
-                
-            if itn_left_col in district_data.columns:
-                district_stats['left'] += int(district_data[itn_left_col].fillna(0).sum())
-        
-        # Total ITNs = boys + girls (actual beneficiaries)
-        district_stats['itn'] = district_stats['boys'] + district_stats['girls'] + district_stats['left']
-        
-        # Calculate coverage
-        district_stats['coverage'] = (district_stats['itn'] / district_stats['enrollment'] * 100) if district_stats['enrollment'] > 0 else 0
-        district_stats['itn_remaining'] = district_stats['enrollment'] - district_stats['itn']
-        
-        district_summary.append(district_stats)
-    
-    summaries['district'] = district_summary
-    
-    # Chiefdom Summary
-    chiefdom_summary = []
-    for district in df['District'].dropna().unique():
-        district_data = df[df['District'] == district]
-        for chiefdom in district_data['Chiefdom'].dropna().unique():
-            chiefdom_data = district_data[district_data['Chiefdom'] == chiefdom]
-            chiefdom_stats = {
-                'district': district,
-                'chiefdom': chiefdom,
-                'schools': len(chiefdom_data),
-                'boys': 0,
-                'girls': 0,
-                'enrollment': 0,
-                'itn': 0,
-                'left': 0
-            }
-            
-            for class_num in range(1, 6):
-                # Total enrollment from "Number of enrollments in class X"
-                enrollment_col = f"How many pupils are enrolled in Class {class_num}?"
-                if enrollment_col in chiefdom_data.columns:
-                    chiefdom_stats['enrollment'] += int(chiefdom_data[enrollment_col].fillna(0).sum())
-                
-                # Boys and girls for gender analysis AND ITN calculation
-                boys_col = f"How many boys in Class {class_num} received ITNs?"
-                girls_col = f"How many girls in Class {class_num} received ITNs?"
-                itn_left_col = f"ITNs left at the school for pupils who were absent."
-                
-                if boys_col in chiefdom_data.columns:
-                    chiefdom_stats['boys'] += int(chiefdom_data[boys_col].fillna(0).sum())
-                if girls_col in chiefdom_data.columns:
-                    chiefdom_stats['girls'] += int(chiefdom_data[girls_col].fillna(0).sum())
-
-                if itn_left_col in chiefdom_data.columns:
-                    chiefdom_stats['left'] += int(chiefdom_data[itn_left_col].fillna(0).sum())
-            
-            # Total ITNs = boys + girls + left (actual beneficiaries)
-            chiefdom_stats['itn'] = chiefdom_stats['boys'] + chiefdom_stats['girls'] + chiefdom_stats['left']
-            
-            # Calculate coverage
-            chiefdom_stats['coverage'] = (chiefdom_stats['itn'] / chiefdom_stats['enrollment'] * 100) if chiefdom_stats['enrollment'] > 0 else 0
-            chiefdom_stats['itn_remaining'] = chiefdom_stats['enrollment'] - chiefdom_stats['itn']
-            
-            chiefdom_summary.append(chiefdom_stats)
-    
-    summaries['chiefdom'] = chiefdom_summary
-    
-    return summaries
-
 ### Part 2-----------------------------------------------------------------------------------------------------------------
 
 # Logo Section - Clean 4 Logo Layout
@@ -384,6 +251,13 @@ if uploaded_file:
     # Read the uploaded Excel file
     df_original = pd.read_excel(uploaded_file)
     
+    # Detect the questionnaire version once and resolve its columns
+    try:
+        schema = resolve_schema(df_original.columns)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        st.stop()
+    
     # Load shapefile
     try:
         gdf = gpd.read_file("Chiefdom2021.shp")
@@ -392,55 +266,8 @@ if uploaded_file:
         st.error(f"❌ Could not load shapefile: {e}")
         gdf = None
     
-    # Create empty lists to store extracted data
-    districts, chiefdoms, phu_names, community_names, school_names, enrollments = [], [], [], [], [], []
-    
-    # Process each row in the "Scan QR code" column
-    for qr_text in df_original["Scan QR code"]:
-        if pd.isna(qr_text):
-            districts.append(None)
-            chiefdoms.append(None)
-            phu_names.append(None)
-            community_names.append(None)
-            school_names.append(None)
-            enrollments.append(None)
-            
-            continue
-            
-        # Extract values using regex patterns
-        district_match = re.search(r"District:\s*([^\n]+)", str(qr_text))
-        districts.append(district_match.group(1).strip() if district_match else None)
-        
-        chiefdom_match = re.search(r"Chiefdom:\s*([^\n]+)", str(qr_text))
-        chiefdoms.append(chiefdom_match.group(1).strip() if chiefdom_match else None)
-        
-        phu_match = re.search(r"PHU name:\s*([^\n]+)", str(qr_text))
-        phu_names.append(phu_match.group(1).strip() if phu_match else None)
-        
-        community_match = re.search(r"Community name:\s*([^\n]+)", str(qr_text))
-        community_names.append(community_match.group(1).strip() if community_match else None)
-        
-        school_match = re.search(r"Name of school:\s*([^\n]+)", str(qr_text))
-        school_names.append(school_match.group(1).strip() if school_match else None)
-
-        # Extract enrollment as text or number
-        enrollment_match = re.search(r"Enrollment:\s*([^\n]+)", qr_text, re.IGNORECASE)
-        enrollments.append(enrollment_match.group(1).strip() if enrollment_match else None)
-        
-    # Create a new DataFrame with extracted values
-    extracted_df = pd.DataFrame({
-        "District": districts,
-        "Chiefdom": chiefdoms,
-        "PHU Name": phu_names,
-        "Community Name": community_names,
-        "School Name": school_names,
-        "Enrollment": enrollments
-    })
-    
-    # Add all other columns from the original DataFrame
-    for column in df_original.columns:
-        if column != "Scan QR code":  # Skip the QR code column since we've already processed it
-            extracted_df[column] = df_original[column]
+    # Extract QR code fields and add the canonical measures
+    extracted_df = build_extracted(df_original, schema, fields=qr_fields, include_left=True)
     
     # Create sidebar filters early so they're available for all sections
     st.sidebar.header("Filter Options")
@@ -963,43 +790,12 @@ if uploaded_file:
     st.subheader("📊 Enrollment and ITN Distribution Analysis")
     
     # Calculate total enrollment and ITN distribution by district
-    district_analysis = []
-    
-    for district in extracted_df['District'].dropna().unique():
-        district_data = extracted_df[extracted_df['District'] == district]
-        
-        total_enrollment = 0
-        total_boys = 0
-        total_girls = 0
-        
-        # Sum enrollments and boys/girls by class using correct columns
-        for class_num in range(1, 6):
-            # Use "Number of enrollments in class X" for total students
-            enrollment_col = f"How many pupils are enrolled in Class {class_num}?"
-            if enrollment_col in district_data.columns:
-                total_enrollment += int(district_data[enrollment_col].fillna(0).sum())
-            
-            # Use boys + girls for total ITNs (actual beneficiaries)
-            boys_col = f"How many boys in Class {class_num} received ITNs?"
-            girls_col = f"How many girls in Class {class_num} received ITNs?"
-            if boys_col in district_data.columns:
-                total_boys += int(district_data[boys_col].fillna(0).sum())
-            if girls_col in district_data.columns:
-                total_girls += int(district_data[girls_col].fillna(0).sum())
-        
-        total_itn = total_boys + total_girls  # Total ITNs = boys + girls
-        itn_remaining = total_enrollment - total_itn  # Remaining = enrollment - distributed
-        coverage = (total_itn / total_enrollment * 100) if total_enrollment > 0 else 0
-        
-        district_analysis.append({
-            'District': district,
-            'Total_Enrollment': total_enrollment,
-            'Total_ITN': total_itn,
-            'ITN_Remaining': itn_remaining,
-            'Coverage': coverage
-        })
-    
-    district_df = pd.DataFrame(district_analysis)
+    district_df = aggregate(extracted_df, ['District']).rename(columns={
+        'enrollment': 'Total_Enrollment',
+        'itn': 'Total_ITN',
+        'itn_remaining': 'ITN_Remaining',
+        'coverage': 'Coverage'
+    })[['District', 'Total_Enrollment', 'Total_ITN', 'ITN_Remaining', 'Coverage']]
     
     # Create enhanced bar chart with enrollment, distributed, and remaining
     fig_enhanced, ax_enhanced = plt.subplots(figsize=(16, 8))
@@ -1172,40 +968,11 @@ if uploaded_file:
         
         if len(district_chiefdoms) > 0:
             # Calculate by chiefdom for this district
-            district_chiefdom_analysis = []
-            
-            for chiefdom in district_chiefdoms:
-                chiefdom_data = district_data[district_data['Chiefdom'] == chiefdom]
-                
-                total_enrollment = 0
-                total_boys = 0
-                total_girls = 0
-                
-                for class_num in range(1, 6):
-                    # Use "Number of enrollments in class X" for total students
-                    enrollment_col = f"How many pupils are enrolled in Class {class_num}?"
-                    if enrollment_col in chiefdom_data.columns:
-                        total_enrollment += int(chiefdom_data[enrollment_col].fillna(0).sum())
-                    
-                    # Use boys + girls for total ITNs (actual beneficiaries)
-                    boys_col = f"How many boys in Class {class_num} received ITNs?"
-                    girls_col = f"How many girls in Class {class_num} received ITNs?"
-                    if boys_col in chiefdom_data.columns:
-                        total_boys += int(chiefdom_data[boys_col].fillna(0).sum())
-                    if girls_col in chiefdom_data.columns:
-                        total_girls += int(chiefdom_data[girls_col].fillna(0).sum())
-                
-                total_itn = total_boys + total_girls  # Total ITNs = boys + girls
-                coverage = (total_itn / total_enrollment * 100) if total_enrollment > 0 else 0
-                
-                district_chiefdom_analysis.append({
-                    'Chiefdom': chiefdom,
-                    'Total_Enrollment': total_enrollment,
-                    'Total_ITN': total_itn,
-                    'Coverage': coverage
-                })
-            
-            district_chiefdom_df = pd.DataFrame(district_chiefdom_analysis)
+            district_chiefdom_df = aggregate(district_data, ['Chiefdom']).rename(columns={
+                'enrollment': 'Total_Enrollment',
+                'itn': 'Total_ITN',
+                'coverage': 'Coverage'
+            })[['Chiefdom', 'Total_Enrollment', 'Total_ITN', 'Coverage']]
             district_chiefdom_df = district_chiefdom_df.sort_values('Total_Enrollment', ascending=False)
             
             if len(district_chiefdom_df) > 0:
@@ -1316,30 +1083,13 @@ if uploaded_file:
         st.subheader("📈 Summary by District")
         
         # Create aggregation dictionary
-        agg_dict = {}
-        
-        # Add enrollment columns to aggregation
-        for class_num in range(1, 6):
-            total_col = f"How many pupils are enrolled in Class {class_num}?"
-            boys_col = f"How many boys in Class {class_num} received ITNs?"
-            girls_col = f"How many girls in Class {class_num} received ITNs?"
-            
-            if total_col in extracted_df.columns:
-                agg_dict[total_col] = "sum"
-            if boys_col in extracted_df.columns:
-                agg_dict[boys_col] = "sum"
-            if girls_col in extracted_df.columns:
-                agg_dict[girls_col] = "sum"
+        agg_dict = {col: "sum" for col in schema['class_columns']}
         
         # Group by District and aggregate
         district_summary = extracted_df.groupby("District").agg(agg_dict).reset_index()
         
         # Calculate total enrollment
-        district_summary["Total Enrollment"] = 0
-        for class_num in range(1, 6):
-            total_col = f"How many pupils are enrolled in Class {class_num}?"
-            if total_col in district_summary.columns:
-                district_summary["Total Enrollment"] += district_summary[total_col]
+        district_summary["Total Enrollment"] = district_summary[schema['enrollment']].sum(axis=1)
         
         # Display summary table
         st.dataframe(district_summary)
@@ -1368,30 +1118,13 @@ if uploaded_file:
         st.subheader("📈 Summary by Chiefdom")
         
         # Create aggregation dictionary
-        agg_dict = {}
-        
-        # Add enrollment columns to aggregation
-        for class_num in range(1, 6):
-            total_col = f"How many pupils are enrolled in Class {class_num}?"
-            boys_col = f"How many boys in Class {class_num} received ITNs?"
-            girls_col = f"How many girls in Class {class_num} received ITNs?"
-            
-            if total_col in extracted_df.columns:
-                agg_dict[total_col] = "sum"
-            if boys_col in extracted_df.columns:
-                agg_dict[boys_col] = "sum"
-            if girls_col in extracted_df.columns:
-                agg_dict[girls_col] = "sum"
+        agg_dict = {col: "sum" for col in schema['class_columns']}
         
         # Group by District and Chiefdom and aggregate
         chiefdom_summary = extracted_df.groupby(["District", "Chiefdom"]).agg(agg_dict).reset_index()
         
         # Calculate total enrollment
-        chiefdom_summary["Total Enrollment"] = 0
-        for class_num in range(1, 6):
-            total_col = f"How many pupils are enrolled in Class {class_num}?"
-            if total_col in chiefdom_summary.columns:
-                chiefdom_summary["Total Enrollment"] += chiefdom_summary[total_col]
+        chiefdom_summary["Total Enrollment"] = chiefdom_summary[schema['enrollment']].sum(axis=1)
         
         # Display summary table
         st.dataframe(chiefdom_summary)
@@ -1455,22 +1188,8 @@ if uploaded_file:
                 group_data = filtered_df[filtered_df[group_columns[0]] == group_value]
                 
                 # Calculate enrollment from raw data
-                total_enrollment = 0
-                total_itns = 0
-                
-                for class_num in range(1, 6):
-                    # Enrollment columns
-                    enrollment_col = f"How many pupils are enrolled in Class {class_num}?"
-                    if enrollment_col in group_data.columns:
-                        total_enrollment += int(group_data[enrollment_col].fillna(0).sum())
-                    
-                    # ITN columns
-                    boys_col = f"How many boys in Class {class_num} received ITNs?"
-                    girls_col = f"How many girls in Class {class_num} received ITNs?"
-                    if boys_col in group_data.columns:
-                        total_itns += int(group_data[boys_col].fillna(0).sum())
-                    if girls_col in group_data.columns:
-                        total_itns += int(group_data[girls_col].fillna(0).sum())
+                total_enrollment = int(group_data['enrollment'].sum())
+                total_itns = int(group_data['itn'].sum())
                 
                 summary_data.append({
                     group_columns[0]: group_value,
@@ -1490,22 +1209,8 @@ if uploaded_file:
                 group_data = filtered_df[filter_condition]
                 
                 # Calculate enrollment from raw data
-                total_enrollment = 0
-                total_itns = 0
-                
-                for class_num in range(1, 6):
-                    # Enrollment columns
-                    enrollment_col = f"How many pupils are enrolled in Class {class_num}?"
-                    if enrollment_col in group_data.columns:
-                        total_enrollment += int(group_data[enrollment_col].fillna(0).sum())
-                    
-                    # ITN columns
-                    boys_col = f"How many boys in Class {class_num} received ITNs?"
-                    girls_col = f"How many girls in Class {class_num} received ITNs?"
-                    if boys_col in group_data.columns:
-                        total_itns += int(group_data[boys_col].fillna(0).sum())
-                    if girls_col in group_data.columns:
-                        total_itns += int(group_data[girls_col].fillna(0).sum())
+                total_enrollment = int(group_data['enrollment'].sum())
+                total_itns = int(group_data['itn'].sum())
                 
                 # Create summary row
                 summary_row = {}
@@ -2,12 +2,34 @@
 
 import streamlit as st
 import pandas as pd
-import re
-import numpy as np
-import matplotlib.pyplot as plt
-import geopandas as gpd
-from io import BytesIO
 import base64
+import os
+import threading
+from io import BytesIO
+
+from sbd.artifacts import artifact_path, dataset_folder, read_artifact, save_artifact, wait_for_artifacts
+from sbd.charts import figure_png, new_figure
+from sbd.dedup import canonical_schools, deduplicate, find_duplicates
+from sbd.extract import parse_gps, read_workbook
+from sbd.figures import (
+    MAP_DISTRICTS, chart_specs, chiefdom_specs, choropleth_specs, map_specs, overview_specs, summary_specs
+)
+from sbd.names import shapefile_names
+from sbd.profiling import append_log, performance_table, stage, start_memory_tracing, stop_memory_tracing
+from sbd.report import build_word_report, excel_bytes
+from sbd.snapshots import daily_progress, build_store, find_snapshots
+from sbd.summaries import aggregate, chiefdom_analysis, district_analysis, generate_summaries, rollup
+from sbd.spatial import MEASURE_LABELS, chiefdom_aggregate, grid_aggregate, join_chiefdom_metrics, school_points
+from sbd.uploads import start_upload, upload_result
+from sbd.tables import PAGE_SIZES, page_rows, search_index
+from sbd.webcharts import web_chart
+from sbd.warmup import DEFAULT_WORKBOOK, render_in_background, workbook_key
+from sbd.webmap import LAYER_TYPES, school_deck
+
+# The cached frames are shared by every session, so frames derived from them must never write through to them;
+# pandas 3 always works this way
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
 
 # Custom CSS with blue and white theme and zoom functionality
 st.markdown("""
@@ -161,139 +183,349 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Function to save maps as PNG and return BytesIO object
-def save_map_as_png(fig, filename_prefix):
-    """Save matplotlib figure as PNG and return BytesIO object"""
-    buffer = BytesIO()
-    fig.savefig(buffer, format='png', dpi=300, bbox_inches='tight', facecolor='white', edgecolor='none')
-    buffer.seek(0)
-    
-    # Also save to disk for reference
-    fig.savefig(f"{filename_prefix}.png", format='png', dpi=300, bbox_inches='tight', facecolor='white', edgecolor='none')
-    
-    return buffer
+# Function to load the campaign progress table from all workbook snapshots
+@st.cache_resource(show_spinner="Loading workbook snapshots...")
+def load_campaign_progress(snapshot_paths, modified_times):
+    """Merge all snapshots and precompute daily progress by district (modified_times keys the cache)"""
+    return daily_progress(build_store(snapshot_paths))
+
+# Sections of the single-workbook dashboard; only the selected one is rendered
+SECTIONS = ["📊 Overview", "🗺️ Maps", "🏘️ Chiefdoms", "📈 Summary Reports", "🔍 Detailed Filtering", "📥 Export"]
+
+# Function to load and extract a workbook once per file version, shared by all sessions
+@st.cache_resource(show_spinner="Loading workbook...")
+def load_dataset(path, modified_time):
+    """Stream the workbook, resolve its questionnaire version and extract the QR fields (modified_time keys the cache)"""
+    original_sample, extracted_df, schema = read_workbook(path)
+    return original_sample, schema, extracted_df
+
+# Function to load the shapefile and its district outlines once per process
+@st.cache_resource(show_spinner="Loading shapefile...")
+def load_shapefile(path):
+    import geopandas as gpd
+    from sbd.maps import add_label_points, district_boundaries
+
+    gdf = add_label_points(gpd.read_file(path))
+    boundaries = district_boundaries(gdf) if 'FIRST_DNAM' in gdf.columns else None
+    return gdf, boundaries
+
+# Function to load the shapefile in the sections that draw on it, so other sections never import geopandas
+def shapefile_layers():
+    """The shapefile and its district outlines, or (None, None) if it cannot be read"""
+    with stage(perf_records, "shapefile_load"):
+        try:
+            gdf, boundaries = load_shapefile("Chiefdom2021.shp")
+            st.success("✅ Shapefile loaded successfully!")
+        except Exception as e:
+            st.error(f"❌ Could not load shapefile: {e}")
+            gdf, boundaries = None, None
+    return gdf, boundaries
+
+# Function to render a chart once per workbook version and artifact folder, shared by all sessions
+@st.cache_resource(show_spinner=False)
+def render_chart(dataset_key, folder, key, filename_prefix, _build):
+    """Return the chart's PNG bytes, drawing it and queueing it to be saved unless it is saved already
+
+    ``folder`` is the dataset's artifact folder, so a chart is looked up
+    again once the name index or shapefile change; _build is not hashed.
+    """
+    png = read_artifact(dataset_key, filename_prefix)
+    if png is None:
+        png = figure_png(_build())
+        save_artifact(dataset_key, filename_prefix, png)
+    return png
+
+# Function to show the progress of a background upload and switch to its dataset when it is parsed
+@st.fragment(run_every=1)
+def upload_progress():
+    job = st.session_state['upload_job']
+    try:
+        result = upload_result(job)
+    except Exception as e:
+        del st.session_state['upload_job']
+        st.session_state['upload_error'] = f"{job['name']}: {e}"
+        st.rerun()
+    if result is None:
+        # The row count of a streamed sheet is only known once it has been read
+        if job['progress'] is None:
+            st.caption(f"⏳ {job['name']}: {job['message']}")
+        else:
+            st.progress(job['progress'], text=f"{job['name']}: {job['message']}")
+        return
+    
+    # The new dataset replaces the current one in a single assignment
+    del st.session_state['upload_job']
+    st.session_state.pop('upload_error', None)
+    st.session_state['dataset'] = ((job['name'], job['version']), *result)
+    st.rerun()
+
+# Function to find repeated submissions of the same school once per workbook version
+@st.cache_resource(show_spinner="Checking for duplicate submissions...")
+def load_school_ids(dataset_key, _extracted_df):
+    return find_duplicates(_extracted_df)
+
+# Function to keep the latest submission of each school once per workbook version
+@st.cache_resource(show_spinner=False)
+def load_deduplicated(dataset_key, _extracted_df, _school_ids):
+    return deduplicate(_extracted_df, _school_ids)
+
+# Function to list each school with its submissions once per workbook version
+@st.cache_resource(show_spinner=False)
+def load_canonical_schools(dataset_key, _extracted_df, _school_ids):
+    return canonical_schools(_extracted_df, _school_ids)
+
+# Function to prepare the interactive map points once per workbook version
+@st.cache_resource(show_spinner=False)
+def load_school_points(dataset_key, _extracted_df):
+    return school_points(_extracted_df)
+
+# Function to aggregate school points into grid cells and chiefdoms once per workbook version
+@st.cache_resource(show_spinner="Aggregating school locations...")
+def load_spatial_aggregates(dataset_key, _extracted_df, _gdf):
+    points = school_points(_extracted_df)
+    return grid_aggregate(points), chiefdom_aggregate(points, _gdf)
+
+# Function to look up the shapefile spelling of the district and chiefdom names once per workbook version
+@st.cache_resource(show_spinner="Matching names to the shapefile...")
+def load_shapefile_names(dataset_key, _extracted_df, _gdf):
+    return shapefile_names(_extracted_df, _gdf)
+
+# Function to attach the chiefdom aggregates to the shapefile once per workbook version
+@st.cache_resource(show_spinner="Joining chiefdom data to the shapefile...")
+def load_chiefdom_choropleth(dataset_key, _extracted_df, _gdf):
+    names = load_shapefile_names(dataset_key, _extracted_df, _gdf)
+    return join_chiefdom_metrics(_gdf, aggregate(_extracted_df.assign(**names), ['District', 'Chiefdom']))
+
+def show_chart(dataset_key, key, specs):
+    """Display a chart from its spec, returning False when it is not available
+
+    In interactive chart mode charts with a browser version are sent as
+    their aggregate table and drawn by the browser; maps are always images.
+    """
+    if key not in specs:
+        return False
+    filename_prefix, build = specs[key]
+    chart = web_chart(build) if st.session_state.get('chart_mode') == "Interactive" else None
+    if chart is not None:
+        st.altair_chart(chart, use_container_width=True)
+    else:
+        st.image(render_chart(dataset_key, dataset_folder(dataset_key), key, filename_prefix, build))
+    return True
 
-# Function to generate comprehensive summaries
-def generate_summaries(df):
-    """Generate District, Chiefdom, and Gender summaries"""
-    summaries = {}
+# Function to build the search index of a table once per workbook version
+@st.cache_resource(show_spinner="Indexing table for search...")
+def load_search_index(dataset_key, _df):
+    return search_index(_df)
+
+def warm_caches(dataset_key):
+    """Fill the workbook, shapefile and aggregate caches of a workbook version, then the snapshot progress
+
+    The snapshots are only loaded ahead where worker processes parse them;
+    on a single CPU parsing them would hold up the first visitors instead.
+    """
+    extracted_df = load_dataset(*dataset_key)[2]
+    load_school_ids(dataset_key, extracted_df)
+    load_search_index(dataset_key, extracted_df)
+    load_school_points(dataset_key, extracted_df)
+    gdf = load_shapefile("Chiefdom2021.shp")[0]
+    load_spatial_aggregates(dataset_key, extracted_df, gdf)
+    load_chiefdom_choropleth(dataset_key, extracted_df, gdf)
+    if (os.cpu_count() or 1) > 1:
+        snapshot_paths = tuple(find_snapshots())
+        load_campaign_progress(snapshot_paths, tuple(os.path.getmtime(path) for path in snapshot_paths))
+
+# Function to warm the caches of the default workbook once per server process, in the background;
+# a visitor asking for a value being computed waits for it instead of computing it again
+@st.cache_resource(show_spinner=False)
+def start_warmup(dataset_key):
+    # Charts are rendered into the artifact store by a low-priority process, outside this interpreter
+    process = render_in_background(dataset_key[0])
+
+    def warm():
+        try:
+            warm_caches(dataset_key)
+        except Exception:
+            # The sections that need a value report its errors themselves
+            pass
+        # Reap the chart warm-up once it is done
+        process.wait()
+
+    thread = threading.Thread(target=warm, name="sbd-warmup", daemon=True)
+    thread.start()
+    return process, thread
+
+def warm_up_default_workbook():
+    """Start warming the default workbook's caches; called once the page is drawn so the first visitor is not held up"""
+    if os.path.exists(DEFAULT_WORKBOOK):
+        start_warmup(workbook_key(DEFAULT_WORKBOOK))
+
+def paged_table(key, df, load_index=None):
+    """Show one page of a table with server-side search and sort; only that page is sent to the browser
+
+    ``load_index`` returns the cached search index of ``df`` or of the table
+    it was filtered from; it is only called once something is searched.
+    """
+    control_cols = st.columns([3, 2, 1, 1, 1])
+    with control_cols[0]:
+        search = st.text_input("Search", key=f"{key}_search", placeholder="Search all columns")
+    with control_cols[1]:
+        sort_by = st.selectbox("Sort by", [None] + list(df.columns), key=f"{key}_sort",
+                               format_func=lambda column: "(original order)" if column is None else column)
+    with control_cols[2]:
+        descending = st.toggle("Descending", key=f"{key}_descending")
+    with control_cols[3]:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_page_size")
+    with control_cols[4]:
+        page = st.number_input("Page", min_value=1, value=1, step=1, key=f"{key}_page")
+    
+    index = load_index() if search and load_index is not None else None
+    page_df, matched = page_rows(df, page, page_size, search, sort_by, not descending, index)
+    st.dataframe(page_df)
+    
+    page_count = max(1, -(-matched // page_size))
+    first = (min(page, page_count) - 1) * page_size
+    st.caption(f"Rows {first + 1 if matched else 0:,}–{first + len(page_df):,} of {matched:,} "
+               f"(page {min(page, page_count)} of {page_count})")
+
+# Detailed filtering section, rerun on its own when a filter changes
+@st.fragment
+def detailed_filtering(extracted_df, load_index=None):
+    """Filter controls, filtered table and grouped summary; a filter change reruns only this section
+
+    ``load_index`` returns the search index of ``extracted_df`` for the filtered table.
+    """
+    perf_records = []
     
-    # Overall Summary
-    overall_summary = {
-        'total_schools': len(df),
-        'total_districts': len(df['District'].dropna().unique()),
-        'total_chiefdoms': len(df['Chiefdom'].dropna().unique()),
-        'total_boys': 0,
-        'total_girls': 0,
-        'total_enrollment': 0,
-        'total_itn': 0
-    }
+    # Visualization and filtering section - CALCULATE FROM RAW DATA
+    st.subheader("🔍 Detailed Data Filtering and Visualization")
+
+    # Filter controls live inside the section so changing them does not rerun the page
+    st.write("**Filter Options**")
     
-    # Calculate totals using the correct columns
-    for class_num in range(1, 6):
-        # Total enrollment from "Number of enrollments in class X"
-        enrollment_col = f"How many pupils are enrolled in Class {class_num}?"
-        if enrollment_col in df.columns:
-            overall_summary['total_enrollment'] += int(df[enrollment_col].fillna(0).sum())
-        
-        # Boys and girls for gender analysis AND ITN calculation
-        boys_col = f"How many boys in Class {class_num} received ITNs?"
-        girls_col = f"How many girls in Class {class_num} received ITNs?"
-        if boys_col in df.columns:
-            overall_summary['total_boys'] += int(df[boys_col].fillna(0).sum())
-        if girls_col in df.columns:
-            overall_summary['total_girls'] += int(df[girls_col].fillna(0).sum())
+    # Create radio buttons to select which level to group by
+    grouping_selection = st.radio(
+        "Select the level for grouping:",
+        ["District", "Chiefdom", "PHU Name", "Community Name", "School Name"],
+        index=0,  # Default to 'District'
+        horizontal=True
+    )
     
-    # Total ITNs = boys + girls (actual beneficiaries)
-    overall_summary['total_itn'] = overall_summary['total_boys'] + overall_summary['total_girls']
+    # Dictionary to define the hierarchy for each grouping level
+    hierarchy = {
+        "District": ["District"],
+        "Chiefdom": ["District", "Chiefdom"],
+        "PHU Name": ["District", "Chiefdom", "PHU Name"],
+        "Community Name": ["District", "Chiefdom", "PHU Name", "Community Name"],
+        "School Name": ["District", "Chiefdom", "PHU Name", "Community Name", "School Name"]
+    }
     
-    # Calculate coverage
-    overall_summary['coverage'] = (overall_summary['total_itn'] / overall_summary['total_enrollment'] * 100) if overall_summary['total_enrollment'] > 0 else 0
-    overall_summary['itn_remaining'] = overall_summary['total_enrollment'] - overall_summary['total_itn']
+    # Initialize filtered dataframe with the full dataset
+    filtered_df = extracted_df
     
-    summaries['overall'] = overall_summary
+    # Dictionary to store selected values for each level
+    selected_values = {}
     
-    # District Summary
-    district_summary = []
-    for district in df['District'].dropna().unique():
-        district_data = df[df['District'] == district]
-        district_stats = {
-            'district': district,
-            'schools': len(district_data),
-            'chiefdoms': len(district_data['Chiefdom'].dropna().unique()),
-            'boys': 0,
-            'girls': 0,
-            'enrollment': 0,
-            'itn': 0
-        }
+    # Apply filters based on the hierarchy for the selected grouping level
+    filter_cols = st.columns(len(hierarchy[grouping_selection]))
+    for level, filter_col in zip(hierarchy[grouping_selection], filter_cols):
+        # Filter out None/NaN values and get sorted unique values
+        level_values = sorted(filtered_df[level].dropna().unique())
         
-        for class_num in range(1, 6):
-            # Total enrollment from "Number of enrollments in class X"
-            enrollment_col = f"How many pupils are enrolled in Class {class_num}?"
-            if enrollment_col in district_data.columns:
-                district_stats['enrollment'] += int(district_data[enrollment_col].fillna(0).sum())
+        if level_values:
+            # Create selectbox for this level
+            with filter_col:
+                selected_value = st.selectbox(f"Select {level}", level_values)
+            selected_values[level] = selected_value
             
-            # Boys and girls for gender analysis AND ITN calculation
-            boys_col = f"How many boys in Class {class_num} received ITNs?"
-            girls_col = f"How many girls in Class {class_num} received ITNs?"
-            if boys_col in district_data.columns:
-                district_stats['boys'] += int(district_data[boys_col].fillna(0).sum())
-            if girls_col in district_data.columns:
-                district_stats['girls'] += int(district_data[girls_col].fillna(0).sum())
-        
-        # Total ITNs = boys + girls (actual beneficiaries)
-        district_stats['itn'] = district_stats['boys'] + district_stats['girls']
-        
-        # Calculate coverage
-        district_stats['coverage'] = (district_stats['itn'] / district_stats['enrollment'] * 100) if district_stats['enrollment'] > 0 else 0
-        district_stats['itn_remaining'] = district_stats['enrollment'] - district_stats['itn']
-        
-        district_summary.append(district_stats)
+            # Apply filter to the dataframe
+            filtered_df = filtered_df[filtered_df[level] == selected_value]
     
-    summaries['district'] = district_summary
+    with stage(perf_records, "detailed_filtering"):
+        # Check if data is available after filtering
+        if not filtered_df.empty:
+            st.write(f"### Filtered Data - {len(filtered_df)} records")
+            paged_table("filtered", filtered_df, load_index)
     
-    # Chiefdom Summary
-    chiefdom_summary = []
-    for district in df['District'].dropna().unique():
-        district_data = df[df['District'] == district]
-        for chiefdom in district_data['Chiefdom'].dropna().unique():
-            chiefdom_data = district_data[district_data['Chiefdom'] == chiefdom]
-            chiefdom_stats = {
-                'district': district,
-                'chiefdom': chiefdom,
-                'schools': len(chiefdom_data),
-                'boys': 0,
-                'girls': 0,
-                'enrollment': 0,
-                'itn': 0
-            }
-            
-            for class_num in range(1, 6):
-                # Total enrollment from "Number of enrollments in class X"
-                enrollment_col = f"How many pupils are enrolled in Class {class_num}?"
-                if enrollment_col in chiefdom_data.columns:
-                    chiefdom_stats['enrollment'] += int(chiefdom_data[enrollment_col].fillna(0).sum())
-                
-                # Boys and girls for gender analysis AND ITN calculation
-                boys_col = f"How many boys in Class {class_num} received ITNs?"
-                girls_col = f"How many girls in Class {class_num} received ITNs?"
-                if boys_col in chiefdom_data.columns:
-                    chiefdom_stats['boys'] += int(chiefdom_data[boys_col].fillna(0).sum())
-                if girls_col in chiefdom_data.columns:
-                    chiefdom_stats['girls'] += int(chiefdom_data[girls_col].fillna(0).sum())
-            
-            # Total ITNs = boys + girls (actual beneficiaries)
-            chiefdom_stats['itn'] = chiefdom_stats['boys'] + chiefdom_stats['girls']
-            
-            # Calculate coverage
-            chiefdom_stats['coverage'] = (chiefdom_stats['itn'] / chiefdom_stats['enrollment'] * 100) if chiefdom_stats['enrollment'] > 0 else 0
-            chiefdom_stats['itn_remaining'] = chiefdom_stats['enrollment'] - chiefdom_stats['itn']
-            
-            chiefdom_summary.append(chiefdom_stats)
+            # Download button for filtered data
+            filtered_csv = filtered_df.to_csv(index=False)
+            st.download_button(
+                label="📥 Download Filtered Data as CSV",
+                data=filtered_csv,
+                file_name="filtered_data.csv",
+                mime="text/csv"
+            )
     
-    summaries['chiefdom'] = chiefdom_summary
+            # Define the hierarchy levels to include in the summary
+            group_columns = hierarchy[grouping_selection]
+    
+            # Calculate enrollment from RAW DATA - every level of the hierarchy in one groupby
+            st.write("**Calculating enrollment from raw data...**")
+            rollup_df = rollup(filtered_df, group_columns).rename(columns={'enrollment': 'Total Enrollment', 'itn': 'Total ITNs'})
+    
+            # The selected grouping level is the finest level of the rollup
+            grouped_data = rollup_df[rollup_df['level'] == grouping_selection].reset_index(drop=True)
+            group_label = grouped_data[group_columns[0]].astype(str)
+            for col in group_columns[1:]:
+                group_label = group_label + ' - ' + grouped_data[col].astype(str)
+            grouped_data['Group'] = group_label
+    
+            # Summary Table
+            st.subheader("📊 Detailed Summary Table")
+    
+            # Display key metrics
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                total_enrollment = int(grouped_data['Total Enrollment'].sum())
+                st.metric("Total Enrollment", f"{total_enrollment:,}")
+            with col2:
+                total_itns = int(grouped_data['Total ITNs'].sum())
+                st.metric("Total ITNs", f"{total_itns:,}")
+            with col3:
+                coverage = (total_itns / total_enrollment * 100) if total_enrollment > 0 else 0
+                st.metric("Coverage", f"{coverage:.1f}%")
+    
+            # Display the summary table with a subtotal row for every level above the selected one
+            display_columns = ["level"] + group_columns + ["Total Enrollment", "Total ITNs"]
+            st.dataframe(rollup_df[display_columns])
+    
+            # Create a bar chart ONLY if we have enrollment data
+            if total_enrollment > 0:
+                fig, ax = new_figure((12, 8))
+        
+                # Sort by Total Enrollment for better visualization
+                grouped_data_sorted = grouped_data.sort_values("Total Enrollment", ascending=True)
+        
+                ax.barh(grouped_data_sorted['Group'], grouped_data_sorted["Total Enrollment"], 
+                        color="#47B5FF", edgecolor='navy', linewidth=1.5)
+                ax.set_title(f"Total Enrollment by {grouping_selection}", fontsize=16, fontweight='bold')
+                ax.set_xlabel("Number of Students", fontsize=12, fontweight='bold')
+                ax.set_ylabel(grouping_selection, fontsize=12, fontweight='bold')
+        
+                # Add value labels on bars
+                max_val = grouped_data_sorted["Total Enrollment"].max()
+                for i, v in enumerate(grouped_data_sorted["Total Enrollment"]):
+                    if v > 0:
+                        ax.text(v + max_val * 0.01, i, 
+                               f'{int(v):,}', va='center', fontweight='bold', fontsize=10)
+        
+                ax.grid(axis='x', alpha=0.3, linestyle='--')
+                fig.tight_layout()
+                st.pyplot(fig)
+        
+                st.success(f"✅ Chart generated with {total_enrollment:,} total students across {len(grouped_data)} groups")
+            else:
+                st.warning(f"No enrollment data calculated for the selected {grouping_selection} filters.")
+                st.write("**Debug:** Check if enrollment columns exist in your data")
+        
+            # Show calculation details
+            st.write("**Calculation Details:**")
+            for _, row in grouped_data.iterrows():
+                st.write(f"- {row['Group']}: {int(row['Total Enrollment']):,} students, {int(row['Total ITNs']):,} ITNs")
+
+        else:
+            st.warning("No data available for the selected filters.")
     
-    return summaries
+    append_log(perf_records, rows=len(extracted_df), section="🔍 Detailed Filtering")
 
 ### Part 2-----------------------------------------------------------------------------------------------------------------
 
@@ -361,1404 +593,618 @@ st.markdown("---")  # Add a horizontal line separator
 # Streamlit App
 st.title("📊 School Based Distribution of ITNs in SL")
 
-# Upload file
-uploaded_file = "sbd_1019 (1).xlsx"
-if uploaded_file:
-    # Read the uploaded Excel file
-    df_original = pd.read_excel(uploaded_file)
-    
-    # Load shapefile
-    try:
-        gdf = gpd.read_file("Chiefdom2021.shp")
-        st.success("✅ Shapefile loaded successfully!")
-    except Exception as e:
-        st.error(f"❌ Could not load shapefile: {e}")
-        gdf = None
-    
-    # Create empty lists to store extracted data
-    districts, chiefdoms, phu_names, community_names, school_names = [], [], [], [], []
-    
-    # Process each row in the "Scan QR code" column
-    for qr_text in df_original["Scan QR code"]:
-        if pd.isna(qr_text):
-            districts.append(None)
-            chiefdoms.append(None)
-            phu_names.append(None)
-            community_names.append(None)
-            school_names.append(None)
-            continue
-            
-        # Extract values using regex patterns
-        district_match = re.search(r"District:\s*([^\n]+)", str(qr_text))
-        districts.append(district_match.group(1).strip() if district_match else None)
-        
-        chiefdom_match = re.search(r"Chiefdom:\s*([^\n]+)", str(qr_text))
-        chiefdoms.append(chiefdom_match.group(1).strip() if chiefdom_match else None)
-        
-        phu_match = re.search(r"PHU name:\s*([^\n]+)", str(qr_text))
-        phu_names.append(phu_match.group(1).strip() if phu_match else None)
-        
-        community_match = re.search(r"Community name:\s*([^\n]+)", str(qr_text))
-        community_names.append(community_match.group(1).strip() if community_match else None)
-        
-        school_match = re.search(r"Name of school:\s*([^\n]+)", str(qr_text))
-        school_names.append(school_match.group(1).strip() if school_match else None)
-    
-    # Create a new DataFrame with extracted values
-    extracted_df = pd.DataFrame({
-        "District": districts,
-        "Chiefdom": chiefdoms,
-        "PHU Name": phu_names,
-        "Community Name": community_names,
-        "School Name": school_names
-    })
-    
-    # Add all other columns from the original DataFrame
-    for column in df_original.columns:
-        if column != "Scan QR code":  # Skip the QR code column since we've already processed it
-            extracted_df[column] = df_original[column]
-    
-    # Create sidebar filters early so they're available for all sections
-    st.sidebar.header("Filter Options")
-    
-    # Create radio buttons to select which level to group by
-    grouping_selection = st.sidebar.radio(
-        "Select the level for grouping:",
-        ["District", "Chiefdom", "PHU Name", "Community Name", "School Name"],
-        index=0  # Default to 'District'
-    )
-    
-    # Dictionary to define the hierarchy for each grouping level
-    hierarchy = {
-        "District": ["District"],
-        "Chiefdom": ["District", "Chiefdom"],
-        "PHU Name": ["District", "Chiefdom", "PHU Name"],
-        "Community Name": ["District", "Chiefdom", "PHU Name", "Community Name"],
-        "School Name": ["District", "Chiefdom", "PHU Name", "Community Name", "School Name"]
-    }
-    
-    # Initialize filtered dataframe with the full dataset
-    filtered_df = extracted_df.copy()
-    
-    # Dictionary to store selected values for each level
-    selected_values = {}
-    
-    # Apply filters based on the hierarchy for the selected grouping level
-    for level in hierarchy[grouping_selection]:
-        # Filter out None/NaN values and get sorted unique values
-        level_values = sorted(filtered_df[level].dropna().unique())
-        
-        if level_values:
-            # Create selectbox for this level
-            selected_value = st.sidebar.selectbox(f"Select {level}", level_values)
-            selected_values[level] = selected_value
-            
-            # Apply filter to the dataframe
-            filtered_df = filtered_df[filtered_df[level] == selected_value]
-    
-    # Store map images for report
-    map_images = {}
-    
-    # Display Dual Maps at the top
-    st.subheader("🗺️ Geographic Distribution Maps")
-    
-    if gdf is not None:
-        # OVERALL SIERRA LEONE MAP FIRST
-        st.write("**Sierra Leone - All Districts Overview**")
-        
-        # Create overall Sierra Leone map
-        fig_overall, ax_overall = plt.subplots(figsize=(16, 10))
-        
-        # Plot all chiefdoms with gray edges (base layer)
-        gdf.plot(ax=ax_overall, color='white', edgecolor='gray', alpha=0.8, linewidth=0.5)
-        
-        # Plot district boundaries with thick black lines
-        # Get district boundaries by dissolving chiefdoms by FIRST_DNAM
-        if 'FIRST_DNAM' in gdf.columns:
-            district_boundaries = gdf.dissolve(by='FIRST_DNAM')
-            district_boundaries.plot(ax=ax_overall, facecolor='none', edgecolor='black', linewidth=3, alpha=1.0)
-            
-            # Add district labels at centroids
-            for idx, row in district_boundaries.iterrows():
-                centroid = row.geometry.centroid
-                ax_overall.annotate(
-                    idx,  # District name
-                    (centroid.x, centroid.y),
-                    fontsize=12,
-                    fontweight='bold',
-                    ha='center',
-                    va='center',
-                    color='black',
-                    bbox=dict(boxstyle='round,pad=0.3', facecolor='white', alpha=0.8, edgecolor='black')
-                )
-        
-        # Extract and plot ALL GPS coordinates from entire dataset
-        all_coords_extracted = []
-        if "GPS Location" in extracted_df.columns:
-            all_gps_data = extracted_df["GPS Location"].dropna()
-            
-            st.write(f"**Debug: Processing {len(all_gps_data)} GPS entries for overall map**")
-            
-            for idx, gps_val in enumerate(all_gps_data):
-                if pd.notna(gps_val):
-                    gps_str = str(gps_val).strip()
-                    
-                    # Handle the specific format: 8.6103181,-12.2029534
-                    if ',' in gps_str:
-                        try:
-                            parts = gps_str.split(',')
-                            if len(parts) == 2:
-                                lat = float(parts[0].strip())
-                                lon = float(parts[1].strip())
-                                
-                                # Check if coordinates are in valid range for Sierra Leone
-                                if 6.0 <= lat <= 11.0 and -14.0 <= lon <= -10.0:
-                                    all_coords_extracted.append([lat, lon])
-                        except ValueError:
-                            continue
-            
-            st.write(f"**Total valid coordinates for overall map: {len(all_coords_extracted)}**")
-        
-        # Plot GPS points on the overall map
-        if all_coords_extracted:
-            lats, lons = zip(*all_coords_extracted)
-            
-            # Plot GPS points with #47B5FF color
-            scatter = ax_overall.scatter(
-                lons, lats,
-                c='#47B5FF',
-                s=100,
-                alpha=0.9,
-                edgecolors='white',
-                linewidth=2,
-                zorder=100,
-                label=f'Schools ({len(all_coords_extracted)})',
-                marker='o'
-            )
-            
-            # Add legend
-            ax_overall.legend(fontsize=14, loc='best')
-            
-            # Show coordinate range for verification
-            st.write(f"**Overall coordinate range:** Lat: {min(lats):.4f} to {max(lats):.4f}, Lon: {min(lons):.4f} to {max(lons):.4f}")
-        
-        # Customize overall map
-        ax_overall.set_title('Sierra Leone - School Distribution by District', fontsize=18, fontweight='bold', pad=20)
-        ax_overall.set_xlabel('Longitude', fontsize=14)
-        ax_overall.set_ylabel('Latitude', fontsize=14)
-        
-        # Add grid for reference
-        ax_overall.grid(True, alpha=0.3, linestyle='--')
-        
-        # Set axis limits to show full country
-        ax_overall.set_xlim(gdf.total_bounds[0] - 0.1, gdf.total_bounds[2] + 0.1)
-        ax_overall.set_ylim(gdf.total_bounds[1] - 0.1, gdf.total_bounds[3] + 0.1)
-        
-        plt.tight_layout()
-        st.pyplot(fig_overall)
-        
-        # Save overall map
-        map_images['sierra_leone_overall'] = save_map_as_png(fig_overall, "Sierra_Leone_Overall_Map")
-        
-        st.divider()
-        
-        # NOW THE INDIVIDUAL DISTRICT MAPS
-        # Define specific districts for left and right maps
-        left_district = "BO"
-        right_district = "BOMBALI"
-        
-        # BO DISTRICT MAP - Full width
-        st.write(f"**{left_district} District - All Chiefdoms**")
-        
-        # Filter shapefile for BO district
-        bo_gdf = gdf[gdf['FIRST_DNAM'] == left_district].copy()
-        
-        if len(bo_gdf) > 0:
-            # Filter data for BO district to get GPS coordinates
-            bo_data = extracted_df[extracted_df["District"] == left_district].copy()
-            
-            # Create the BO district plot
-            fig_bo, ax_bo = plt.subplots(figsize=(14, 8))
-            
-            # Plot chiefdom boundaries in white with black edges
-            bo_gdf.plot(ax=ax_bo, color='white', edgecolor='black', alpha=0.8, linewidth=2)
-            
-            # Extract and plot GPS coordinates FIRST
-            coords_extracted = []
-            if len(bo_data) > 0 and "GPS Location" in bo_data.columns:
-                gps_data = bo_data["GPS Location"].dropna()
-                
-                st.write(f"**Debug: Found {len(gps_data)} GPS entries for BO District**")
-                
-                for idx, gps_val in enumerate(gps_data):
-                    if pd.notna(gps_val):
-                        gps_str = str(gps_val).strip()
-                        st.write(f"GPS {idx+1}: {gps_str}")
-                        
-                        # Handle the specific format: 8.6103181,-12.2029534
-                        if ',' in gps_str:
-                            try:
-                                parts = gps_str.split(',')
-                                if len(parts) == 2:
-                                    lat = float(parts[0].strip())
-                                    lon = float(parts[1].strip())
-                                    
-                                    # Check if coordinates are in valid range for Sierra Leone
-                                    if 6.0 <= lat <= 11.0 and -14.0 <= lon <= -10.0:
-                                        coords_extracted.append([lat, lon])
-                                        st.write(f"✅ Valid coordinates: {lat}, {lon}")
-                                    else:
-                                        st.write(f"❌ Invalid coordinates (outside Sierra Leone): {lat}, {lon}")
-                            except ValueError as e:
-                                st.write(f"❌ Could not parse coordinates: {gps_str} - Error: {e}")
-                
-                st.write(f"**Total valid coordinates extracted: {len(coords_extracted)}**")
-            
-            # Plot GPS points on the shapefile
-            if coords_extracted:
-                lats, lons = zip(*coords_extracted)
-                
-                # Plot GPS points with high visibility
-                scatter = ax_bo.scatter(
-                    lons, lats,
-                    c='red',
-                    s=150,
-                    alpha=1.0,
-                    edgecolors='white',
-                    linewidth=3,
-                    zorder=100,  # Very high z-order to ensure visibility
-                    label=f'Schools ({len(coords_extracted)})',
-                    marker='o'
-                )
-                
-                # Add text labels for each point
-                for i, (lat, lon) in enumerate(coords_extracted):
-                    ax_bo.annotate(f'S{i+1}', 
-                                  (lon, lat),
-                                  xytext=(5, 5), 
-                                  textcoords='offset points',
-                                  fontsize=10,
-                                  fontweight='bold',
-                                  color='red',
-                                  bbox=dict(boxstyle='round,pad=0.2', facecolor='white', alpha=0.8))
-                
-                # Show coordinate range for verification
-                st.write(f"**Coordinate range:** Lat: {min(lats):.4f} to {max(lats):.4f}, Lon: {min(lons):.4f} to {max(lons):.4f}")
-                
-                # Set map extent to include all points with padding
-                margin = 0.05
-                ax_bo.set_xlim(min(lons) - margin, max(lons) + margin)
-                ax_bo.set_ylim(min(lats) - margin, max(lats) + margin)
-                
-            # Add chiefdom labels
-            for idx, row in bo_gdf.iterrows():
-                if 'FIRST_CHIE' in row and pd.notna(row['FIRST_CHIE']):
-                    centroid = row.geometry.centroid
-                    ax_bo.annotate(
-                        row['FIRST_CHIE'], 
-                        (centroid.x, centroid.y),
-                        xytext=(5, 5), 
-                        textcoords='offset points',
-                        fontsize=9,
-                        ha='left',
-                        bbox=dict(boxstyle='round,pad=0.3', facecolor='lightblue', alpha=0.7)
-                    )
-            
-            # Customize plot
-            title_text = f'{left_district} District - Chiefdoms: {len(bo_gdf)}'
-            if coords_extracted:
-                title_text += f' | GPS Points: {len(coords_extracted)}'
-            ax_bo.set_title(title_text, fontsize=16, fontweight='bold')
-            ax_bo.set_xlabel('Longitude', fontsize=12)
-            ax_bo.set_ylabel('Latitude', fontsize=12)
-            
-            # Add legend if GPS points exist
-            if coords_extracted:
-                ax_bo.legend(fontsize=12, loc='best')
-            
-            # Add grid for reference
-            ax_bo.grid(True, alpha=0.3, linestyle='--')
-            
-            plt.tight_layout()
-            st.pyplot(fig_bo)
-            
-            # Save BO district map
-            map_images['bo_district'] = save_map_as_png(fig_bo, f"{left_district}_District_Map")
-            
-            # Display chiefdoms list
-            if 'FIRST_CHIE' in bo_gdf.columns:
-                chiefdoms = bo_gdf['FIRST_CHIE'].dropna().tolist()
-                st.write(f"**Chiefdoms in {left_district} District ({len(chiefdoms)}):**")
-                chiefdom_cols = st.columns(3)
-                for i, chiefdom in enumerate(chiefdoms):
-                    with chiefdom_cols[i % 3]:
-                        st.write(f"• {chiefdom}")
-        else:
-            st.warning(f"No chiefdoms found for {left_district} district in shapefile")
-        
-        st.divider()
-        
-        # BOMBALI DISTRICT MAP - Full width
-        st.write(f"**{right_district} District - All Chiefdoms**")
-        
-        # Filter shapefile for BOMBALI district
-        bombali_gdf = gdf[gdf['FIRST_DNAM'] == right_district].copy()
-        
-        if len(bombali_gdf) > 0:
-            # Filter data for BOMBALI district to get GPS coordinates
-            bombali_data = extracted_df[extracted_df["District"] == right_district].copy()
-            
-            # Create the BOMBALI district plot
-            fig_bombali, ax_bombali = plt.subplots(figsize=(14, 8))
-            
-            # Plot chiefdom boundaries in white with black edges
-            bombali_gdf.plot(ax=ax_bombali, color='white', edgecolor='black', alpha=0.8, linewidth=2)
-            
-            # Extract and plot GPS coordinates FIRST
-            coords_extracted = []
-            if len(bombali_data) > 0 and "GPS Location" in bombali_data.columns:
-                gps_data = bombali_data["GPS Location"].dropna()
-                
-                st.write(f"**Debug: Found {len(gps_data)} GPS entries for BOMBALI District**")
-                
-                for idx, gps_val in enumerate(gps_data):
-                    if pd.notna(gps_val):
-                        gps_str = str(gps_val).strip()
-                        st.write(f"GPS {idx+1}: {gps_str}")
-                        
-                        # Handle the specific format: 8.6103181,-12.2029534
-                        if ',' in gps_str:
-                            try:
-                                parts = gps_str.split(',')
-                                if len(parts) == 2:
-                                    lat = float(parts[0].strip())
-                                    lon = float(parts[1].strip())
-                                    
-                                    # Check if coordinates are in valid range for Sierra Leone
-                                    if 6.0 <= lat <= 11.0 and -14.0 <= lon <= -10.0:
-                                        coords_extracted.append([lat, lon])
-                                        st.write(f"✅ Valid coordinates: {lat}, {lon}")
-                                    else:
-                                        st.write(f"❌ Invalid coordinates (outside Sierra Leone): {lat}, {lon}")
-                            except ValueError as e:
-                                st.write(f"❌ Could not parse coordinates: {gps_str} - Error: {e}")
-                
-                st.write(f"**Total valid coordinates extracted: {len(coords_extracted)}**")
-            
-            # Plot GPS points on the shapefile
-            if coords_extracted:
-                lats, lons = zip(*coords_extracted)
-                
-                # Plot GPS points with high visibility
-                scatter = ax_bombali.scatter(
-                    lons, lats,
-                    c='red',
-                    s=150,
-                    alpha=1.0,
-                    edgecolors='white',
-                    linewidth=3,
-                    zorder=100,  # Very high z-order to ensure visibility
-                    label=f'Schools ({len(coords_extracted)})',
-                    marker='o'
-                )
-                
-                # Add text labels for each point
-                for i, (lat, lon) in enumerate(coords_extracted):
-                    ax_bombali.annotate(f'S{i+1}', 
-                                       (lon, lat),
-                                       xytext=(5, 5), 
-                                       textcoords='offset points',
-                                       fontsize=10,
-                                       fontweight='bold',
-                                       color='red',
-                                       bbox=dict(boxstyle='round,pad=0.2', facecolor='white', alpha=0.8))
-                
-                # Show coordinate range for verification
-                st.write(f"**Coordinate range:** Lat: {min(lats):.4f} to {max(lats):.4f}, Lon: {min(lons):.4f} to {max(lons):.4f}")
-                
-                # Set map extent to include all points with padding
-                margin = 0.05
-                ax_bombali.set_xlim(min(lons) - margin, max(lons) + margin)
-                ax_bombali.set_ylim(min(lats) - margin, max(lats) + margin)
-                
-            # Add chiefdom labels
-            for idx, row in bombali_gdf.iterrows():
-                if 'FIRST_CHIE' in row and pd.notna(row['FIRST_CHIE']):
-                    centroid = row.geometry.centroid
-                    ax_bombali.annotate(
-                        row['FIRST_CHIE'], 
-                        (centroid.x, centroid.y),
-                        xytext=(5, 5), 
-                        textcoords='offset points',
-                        fontsize=9,
-                        ha='left',
-                        bbox=dict(boxstyle='round,pad=0.3', facecolor='lightblue', alpha=0.7)
-                    )
-            
-            # Customize plot
-            title_text = f'{right_district} District - Chiefdoms: {len(bombali_gdf)}'
-            if coords_extracted:
-                title_text += f' | GPS Points: {len(coords_extracted)}'
-            ax_bombali.set_title(title_text, fontsize=16, fontweight='bold')
-            ax_bombali.set_xlabel('Longitude', fontsize=12)
-            ax_bombali.set_ylabel('Latitude', fontsize=12)
-            
-            # Add legend if GPS points exist
-            if coords_extracted:
-                ax_bombali.legend(fontsize=12, loc='best')
-            
-            # Add grid for reference
-            ax_bombali.grid(True, alpha=0.3, linestyle='--')
-            
-            plt.tight_layout()
-            st.pyplot(fig_bombali)
-            
-            # Save BOMBALI district map
-            map_images['bombali_district'] = save_map_as_png(fig_bombali, f"{right_district}_District_Map")
-            
-            # Display chiefdoms list
-            if 'FIRST_CHIE' in bombali_gdf.columns:
-                chiefdoms = bombali_gdf['FIRST_CHIE'].dropna().tolist()
-                st.write(f"**Chiefdoms in {right_district} District ({len(chiefdoms)}):**")
-                chiefdom_cols = st.columns(3)
-                for i, chiefdom in enumerate(chiefdoms):
-                    with chiefdom_cols[i % 3]:
-                        st.write(f"• {chiefdom}")
-        else:
-            st.warning(f"No chiefdoms found for {right_district} district in shapefile")
-    else:
-        st.error("Shapefile not loaded. Cannot display map.")
-    
-    # Display Original Data Sample
-    st.subheader("📄 Original Data Sample")
-    st.dataframe(df_original.head())
-    
-    # Display Extracted Data
-    st.subheader("📋 Extracted Data")
-    st.dataframe(extracted_df)
-    
-    # Add download button for CSV
-    csv = extracted_df.to_csv(index=False)
-    st.download_button(
-        label="📥 Download Extracted Data as CSV",
-        data=csv,
-        file_name="extracted_school_data.csv",
-        mime="text/csv"
+# Choose between the single-workbook dashboard and the campaign progress view
+dashboard_mode = st.sidebar.radio(
+    "Dashboard mode:",
+    ["Single workbook", "Campaign progress"],
+    index=0
+)
+
+if dashboard_mode == "Campaign progress":
+    st.subheader("📈 Campaign Progress Across Snapshots")
+    
+    snapshot_paths = tuple(find_snapshots())
+    progress_df = load_campaign_progress(snapshot_paths, tuple(os.path.getmtime(path) for path in snapshot_paths))
+    
+    if progress_df.empty:
+        st.warning("No dated SBD workbook snapshots found.")
+        st.stop()
+    
+    st.write(f"**{len(snapshot_paths)} workbook snapshots merged, {progress_df['date'].nunique()} campaign days**")
+    
+    # History window - the curves are drawn from the precomputed table, so any window costs the same
+    first_day = progress_df['date'].min().date()
+    last_day = progress_df['date'].max().date()
+    start_day, end_day = st.slider(
+        "Campaign days to show:",
+        min_value=first_day,
+        max_value=last_day,
+        value=(first_day, last_day)
     )
+    window_df = progress_df[(progress_df['date'].dt.date >= start_day) & (progress_df['date'].dt.date <= end_day)]
     
-    # Generate comprehensive summaries
-    summaries = generate_summaries(extracted_df)
-    
-    # Display Overall Summary
-    st.subheader("📊 Overall Summary")
+    # Headline figures as of the last day in the window
+    latest_df = window_df[window_df['date'] == window_df['date'].max()]
+    latest_enrollment = int(latest_df['cum_enrollment'].sum())
+    latest_itn = int(latest_df['cum_itn'].sum())
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Total Schools", f"{summaries['overall']['total_schools']:,}")
+        st.metric("Schools Reached", f"{int(latest_df['cum_schools'].sum()):,}")
     with col2:
-        st.metric("Total Students in current school register (2025)", f"{summaries['overall']['total_enrollment']:,}")
+        st.metric("Cumulative Enrollment", f"{latest_enrollment:,}")
     with col3:
-        st.metric("Total ITNs given to pupils present at the time of distribution", f"{summaries['overall']['total_itn']:,}")
+        st.metric("Cumulative ITNs", f"{latest_itn:,}")
     with col4:
-        st.metric("Coverage", f"{summaries['overall']['coverage']:.1f}%")
-    
-    col5, col6, col7, col8 = st.columns(4)
-    with col5:
-        st.metric("Districts", f"{summaries['overall']['total_districts']}")
-    with col6:
-        st.metric("Chiefdoms", f"{summaries['overall']['total_chiefdoms']}")
-    with col7:
-        st.metric("Boys", f"{summaries['overall']['total_boys']:,}")
-    with col8:
-        st.metric("Girls", f"{summaries['overall']['total_girls']:,}")
-    
-    # Gender Analysis
-    st.subheader("👫 Gender Analysis")
-    
-    # Overall gender distribution pie chart
-    fig_gender, ax_gender = plt.subplots(figsize=(10, 8))
-    labels = ['Boys', 'Girls']
-    sizes = [summaries['overall']['total_boys'], summaries['overall']['total_girls']]
-    colors = ['#4A90E2', '#F39C12']
-    
-    wedges, texts, autotexts = ax_gender.pie(sizes, labels=labels, autopct='%1.1f%%', 
-                                            colors=colors, startangle=90)
-    ax_gender.set_title('Overall Gender Distribution', fontsize=16, fontweight='bold', pad=20)
-    plt.setp(autotexts, size=14, weight="bold")
-    plt.setp(texts, size=12, weight="bold")
-    plt.tight_layout()
-    st.pyplot(fig_gender)
-    
-    # Save gender chart
-    map_images['gender_overall'] = save_map_as_png(fig_gender, "Overall_Gender_Distribution")
-    
-    # Gender ratio by district chart
-    districts = [d['district'] for d in summaries['district']]
-    boys_counts = [d['boys'] for d in summaries['district']]
-    girls_counts = [d['girls'] for d in summaries['district']]
-    
-    fig_gender_district, ax_gender_district = plt.subplots(figsize=(14, 8))
-    x = np.arange(len(districts))
-    width = 0.35
-    
-    bars1 = ax_gender_district.bar(x - width/2, boys_counts, width, label='Boys', color='#4A90E2', edgecolor='navy', linewidth=1)
-    bars2 = ax_gender_district.bar(x + width/2, girls_counts, width, label='Girls', color='#F39C12', edgecolor='darkorange', linewidth=1)
-    
-    ax_gender_district.set_title('Gender Distribution by District', fontsize=16, fontweight='bold', pad=20)
-    ax_gender_district.set_xlabel('Districts', fontsize=12, fontweight='bold')
-    ax_gender_district.set_ylabel('Number of Students', fontsize=12, fontweight='bold')
-    ax_gender_district.set_xticks(x)
-    ax_gender_district.set_xticklabels(districts, rotation=45, ha='right')
-    ax_gender_district.legend(fontsize=12)
-    ax_gender_district.grid(axis='y', alpha=0.3, linestyle='--')
-    
-    # Add value labels on bars
-    for bar in bars1:
-        height = bar.get_height()
-        ax_gender_district.annotate(f'{int(height):,}',
-                                  xy=(bar.get_x() + bar.get_width() / 2, height),
-                                  xytext=(0, 3),
-                                  textcoords="offset points",
-                                  ha='center', va='bottom', fontsize=10, fontweight='bold')
-    
-    for bar in bars2:
-        height = bar.get_height()
-        ax_gender_district.annotate(f'{int(height):,}',
-                                  xy=(bar.get_x() + bar.get_width() / 2, height),
-                                  xytext=(0, 3),
-                                  textcoords="offset points",
-                                  ha='center', va='bottom', fontsize=10, fontweight='bold')
-    
-    plt.tight_layout()
-    st.pyplot(fig_gender_district)
-    
-    # Save gender district chart
-    map_images['gender_district'] = save_map_as_png(fig_gender_district, "Gender_Distribution_by_District")
-    
-    # Enrollment and ITN Distribution Analysis
-    st.subheader("📊 Enrollment and ITN Distribution Analysis")
-    
-    # Calculate total enrollment and ITN distribution by district
-    district_analysis = []
-    
-    for district in extracted_df['District'].dropna().unique():
-        district_data = extracted_df[extracted_df['District'] == district]
-        
-        total_enrollment = 0
-        total_boys = 0
-        total_girls = 0
-        
-        # Sum enrollments and boys/girls by class using correct columns
-        for class_num in range(1, 6):
-            # Use "Number of enrollments in class X" for total students
-            enrollment_col = f"How many pupils are enrolled in Class {class_num}?"
-            if enrollment_col in district_data.columns:
-                total_enrollment += int(district_data[enrollment_col].fillna(0).sum())
-            
-            # Use boys + girls for total ITNs (actual beneficiaries)
-            boys_col = f"How many boys in Class {class_num} received ITNs?"
-            girls_col = f"How many girls in Class {class_num} received ITNs?"
-            if boys_col in district_data.columns:
-                total_boys += int(district_data[boys_col].fillna(0).sum())
-            if girls_col in district_data.columns:
-                total_girls += int(district_data[girls_col].fillna(0).sum())
-        
-        total_itn = total_boys + total_girls  # Total ITNs = boys + girls
-        itn_remaining = total_enrollment - total_itn  # Remaining = enrollment - distributed
-        coverage = (total_itn / total_enrollment * 100) if total_enrollment > 0 else 0
-        
-        district_analysis.append({
-            'District': district,
-            'Total_Enrollment': total_enrollment,
-            'Total_ITN': total_itn,
-            'ITN_Remaining': itn_remaining,
-            'Coverage': coverage
-        })
-    
-    district_df = pd.DataFrame(district_analysis)
-    
-    # Create enhanced bar chart with enrollment, distributed, and remaining
-    fig_enhanced, ax_enhanced = plt.subplots(figsize=(16, 8))
-    
-    x = np.arange(len(district_df['District']))
-    width = 0.25
-    
-    # Create bars for each category
-    bars1 = ax_enhanced.bar(x - width, district_df['Total_Enrollment'], width, 
-                           label='Total Enrollment', color='#47B5FF', edgecolor='navy', linewidth=1)
-    bars2 = ax_enhanced.bar(x, district_df['Total_ITN'], width, 
-                           label='ITNs Distributed (Boys + Girls)', color='lightcoral', edgecolor='darkred', linewidth=1)
-    bars3 = ax_enhanced.bar(x + width, district_df['ITN_Remaining'], width, 
-                           label='ITNs Remaining', color='hotpink', edgecolor='darkmagenta', linewidth=1)
-    
-    # Customize the chart
-    ax_enhanced.set_title('District Analysis: Enrollment vs ITN Distribution', fontsize=16, fontweight='bold', pad=20)
-    ax_enhanced.set_xlabel('Districts', fontsize=12, fontweight='bold')
-    ax_enhanced.set_ylabel('Number of Students/ITNs', fontsize=12, fontweight='bold')
-    ax_enhanced.set_xticks(x)
-    ax_enhanced.set_xticklabels(district_df['District'], rotation=45, ha='right')
-    ax_enhanced.legend(fontsize=12)
-    ax_enhanced.grid(axis='y', alpha=0.3, linestyle='--')
-    
-    # Add value labels on bars
-    for bar in bars1:
-        height = bar.get_height()
-        ax_enhanced.annotate(f'{int(height):,}',
-                            xy=(bar.get_x() + bar.get_width() / 2, height),
-                            xytext=(0, 3),
-                            textcoords="offset points",
-                            ha='center', va='bottom', fontsize=9, fontweight='bold')
-    
-    for bar in bars2:
-        height = bar.get_height()
-        ax_enhanced.annotate(f'{int(height):,}',
-                            xy=(bar.get_x() + bar.get_width() / 2, height),
-                            xytext=(0, 3),
-                            textcoords="offset points",
-                            ha='center', va='bottom', fontsize=9, fontweight='bold')
-    
-    for bar in bars3:
-        height = bar.get_height()
-        if height > 0:  # Only show label for positive values
-            ax_enhanced.annotate(f'{int(height):,}',
-                                xy=(bar.get_x() + bar.get_width() / 2, height),
-                                xytext=(0, 3),
-                                textcoords="offset points",
-                                ha='center', va='bottom', fontsize=9, fontweight='bold')
-    
-    plt.tight_layout()
-    st.pyplot(fig_enhanced)
-    
-    # Save enhanced chart
-    map_images['enhanced_enrollment_analysis'] = save_map_as_png(fig_enhanced, "Enhanced_Enrollment_Analysis")
-    
-    # Create overall pie chart for enrollment vs distributed vs remaining
-    st.subheader("📊 Overall Distribution Overview (Pie Chart)")
-    
-    # Calculate overall totals
-    overall_enrollment = district_df['Total_Enrollment'].sum()
-    overall_distributed = district_df['Total_ITN'].sum()
-    overall_remaining = district_df['ITN_Remaining'].sum()
-    
-    if overall_enrollment > 0:
-        fig_overall_pie, ax_overall_pie = plt.subplots(figsize=(10, 8))
-        
-        sizes = [overall_distributed, overall_remaining]
-        labels = [f'ITNs Distributed\n({overall_distributed:,})', f'ITNs Remaining\n({overall_remaining:,})']
-        colors = ['lightcoral', 'hotpink']
-        explode = (0.05, 0)  # Slightly separate the distributed slice
-        
-        wedges, texts, autotexts = ax_overall_pie.pie(sizes, labels=labels, autopct='%1.1f%%',
-                                                     colors=colors, startangle=90, explode=explode)
-        ax_overall_pie.set_title(f'Overall ITN Distribution Status\nTotal Enrollment: {overall_enrollment:,}', 
-                                fontsize=16, fontweight='bold', pad=20)
-        
-        # Enhance text styling
-        plt.setp(autotexts, size=12, weight="bold", color='white')
-        plt.setp(texts, size=11, weight="bold")
-        
-        plt.tight_layout()
-        st.pyplot(fig_overall_pie)
-        
-        # Save overall pie chart
-        map_images['overall_distribution_pie'] = save_map_as_png(fig_overall_pie, "Overall_Distribution_Pie")
-    
-    # District-level pie charts
-    st.subheader("📊 District-Level Distribution (Pie Charts)")
-    
-    # Enrollment pie chart
-    if district_df['Total_Enrollment'].sum() > 0:
-        fig_pie1, ax_pie1 = plt.subplots(figsize=(10, 8))
-        colors_enrollment = ['#87CEEB', '#4682B4', '#1E90FF', '#0000CD', '#000080']
-        # Filter out zero values for pie chart
-        enrollment_data = district_df[district_df['Total_Enrollment'] > 0]
-        if len(enrollment_data) > 0:
-            wedges, texts, autotexts = ax_pie1.pie(enrollment_data['Total_Enrollment'], 
-                                                  labels=enrollment_data['District'],
-                                                  autopct='%1.1f%%',
-                                                  colors=colors_enrollment[:len(enrollment_data)],
-                                                  startangle=90)
-            ax_pie1.set_title('Total Enrollment Distribution by District', fontsize=16, fontweight='bold', pad=20)
-            plt.setp(autotexts, size=12, weight="bold")
-            plt.setp(texts, size=11, weight="bold")
-            plt.tight_layout()
-            st.pyplot(fig_pie1)
-            
-            # Save enrollment pie chart
-            map_images['enrollment_pie'] = save_map_as_png(fig_pie1, "Enrollment_Distribution_Pie")
-        else:
-            st.warning("No enrollment data available for pie chart")
-    else:
-        st.warning("No enrollment data available for pie chart")
-    
-    # ITN distribution pie chart
-    if district_df['Total_ITN'].sum() > 0:
-        fig_pie2, ax_pie2 = plt.subplots(figsize=(10, 8))
-        colors_itn = ['#90EE90', '#32CD32', '#228B22', '#006400', '#004000']
-        # Filter out zero values for pie chart
-        itn_data = district_df[district_df['Total_ITN'] > 0]
-        if len(itn_data) > 0:
-            wedges, texts, autotexts = ax_pie2.pie(itn_data['Total_ITN'], 
-                                                  labels=itn_data['District'],
-                                                  autopct='%1.1f%%',
-                                                  colors=colors_itn[:len(itn_data)],
-                                                  startangle=90)
-            ax_pie2.set_title('Total ITN Distribution by District', fontsize=16, fontweight='bold', pad=20)
-            plt.setp(autotexts, size=12, weight="bold")
-            plt.setp(texts, size=11, weight="bold")
-            plt.tight_layout()
-            st.pyplot(fig_pie2)
-            
-            # Save ITN pie chart
-            map_images['itn_pie'] = save_map_as_png(fig_pie2, "ITN_Distribution_Pie")
-        else:
-            st.warning("No ITN distribution data available for pie chart")
-    else:
-        st.warning("No ITN distribution data available for pie chart")
-    
-    # Display Summary Tables
-    st.subheader("📈 District Summary Table")
-    district_summary_df = pd.DataFrame(summaries['district'])
-    st.dataframe(district_summary_df)
-    
-    st.subheader("📈 Chiefdom Summary Table")
-    chiefdom_summary_df = pd.DataFrame(summaries['chiefdom'])
-    st.dataframe(chiefdom_summary_df)
-    
-    # Save map files notification
-    if map_images:
-        with st.expander("📁 View Saved Map Files"):
-            for map_name in map_images.keys():
-                st.write(f"• {map_name}.png")
+        coverage = (latest_itn / latest_enrollment * 100) if latest_enrollment > 0 else 0
+        st.metric("Coverage", f"{coverage:.1f}%")
+    
+    # Progress curves by district
+    progress_charts = [
+        ('cum_enrollment', 'Cumulative Enrollment by District', 'Number of Students'),
+        ('cum_itn', 'Cumulative ITNs Distributed by District', 'Number of ITNs'),
+        ('coverage', 'ITN Coverage by District (%)', 'Coverage Percentage (%)')
+    ]
+    for measure, title, ylabel in progress_charts:
+        curves = window_df.pivot(index='date', columns='District', values=measure)
+        fig_progress, ax_progress = new_figure((14, 6))
+        curves.plot(ax=ax_progress, marker='o', linewidth=2)
+        ax_progress.set_title(title, fontsize=16, fontweight='bold', pad=20)
+        ax_progress.set_xlabel('Date', fontsize=12, fontweight='bold')
+        ax_progress.set_ylabel(ylabel, fontsize=12, fontweight='bold')
+        ax_progress.grid(True, alpha=0.3, linestyle='--')
+        ax_progress.legend(fontsize=11, loc='best')
+        fig_progress.tight_layout()
+        st.pyplot(fig_progress)
+    
+    # Daily deltas and cumulative totals
+    st.subheader("📋 Daily Progress Table")
+    st.dataframe(window_df)
+    st.download_button(
+        label="📥 Download Daily Progress as CSV",
+        data=window_df.to_csv(index=False),
+        file_name="campaign_daily_progress.csv",
+        mime="text/csv"
+    )
+    warm_up_default_workbook()
+    st.stop()
 
-### Part 3----------------------------------------------------------------------------------------------------------------
+# Optional profiling of each dashboard section
+show_performance = st.sidebar.checkbox(
+    "Show performance",
+    value=False,
+    help="Time each section of the dashboard and trace memory allocations (slows reruns down)"
+)
+# Tracing is process-wide, so it is only stopped when this session turns its own toggle off
+if show_performance:
+    start_memory_tracing()
+elif st.session_state.get('show_performance_was_on'):
+    stop_memory_tracing()
+st.session_state['show_performance_was_on'] = show_performance
+
+# Interactive charts are drawn by the browser from their aggregate table; static ones are server-rendered PNGs
+st.sidebar.radio(
+    "Charts:",
+    ["Interactive", "Static"],
+    index=0,
+    horizontal=True,
+    key='chart_mode',
+    help="Static charts are the images used in the Word report"
+)
+
+# Stage timings of this rerun
+perf_records = []
+
+# Upload a newer workbook; it is parsed in the background while the current dataset stays on screen
+new_upload = st.sidebar.file_uploader("Upload SBD workbook", type=["xlsx"])
+if new_upload is not None and new_upload.file_id != st.session_state.get('upload_file_id'):
+    st.session_state['upload_file_id'] = new_upload.file_id
+    st.session_state['upload_job'] = start_upload(new_upload.name, new_upload.getvalue())
+if 'upload_job' in st.session_state:
+    with st.sidebar:
+        upload_progress()
+if 'upload_error' in st.session_state:
+    st.sidebar.error(f"❌ {st.session_state['upload_error']}")
 
-    # Chiefdoms Analysis by District
-    st.subheader("📊 Chiefdoms Analysis by District")
+# Default workbook until an upload has been parsed
+uploaded_file = DEFAULT_WORKBOOK
+if uploaded_file:
+    # Read the Excel file, detect the questionnaire version once and extract
+    # the QR code fields; cached until the workbook changes
+    with stage(perf_records, "load"):
+        if 'dataset' in st.session_state:
+            dataset_key, original_sample, schema, extracted_df = st.session_state['dataset']
+            uploaded_file = dataset_key[0]
+        else:
+            dataset_key = workbook_key(uploaded_file)
+            try:
+                original_sample, schema, extracted_df = load_dataset(*dataset_key)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                st.stop()
+    
+    # Repeated scans of the same school can be counted once
+    merge_duplicates = st.sidebar.checkbox(
+        "Merge duplicate submissions",
+        value=False,
+        help="Count each school once, keeping its most recently updated submission"
+    )
+    with stage(perf_records, "deduplication"):
+        school_ids = load_school_ids(dataset_key, extracted_df)
+    submitted_df, submitted_key = extracted_df, dataset_key
+    duplicate_count = len(school_ids) - school_ids.nunique()
+    st.sidebar.caption(f"{duplicate_count:,} duplicate submissions found")
+    if merge_duplicates:
+        extracted_df = load_deduplicated(dataset_key, submitted_df, school_ids)
+        dataset_key = dataset_key + ("merged",)
     
-    # Get all unique districts that have chiefdom data
-    districts_with_chiefdoms = extracted_df[extracted_df['Chiefdom'].notna()]['District'].unique()
+    # Generate comprehensive summaries
+    with stage(perf_records, "summaries"):
+        summaries = generate_summaries(extracted_df)
+        district_df = district_analysis(extracted_df)
+    
+    # Only the open section is computed and rendered; charts are cached per workbook version
+    section = st.radio(
+        "Section:",
+        SECTIONS,
+        index=0,
+        horizontal=True,
+        label_visibility="collapsed"
+    )
     
-    for district in districts_with_chiefdoms:
-        st.write(f"### {district} District - Chiefdoms Analysis")
-        
-        # Filter data for this district
-        district_data = extracted_df[extracted_df['District'] == district]
-        district_chiefdoms = district_data['Chiefdom'].dropna().unique()
-        
-        if len(district_chiefdoms) > 0:
-            # Calculate by chiefdom for this district
-            district_chiefdom_analysis = []
-            
-            for chiefdom in district_chiefdoms:
-                chiefdom_data = district_data[district_data['Chiefdom'] == chiefdom]
-                
-                total_enrollment = 0
-                total_boys = 0
-                total_girls = 0
-                
-                for class_num in range(1, 6):
-                    # Use "Number of enrollments in class X" for total students
-                    enrollment_col = f"How many pupils are enrolled in Class {class_num}?"
-                    if enrollment_col in chiefdom_data.columns:
-                        total_enrollment += int(chiefdom_data[enrollment_col].fillna(0).sum())
-                    
-                    # Use boys + girls for total ITNs (actual beneficiaries)
-                    boys_col = f"How many boys in Class {class_num} received ITNs?"
-                    girls_col = f"How many girls in Class {class_num} received ITNs?"
-                    if boys_col in chiefdom_data.columns:
-                        total_boys += int(chiefdom_data[boys_col].fillna(0).sum())
-                    if girls_col in chiefdom_data.columns:
-                        total_girls += int(chiefdom_data[girls_col].fillna(0).sum())
-                
-                total_itn = total_boys + total_girls  # Total ITNs = boys + girls
-                coverage = (total_itn / total_enrollment * 100) if total_enrollment > 0 else 0
-                
-                district_chiefdom_analysis.append({
-                    'Chiefdom': chiefdom,
-                    'Total_Enrollment': total_enrollment,
-                    'Total_ITN': total_itn,
-                    'Coverage': coverage
-                })
+    if section == "🗺️ Maps":
+        # Display Dual Maps
+        st.subheader("🗺️ Geographic Distribution Maps")
+        
+        # Interactive mode draws the schools in the browser instead of as static images
+        map_mode = st.radio("Map mode:", ["Static", "Interactive"], index=0, horizontal=True)
+        gdf, boundaries = shapefile_layers() if map_mode == "Static" else (None, None)
+        
+        if map_mode == "Interactive":
+            points = load_school_points(dataset_key, extracted_df)
+            layer_col, size_col = st.columns(2)
+            with layer_col:
+                layer_type = st.radio("Layer:", LAYER_TYPES, index=0, horizontal=True)
+            with size_col:
+                cell_size = st.slider("Cell size (m):", min_value=500, max_value=10000, value=2000, step=500,
+                                      disabled=layer_type == "Schools")
+            st.write(f"**{len(points):,} schools with valid GPS coordinates**")
+            with stage(perf_records, "map_interactive"):
+                st.pydeck_chart(school_deck(points, layer_type, cell_size))
+        elif gdf is not None:
+            shape_districts = load_shapefile_names(dataset_key, extracted_df, gdf)['District']
+            map_charts = map_specs(extracted_df, gdf, boundaries, shape_districts)
+            
+            # OVERALL SIERRA LEONE MAP FIRST
+            st.write("**Sierra Leone - All Districts Overview**")
+            
+            # Parse GPS coordinates once for all maps
+            if "GPS Location" in extracted_df.columns:
+                gps_coords = parse_gps(extracted_df["GPS Location"])
+                gps_coords["GPS Location"] = extracted_df["GPS Location"]
+                gps_coords = gps_coords[gps_coords["GPS Location"].notna()]
+            else:
+                gps_coords = pd.DataFrame(columns=["lat", "lon", "valid", "GPS Location"])
             
-            district_chiefdom_df = pd.DataFrame(district_chiefdom_analysis)
-            district_chiefdom_df = district_chiefdom_df.sort_values('Total_Enrollment', ascending=False)
+            st.write(f"**Debug: Processing {len(gps_coords)} GPS entries for overall map**")
+            all_coords_extracted = gps_coords[gps_coords["valid"]]
+            st.write(f"**Total valid coordinates for overall map: {len(all_coords_extracted)}**")
             
-            if len(district_chiefdom_df) > 0:
-                # Create individual large plots for this district's chiefdoms
-                
-                # Plot 1: Total Enrollment by Chiefdoms in this District (Blue)
-                fig1, ax1 = plt.subplots(figsize=(16, 10))
-                bars1 = ax1.barh(district_chiefdom_df['Chiefdom'], district_chiefdom_df['Total_Enrollment'], 
-                                 color='#4682B4', edgecolor='navy', linewidth=1.5)
-                ax1.set_title(f'{district} District - Total Enrollment by Chiefdom', fontsize=18, fontweight='bold', pad=20)
-                ax1.set_xlabel('Number of Students', fontsize=14, fontweight='bold')
-                ax1.set_ylabel('Chiefdoms', fontsize=14, fontweight='bold')
-                
-                # Add value labels
-                for i, v in enumerate(district_chiefdom_df['Total_Enrollment']):
-                    if v > 0:  # Only show label if value is greater than 0
-                        ax1.text(v + max(district_chiefdom_df['Total_Enrollment']) * 0.02, i, 
-                                 f'{int(v):,}', va='center', fontweight='bold', fontsize=12)
-                
-                # Customize appearance
-                ax1.grid(axis='x', alpha=0.3, linestyle='--')
-                ax1.tick_params(axis='both', which='major', labelsize=11)
-                plt.tight_layout()
-                st.pyplot(fig1)
-                
-                # Save enrollment chart
-                map_images[f'{district}_enrollment'] = save_map_as_png(fig1, f"{district}_Enrollment_by_Chiefdom")
-                
-                # Plot 2: Total ITN Distributed by Chiefdoms in this District (Green)
-                fig2, ax2 = plt.subplots(figsize=(16, 10))
-                bars2 = ax2.barh(district_chiefdom_df['Chiefdom'], district_chiefdom_df['Total_ITN'], 
-                                 color='#32CD32', edgecolor='darkgreen', linewidth=1.5)
-                ax2.set_title(f'{district} District - Total ITN Distributed by Chiefdom', fontsize=18, fontweight='bold', pad=20)
-                ax2.set_xlabel('Number of ITNs', fontsize=14, fontweight='bold')
-                ax2.set_ylabel('Chiefdoms', fontsize=14, fontweight='bold')
-                
-                # Add value labels
-                for i, v in enumerate(district_chiefdom_df['Total_ITN']):
-                    if v > 0:  # Only show label if value is greater than 0
-                        ax2.text(v + max(district_chiefdom_df['Total_ITN']) * 0.02, i, 
-                                 f'{int(v):,}', va='center', fontweight='bold', fontsize=12)
+            if len(all_coords_extracted) > 0:
+                lats, lons = all_coords_extracted["lat"], all_coords_extracted["lon"]
                 
-                # Customize appearance
-                ax2.grid(axis='x', alpha=0.3, linestyle='--')
-                ax2.tick_params(axis='both', which='major', labelsize=11)
-                plt.tight_layout()
-                st.pyplot(fig2)
-                
-                # Save ITN chart
-                map_images[f'{district}_itn'] = save_map_as_png(fig2, f"{district}_ITN_by_Chiefdom")
-                
-                # Plot 3: Coverage by Chiefdoms in this District (Orange)
-                fig3, ax3 = plt.subplots(figsize=(16, 10))
-                bars3 = ax3.barh(district_chiefdom_df['Chiefdom'], district_chiefdom_df['Coverage'], 
-                                 color='#FF8C00', edgecolor='darkorange', linewidth=1.5)
-                ax3.set_title(f'{district} District - ITN Coverage by Chiefdom (%)', fontsize=18, fontweight='bold', pad=20)
-                ax3.set_xlabel('Coverage Percentage (%)', fontsize=14, fontweight='bold')
-                ax3.set_ylabel('Chiefdoms', fontsize=14, fontweight='bold')
-                
-                # Add value labels
-                for i, v in enumerate(district_chiefdom_df['Coverage']):
-                    if v > 0:  # Only show label if value is greater than 0
-                        ax3.text(v + max(district_chiefdom_df['Coverage']) * 0.02, i, 
-                                 f'{v:.1f}%', va='center', fontweight='bold', fontsize=12)
-                
-                # Customize appearance
-                ax3.grid(axis='x', alpha=0.3, linestyle='--')
-                ax3.tick_params(axis='both', which='major', labelsize=11)
-                ax3.set_xlim(0, max(district_chiefdom_df['Coverage']) * 1.15)  # Add some space for labels
-                plt.tight_layout()
-                st.pyplot(fig3)
+                # Show coordinate range for verification
+                st.write(f"**Overall coordinate range:** Lat: {lats.min():.4f} to {lats.max():.4f}, Lon: {lons.min():.4f} to {lons.max():.4f}")
+            
+            # Every school as a point, or schools aggregated into grid cells or chiefdoms
+            overview_col, measure_col = st.columns(2)
+            with overview_col:
+                overview = st.radio("Overview:", ["Schools", "Grid cells", "Chiefdoms"], index=0, horizontal=True)
+            with measure_col:
+                overview_measure = st.selectbox("Colour by:", list(MEASURE_LABELS), format_func=MEASURE_LABELS.get,
+                                                disabled=overview == "Schools")
+            
+            # Create overall Sierra Leone map
+            with stage(perf_records, "map_overall"):
+                if overview == "Schools":
+                    show_chart(dataset_key, 'sierra_leone_overall', map_charts)
+                else:
+                    cells, chiefdom_table = load_spatial_aggregates(dataset_key, extracted_df, gdf)
+                    overview_charts = overview_specs(gdf, cells, chiefdom_table, boundaries)
+                    overview_layer = 'grid' if overview == "Grid cells" else 'chiefdom'
+                    show_chart(dataset_key, f'overview_{overview_layer}_{overview_measure}', overview_charts)
+            
+            # NOW THE INDIVIDUAL DISTRICT MAPS
+            for map_district, map_key in MAP_DISTRICTS:
+                st.divider()
                 
-                # Save coverage chart
-                map_images[f'{district}_coverage'] = save_map_as_png(fig3, f"{district}_Coverage_by_Chiefdom")
+                # District map - Full width
+                st.write(f"**{map_district} District - All Chiefdoms**")
                 
-                # Display summary table for this district
-                st.write(f"**{district} District Summary:**")
-                summary_cols = st.columns(3)
-                with summary_cols[0]:
-                    st.metric("Total Chiefdoms", len(district_chiefdom_df))
-                with summary_cols[1]:
-                    st.metric("Total Students", int(district_chiefdom_df['Total_Enrollment'].sum()))
-                with summary_cols[2]:
-                    st.metric("Total ITNs", int(district_chiefdom_df['Total_ITN'].sum()))
+                # Filter shapefile for this district
+                district_gdf = gdf[gdf['FIRST_DNAM'] == map_district]
                 
-                st.divider()
-            else:
-                st.warning(f"No chiefdom data available for {district} district")
+                if len(district_gdf) > 0:
+                    # GPS entries for schools in this district
+                    district_gps = gps_coords[shape_districts.loc[gps_coords.index] == map_district]
+                    
+                    if len(district_gps) > 0:
+                        st.write(f"**Debug: Found {len(district_gps)} GPS entries for {map_district} District**")
+                        
+                        for idx, (_, gps_row) in enumerate(district_gps.iterrows()):
+                            gps_str = str(gps_row["GPS Location"]).strip()
+                            st.write(f"GPS {idx+1}: {gps_str}")
+                            
+                            # Handle the specific format: 8.6103181,-12.2029534
+                            if ',' in gps_str:
+                                if gps_row["valid"]:
+                                    st.write(f"✅ Valid coordinates: {gps_row['lat']}, {gps_row['lon']}")
+                                elif pd.notna(gps_row["lat"]) and pd.notna(gps_row["lon"]):
+                                    st.write(f"❌ Invalid coordinates (outside Sierra Leone): {gps_row['lat']}, {gps_row['lon']}")
+                                else:
+                                    st.write(f"❌ Could not parse coordinates: {gps_str}")
+                        
+                        st.write(f"**Total valid coordinates extracted: {int(district_gps['valid'].sum())}**")
+                    
+                    coords_extracted = district_gps[district_gps["valid"]]
+                    if len(coords_extracted) > 0:
+                        lats, lons = coords_extracted["lat"], coords_extracted["lon"]
+                        
+                        # Show coordinate range for verification
+                        st.write(f"**Coordinate range:** Lat: {lats.min():.4f} to {lats.max():.4f}, Lon: {lons.min():.4f} to {lons.max():.4f}")
+                    
+                    # Create the district plot
+                    with stage(perf_records, f"map_{map_district}"):
+                        show_chart(dataset_key, map_key, map_charts)
+                    
+                    # Display chiefdoms list
+                    if 'FIRST_CHIE' in district_gdf.columns:
+                        chiefdoms = district_gdf['FIRST_CHIE'].dropna().tolist()
+                        st.write(f"**Chiefdoms in {map_district} District ({len(chiefdoms)}):**")
+                        chiefdom_cols = st.columns(3)
+                        for i, chiefdom in enumerate(chiefdoms):
+                            with chiefdom_cols[i % 3]:
+                                st.write(f"• {chiefdom}")
+                else:
+                    st.warning(f"No chiefdoms found for {map_district} district in shapefile")
         else:
-            st.warning(f"No chiefdoms found for {district} district")
-    
-    # Summary buttons section
-    st.subheader("📊 Summary Reports")
-    
-    # Create two columns for the summary buttons
-    col1, col2 = st.columns(2)
+            st.error("Shapefile not loaded. Cannot display map.")
     
-    # Button for District Summary
-    with col1:
-        district_summary_button = st.button("Show District Summary")
-    
-    # Button for Chiefdom Summary
-    with col2:
-        chiefdom_summary_button = st.button("Show Chiefdom Summary")
-    
-    # Display District Summary when button is clicked
-    if district_summary_button:
-        st.subheader("📈 Summary by District")
-        
-        # Create aggregation dictionary
-        agg_dict = {}
-        
-        # Add enrollment columns to aggregation
-        for class_num in range(1, 6):
-            total_col = f"How many pupils are enrolled in Class {class_num}?"
-            boys_col = f"How many boys in Class {class_num} received ITNs?"
-            girls_col = f"How many girls in Class {class_num} received ITNs?"
-            
-            if total_col in extracted_df.columns:
-                agg_dict[total_col] = "sum"
-            if boys_col in extracted_df.columns:
-                agg_dict[boys_col] = "sum"
-            if girls_col in extracted_df.columns:
-                agg_dict[girls_col] = "sum"
-        
-        # Group by District and aggregate
-        district_summary = extracted_df.groupby("District").agg(agg_dict).reset_index()
-        
-        # Calculate total enrollment
-        district_summary["Total Enrollment"] = 0
-        for class_num in range(1, 6):
-            total_col = f"How many pupils are enrolled in Class {class_num}?"
-            if total_col in district_summary.columns:
-                district_summary["Total Enrollment"] += district_summary[total_col]
+    elif section == "📊 Overview":
+        # Display Original Data Sample
+        st.subheader("📄 Original Data Sample")
+        st.dataframe(original_sample)
         
-        # Display summary table
-        st.dataframe(district_summary)
+        # Display Extracted Data
+        st.subheader("📋 Extracted Data")
+        paged_table("extracted", extracted_df, lambda: load_search_index(dataset_key, extracted_df))
         
-        # Download button for district summary
-        district_csv = district_summary.to_csv(index=False)
+        # Add download button for CSV
+        csv = extracted_df.to_csv(index=False)
         st.download_button(
-            label="📥 Download District Summary as CSV",
-            data=district_csv,
-            file_name="district_summary.csv",
+            label="📥 Download Extracted Data as CSV",
+            data=csv,
+            file_name="extracted_school_data.csv",
             mime="text/csv"
         )
         
-        # Create a bar chart for district summary
-        fig, ax = plt.subplots(figsize=(12, 8))
-        district_summary.plot(kind="bar", x="District", y="Total Enrollment", ax=ax, color="blue")
-        ax.set_title("📊 Total Enrollment by District")
-        ax.set_xlabel("")
-        ax.set_ylabel("Number of Students")
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-        st.pyplot(fig)
-    
-    # Display Chiefdom Summary when button is clicked
-    if chiefdom_summary_button:
-        st.subheader("📈 Summary by Chiefdom")
-        
-        # Create aggregation dictionary
-        agg_dict = {}
-        
-        # Add enrollment columns to aggregation
-        for class_num in range(1, 6):
-            total_col = f"How many pupils are enrolled in Class {class_num}?"
-            boys_col = f"How many boys in Class {class_num} received ITNs?"
-            girls_col = f"How many girls in Class {class_num} received ITNs?"
-            
-            if total_col in extracted_df.columns:
-                agg_dict[total_col] = "sum"
-            if boys_col in extracted_df.columns:
-                agg_dict[boys_col] = "sum"
-            if girls_col in extracted_df.columns:
-                agg_dict[girls_col] = "sum"
-        
-        # Group by District and Chiefdom and aggregate
-        chiefdom_summary = extracted_df.groupby(["District", "Chiefdom"]).agg(agg_dict).reset_index()
-        
-        # Calculate total enrollment
-        chiefdom_summary["Total Enrollment"] = 0
-        for class_num in range(1, 6):
-            total_col = f"How many pupils are enrolled in Class {class_num}?"
-            if total_col in chiefdom_summary.columns:
-                chiefdom_summary["Total Enrollment"] += chiefdom_summary[total_col]
-        
-        # Display summary table
-        st.dataframe(chiefdom_summary)
-        
-        # Download button for chiefdom summary
-        chiefdom_csv = chiefdom_summary.to_csv(index=False)
-        st.download_button(
-            label="📥 Download Chiefdom Summary as CSV",
-            data=chiefdom_csv,
-            file_name="chiefdom_summary.csv",
-            mime="text/csv"
-        )
-        
-        # Create a temporary label for the chart
-        chiefdom_summary['Label'] = chiefdom_summary['District'] + '\n' + chiefdom_summary['Chiefdom']
-        
-        # Create a bar chart for chiefdom summary
-        fig, ax = plt.subplots(figsize=(14, 10))
-        chiefdom_summary.plot(kind="barh", x="Label", y="Total Enrollment", ax=ax, color="blue")
-        ax.set_title("📊 Total Enrollment by District and Chiefdom")
-        ax.set_ylabel("")
-        ax.set_xlabel("Number of Students")
-        plt.tight_layout()
-        st.pyplot(fig)
-    
-    # Visualization and filtering section - CALCULATE FROM RAW DATA
-    st.subheader("🔍 Detailed Data Filtering and Visualization")
-    
-    # Check if data is available after filtering
-    if not filtered_df.empty:
-        st.write(f"### Filtered Data - {len(filtered_df)} records")
-        st.dataframe(filtered_df)
-        
-        # Download button for filtered data
-        filtered_csv = filtered_df.to_csv(index=False)
-        st.download_button(
-            label="📥 Download Filtered Data as CSV",
-            data=filtered_csv,
-            file_name="filtered_data.csv",
-            mime="text/csv"
-        )
-        
-        # Define the hierarchy levels to include in the summary
-        group_columns = hierarchy[grouping_selection]
-        
-        # Calculate enrollment from RAW DATA - Manual calculation
-        st.write("**Calculating enrollment from raw data...**")
+        # Schools submitted more than once
+        if duplicate_count > 0:
+            st.subheader("🔁 Duplicate Submissions")
+            schools_df = load_canonical_schools(submitted_key, submitted_df, school_ids)
+            repeated_schools = int((schools_df['submissions'] > 1).sum())
+            st.write(f"**{repeated_schools:,} schools were submitted more than once ({duplicate_count:,} extra submissions)**")
+            st.dataframe(schools_df[schools_df['submissions'] > 1])
+            st.download_button(
+                label="📥 Download School List as CSV",
+                data=schools_df.to_csv(index=False),
+                file_name="canonical_schools.csv",
+                mime="text/csv"
+            )
         
-        # Get unique groups
-        if len(group_columns) == 1:
-            unique_groups = filtered_df[group_columns[0]].dropna().unique()
+        # Display Overall Summary
+        st.subheader("📊 Overall Summary")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Total Schools", f"{summaries['overall']['total_schools']:,}")
+        with col2:
+            st.metric("Total Students in current school register (2025)", f"{summaries['overall']['total_enrollment']:,}")
+        with col3:
+            st.metric("Total ITNs given to pupils present at the time of distribution", f"{summaries['overall']['total_itn']:,}")
+        with col4:
+            st.metric("Coverage", f"{summaries['overall']['coverage']:.1f}%")
+        
+        col5, col6, col7, col8 = st.columns(4)
+        with col5:
+            st.metric("Districts", f"{summaries['overall']['total_districts']}")
+        with col6:
+            st.metric("Chiefdoms", f"{summaries['overall']['total_chiefdoms']}")
+        with col7:
+            st.metric("Boys", f"{summaries['overall']['total_boys']:,}")
+        with col8:
+            st.metric("Girls", f"{summaries['overall']['total_girls']:,}")
+        
+        summary_charts = summary_specs(summaries, district_df)
+        
+        # Gender Analysis
+        st.subheader("👫 Gender Analysis")
+        
+        with stage(perf_records, "gender_charts"):
+            # Overall gender distribution pie chart and gender ratio by district chart
+            show_chart(dataset_key, 'gender_overall', summary_charts)
+            show_chart(dataset_key, 'gender_district', summary_charts)
+        
+        # Enrollment and ITN Distribution Analysis
+        st.subheader("📊 Enrollment and ITN Distribution Analysis")
+        
+        with stage(perf_records, "distribution_charts"):
+            # Create enhanced bar chart with enrollment, distributed, and remaining
+            show_chart(dataset_key, 'enhanced_enrollment_analysis', summary_charts)
+            
+            # Create overall pie chart for enrollment vs distributed vs remaining
+            st.subheader("📊 Overall Distribution Overview (Pie Chart)")
+            show_chart(dataset_key, 'overall_distribution_pie', summary_charts)
+            
+            # District-level pie charts
+            st.subheader("📊 District-Level Distribution (Pie Charts)")
+            
+            # Enrollment pie chart
+            if not show_chart(dataset_key, 'enrollment_pie', summary_charts):
+                st.warning("No enrollment data available for pie chart")
+            
+            # ITN distribution pie chart
+            if not show_chart(dataset_key, 'itn_pie', summary_charts):
+                st.warning("No ITN distribution data available for pie chart")
+        
+        # Display Summary Tables
+        st.subheader("📈 District Summary Table")
+        district_summary_df = pd.DataFrame(summaries['district'])
+        st.dataframe(district_summary_df)
+        
+        st.subheader("📈 Chiefdom Summary Table")
+        chiefdom_summary_df = pd.DataFrame(summaries['chiefdom'])
+        paged_table("chiefdom_summary", chiefdom_summary_df)
+
+### Part 3----------------------------------------------------------------------------------------------------------------
+
+    elif section == "🏘️ Chiefdoms":
+        # Chiefdom coverage choropleth, nationally or for one district
+        st.subheader("🗺️ ITN Coverage by Chiefdom")
+        
+        gdf, boundaries = shapefile_layers()
+        if gdf is not None:
+            joined_gdf = load_chiefdom_choropleth(dataset_key, extracted_df, gdf)
+            matched = int((joined_gdf['schools'] > 0).sum())
+            st.write(f"**{matched} of {len(joined_gdf)} shapefile chiefdoms matched to the submitted data**")
+            
+            choropleth_area = st.selectbox(
+                "Coverage map for:",
+                ["All districts"] + sorted(joined_gdf['FIRST_DNAM'].dropna().unique())
+            )
+            choropleth_charts = choropleth_specs(joined_gdf, 'coverage', boundaries)
+            with stage(perf_records, "choropleth"):
+                if choropleth_area == "All districts":
+                    show_chart(dataset_key, 'choropleth_coverage', choropleth_charts)
+                else:
+                    show_chart(dataset_key, f'choropleth_coverage_{choropleth_area}', choropleth_charts)
         else:
-            unique_groups = filtered_df[group_columns].dropna().drop_duplicates()
+            st.error("Shapefile not loaded. Cannot display map.")
         
-        # Manual calculation for each group
-        summary_data = []
+        # Chiefdoms Analysis by District
+        st.subheader("📊 Chiefdoms Analysis by District")
         
-        if len(group_columns) == 1:
-            # Single column grouping
-            for group_value in unique_groups:
-                group_data = filtered_df[filtered_df[group_columns[0]] == group_value]
-                
-                # Calculate enrollment from raw data
-                total_enrollment = 0
-                total_itns = 0
-                
-                for class_num in range(1, 6):
-                    # Enrollment columns
-                    enrollment_col = f"How many pupils are enrolled in Class {class_num}?"
-                    if enrollment_col in group_data.columns:
-                        total_enrollment += int(group_data[enrollment_col].fillna(0).sum())
-                    
-                    # ITN columns
-                    boys_col = f"How many boys in Class {class_num} received ITNs?"
-                    girls_col = f"How many girls in Class {class_num} received ITNs?"
-                    if boys_col in group_data.columns:
-                        total_itns += int(group_data[boys_col].fillna(0).sum())
-                    if girls_col in group_data.columns:
-                        total_itns += int(group_data[girls_col].fillna(0).sum())
-                
-                summary_data.append({
-                    group_columns[0]: group_value,
-                    'Total Enrollment': total_enrollment,
-                    'Total ITNs': total_itns,
-                    'Group': str(group_value)
-                })
+        # Get all unique districts that have chiefdom data
+        districts_with_chiefdoms = extracted_df[extracted_df['Chiefdom'].notna()]['District'].unique()
         
-        else:
-            # Multiple column grouping
-            for _, group_row in unique_groups.iterrows():
-                # Filter for this specific group
-                filter_condition = True
-                for col in group_columns:
-                    filter_condition = filter_condition & (filtered_df[col] == group_row[col])
-                
-                group_data = filtered_df[filter_condition]
+        with stage(perf_records, "chiefdom_charts"):
+            for district in districts_with_chiefdoms:
+                st.write(f"### {district} District - Chiefdoms Analysis")
                 
-                # Calculate enrollment from raw data
-                total_enrollment = 0
-                total_itns = 0
+                # Filter data for this district
+                district_data = extracted_df[extracted_df['District'] == district]
+                district_chiefdoms = district_data['Chiefdom'].dropna().unique()
                 
-                for class_num in range(1, 6):
-                    # Enrollment columns
-                    enrollment_col = f"How many pupils are enrolled in Class {class_num}?"
-                    if enrollment_col in group_data.columns:
-                        total_enrollment += int(group_data[enrollment_col].fillna(0).sum())
+                if len(district_chiefdoms) > 0:
+                    # Calculate by chiefdom for this district
+                    district_chiefdom_df = chiefdom_analysis(district_data)
                     
-                    # ITN columns
-                    boys_col = f"How many boys in Class {class_num} received ITNs?"
-                    girls_col = f"How many girls in Class {class_num} received ITNs?"
-                    if boys_col in group_data.columns:
-                        total_itns += int(group_data[boys_col].fillna(0).sum())
-                    if girls_col in group_data.columns:
-                        total_itns += int(group_data[girls_col].fillna(0).sum())
-                
-                # Create summary row
-                summary_row = {}
-                for col in group_columns:
-                    summary_row[col] = group_row[col]
-                summary_row['Total Enrollment'] = total_enrollment
-                summary_row['Total ITNs'] = total_itns
-                summary_row['Group'] = ' - '.join([str(group_row[col]) for col in group_columns])
-                
-                summary_data.append(summary_row)
-        
-        # Convert to DataFrame
-        grouped_data = pd.DataFrame(summary_data)
+                    if len(district_chiefdom_df) > 0:
+                        # Create individual large plots for this district's chiefdoms:
+                        # enrollment (blue), ITN distributed (green) and coverage (orange)
+                        district_charts = chiefdom_specs(district, district_chiefdom_df)
+                        for chart_key in district_charts:
+                            show_chart(dataset_key, chart_key, district_charts)
+                        
+                        # Display summary table for this district
+                        st.write(f"**{district} District Summary:**")
+                        summary_cols = st.columns(3)
+                        with summary_cols[0]:
+                            st.metric("Total Chiefdoms", len(district_chiefdom_df))
+                        with summary_cols[1]:
+                            st.metric("Total Students", int(district_chiefdom_df['Total_Enrollment'].sum()))
+                        with summary_cols[2]:
+                            st.metric("Total ITNs", int(district_chiefdom_df['Total_ITN'].sum()))
+                        
+                        st.divider()
+                    else:
+                        st.warning(f"No chiefdom data available for {district} district")
+                else:
+                    st.warning(f"No chiefdoms found for {district} district")
+    
+    elif section == "📈 Summary Reports":
+        # Summary buttons section
+        st.subheader("📊 Summary Reports")
         
-        # Summary Table
-        st.subheader("📊 Detailed Summary Table")
+        # Create two columns for the summary buttons
+        col1, col2 = st.columns(2)
         
-        # Display key metrics
-        col1, col2, col3 = st.columns(3)
+        # Button for District Summary
         with col1:
-            total_enrollment = int(grouped_data['Total Enrollment'].sum())
-            st.metric("Total Enrollment", f"{total_enrollment:,}")
-        with col2:
-            total_itns = int(grouped_data['Total ITNs'].sum())
-            st.metric("Total ITNs", f"{total_itns:,}")
-        with col3:
-            coverage = (total_itns / total_enrollment * 100) if total_enrollment > 0 else 0
-            st.metric("Coverage", f"{coverage:.1f}%")
+            district_summary_button = st.button("Show District Summary")
         
-        # Display the summary table
-        display_columns = group_columns + ["Total Enrollment", "Total ITNs"]
-        st.dataframe(grouped_data[display_columns])
+        # Button for Chiefdom Summary
+        with col2:
+            chiefdom_summary_button = st.button("Show Chiefdom Summary")
         
-        # Create a bar chart ONLY if we have enrollment data
-        if total_enrollment > 0:
-            fig, ax = plt.subplots(figsize=(12, 8))
+        # Display District Summary when button is clicked
+        if district_summary_button:
+            st.subheader("📈 Summary by District")
             
-            # Sort by Total Enrollment for better visualization
-            grouped_data_sorted = grouped_data.sort_values("Total Enrollment", ascending=True)
+            # Create aggregation dictionary
+            agg_dict = {col: "sum" for col in schema['class_columns']}
             
-            bars = ax.barh(grouped_data_sorted['Group'], grouped_data_sorted["Total Enrollment"], 
-                          color="#47B5FF", edgecolor='navy', linewidth=1.5)
-            ax.set_title(f"Total Enrollment by {grouping_selection}", fontsize=16, fontweight='bold')
-            ax.set_xlabel("Number of Students", fontsize=12, fontweight='bold')
-            ax.set_ylabel(grouping_selection, fontsize=12, fontweight='bold')
+            # Group by District and aggregate
+            district_summary = extracted_df.groupby("District").agg(agg_dict).reset_index()
             
-            # Add value labels on bars
-            max_val = grouped_data_sorted["Total Enrollment"].max()
-            for i, v in enumerate(grouped_data_sorted["Total Enrollment"]):
-                if v > 0:
-                    ax.text(v + max_val * 0.01, i, 
-                           f'{int(v):,}', va='center', fontweight='bold', fontsize=10)
+            # Calculate total enrollment
+            district_summary["Total Enrollment"] = district_summary[schema['enrollment']].sum(axis=1)
             
-            ax.grid(axis='x', alpha=0.3, linestyle='--')
-            plt.tight_layout()
-            st.pyplot(fig)
+            # Display summary table
+            st.dataframe(district_summary)
             
-            st.success(f"✅ Chart generated with {total_enrollment:,} total students across {len(grouped_data)} groups")
-        else:
-            st.warning(f"No enrollment data calculated for the selected {grouping_selection} filters.")
-            st.write("**Debug:** Check if enrollment columns exist in your data")
+            # Download button for district summary
+            district_csv = district_summary.to_csv(index=False)
+            st.download_button(
+                label="📥 Download District Summary as CSV",
+                data=district_csv,
+                file_name="district_summary.csv",
+                mime="text/csv"
+            )
             
-        # Show calculation details
-        st.write("**Calculation Details:**")
-        for _, row in grouped_data.iterrows():
-            st.write(f"- {row['Group']}: {int(row['Total Enrollment']):,} students, {int(row['Total ITNs']):,} ITNs")
-
-    else:
-        st.warning("No data available for the selected filters.")
-
-    # Final Data Export Section
-    st.subheader("📥 Export Complete Dataset")
-    st.write("Download the complete extracted dataset in your preferred format:")
-
-    # Create download buttons in columns
-    download_col1, download_col2, download_col3 = st.columns(3)
-
-    with download_col1:
-        # CSV Download
-        csv_data = extracted_df.to_csv(index=False)
-        st.download_button(
-            label="📄 Download Complete Data as CSV",
-            data=csv_data,
-            file_name="complete_extracted_data.csv",
-            mime="text/csv",
-            help="Download all extracted data in CSV format"
-        )
-
-    with download_col2:
-        # Excel Download
-        excel_buffer = BytesIO()
-        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-            extracted_df.to_excel(writer, sheet_name='Extracted Data', index=False)
-        excel_data = excel_buffer.getvalue()
+            # Create a bar chart for district summary
+            fig, ax = new_figure((12, 8))
+            district_summary.plot(kind="bar", x="District", y="Total Enrollment", ax=ax, color="blue")
+            ax.set_title("📊 Total Enrollment by District")
+            ax.set_xlabel("")
+            ax.set_ylabel("Number of Students")
+            for label in ax.get_xticklabels():
+                label.set(rotation=45, ha='right')
+            fig.tight_layout()
+            st.pyplot(fig)
         
-        st.download_button(
-            label="📊 Download Complete Data as Excel",
-            data=excel_data,
-            file_name="complete_extracted_data.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            help="Download all extracted data in Excel format"
-        )
-
-    with download_col3:
-        # Word Report Download
-        if st.button("📋 Generate Comprehensive Word Report", help="Generate and download comprehensive report with all maps and summaries in Word format"):
-            # Generate Word report content
-            from docx import Document
-            from docx.shared import Inches, Pt
-            from docx.enum.text import WD_ALIGN_PARAGRAPH
-            from docx.enum.table import WD_TABLE_ALIGNMENT
-            from datetime import datetime
-            
-            doc = Document()
-            
-            # Add logos to header (if available)
-            try:
-                # Create header section with logos
-                header_para = doc.add_paragraph()
-                header_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                
-                # Try to add logos
-                try:
-                    logo_run1 = header_para.add_run()
-                    logo_run1.add_picture("NMCP.png", width=Inches(1.5))
-                    header_para.add_run("    ")  # Space between logos
-                except:
-                    header_para.add_run("NMCP    ")
-                
-                try:
-                    logo_run2 = header_para.add_run()
-                    logo_run2.add_picture("icf_sl.png", width=Inches(1.5))
-                    header_para.add_run("    ")  # Space between logos
-                except:
-                    header_para.add_run("ICF Sierra Leone    ")
-                
-                header_para.add_run("Partner Logo")
-                
-                doc.add_paragraph()  # Add space after logos
-            except:
-                # If logos fail, add text headers
-                header_para = doc.add_paragraph()
-                header_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                header_run = header_para.add_run("NMCP | ICF Sierra Leone | Partner Organization")
-                header_run.font.size = Pt(12)
-                header_run.bold = True
-            
-            # Add title page
-            title = doc.add_heading('School-Based Distribution (SBD)', 0)
-            title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            
-            subtitle = doc.add_heading('Comprehensive Analysis Report with Maps and Summaries', level=1)
-            subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            
-            # Add date and time
-            current_datetime = datetime.now()
-            date_para = doc.add_paragraph()
-            date_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            date_run = date_para.add_run(f"Generated on: {current_datetime.strftime('%B %d, %Y at %I:%M %p')}")
-            date_run.font.size = Pt(12)
-            date_run.bold = True
-            
-            # Add page break
-            doc.add_page_break()
-            
-            # Add executive summary
-            doc.add_heading('Executive Summary', level=1)
-            
-            summary_text = f"""
-            This comprehensive report presents the analysis of School-Based Distribution (SBD) data collected across Sierra Leone, 
-            covering {summaries['overall']['total_districts']} districts and {summaries['overall']['total_chiefdoms']} chiefdoms with a total of {summaries['overall']['total_schools']} school records.
-            
-            KEY FINDINGS:
-            • Total Schools Surveyed: {summaries['overall']['total_schools']:,}
-            • Districts Covered: {summaries['overall']['total_districts']}
-            • Chiefdoms Covered: {summaries['overall']['total_chiefdoms']}
-            • Total Student Enrollment: {summaries['overall']['total_enrollment']:,}
-            • Total Boys: {summaries['overall']['total_boys']:,}
-            • Total Girls: {summaries['overall']['total_girls']:,}
-            • Total ITNs Distributed: {summaries['overall']['total_itn']:,}
-            • Overall Coverage Rate: {summaries['overall']['coverage']:.1f}%
-            
-            This report provides detailed analysis of enrollment patterns, gender distribution, ITN distribution effectiveness, 
-            and geographic coverage across administrative boundaries with comprehensive maps and visualizations.
-            """
-            doc.add_paragraph(summary_text)
+        # Display Chiefdom Summary when button is clicked
+        if chiefdom_summary_button:
+            st.subheader("📈 Summary by Chiefdom")
             
-            # Add geographic maps section
-            doc.add_heading('Geographic Distribution Maps', level=1)
+            # Create aggregation dictionary
+            agg_dict = {col: "sum" for col in schema['class_columns']}
             
-            # Add Overall Sierra Leone map FIRST
-            if 'sierra_leone_overall' in map_images:
-                doc.add_heading('Sierra Leone - Overall Distribution', level=2)
-                doc.add_paragraph("Overview of school distribution across all districts in Sierra Leone:")
-                chart_para = doc.add_paragraph()
-                chart_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                chart_run = chart_para.add_run()
-                map_images['sierra_leone_overall'].seek(0)
-                chart_run.add_picture(map_images['sierra_leone_overall'], width=Inches(6.5))
-                doc.add_paragraph()  # Add spacing
+            # Group by District and Chiefdom and aggregate
+            chiefdom_summary = extracted_df.groupby(["District", "Chiefdom"]).agg(agg_dict).reset_index()
             
-            # Add BO District map
-            if 'bo_district' in map_images:
-                doc.add_heading('BO District Map', level=2)
-                doc.add_paragraph("Geographic distribution of schools and chiefdoms in BO District:")
-                chart_para = doc.add_paragraph()
-                chart_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                chart_run = chart_para.add_run()
-                map_images['bo_district'].seek(0)
-                chart_run.add_picture(map_images['bo_district'], width=Inches(6))
-                doc.add_paragraph()  # Add spacing after BO map
+            # Calculate total enrollment
+            chiefdom_summary["Total Enrollment"] = chiefdom_summary[schema['enrollment']].sum(axis=1)
             
-            # Add BOMBALI District map
-            if 'bombali_district' in map_images:
-                doc.add_heading('BOMBALI District Map', level=2)
-                doc.add_paragraph("Geographic distribution of schools and chiefdoms in BOMBALI District:")
-                chart_para = doc.add_paragraph()
-                chart_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                chart_run = chart_para.add_run()
-                map_images['bombali_district'].seek(0)
-                chart_run.add_picture(map_images['bombali_district'], width=Inches(6))
-                doc.add_paragraph()  # Add spacing after BOMBALI map
+            # Display summary table
+            st.dataframe(chiefdom_summary)
             
-            # Add page break before charts
-            doc.add_page_break()
-            
-            # Add overall summary charts
-            doc.add_heading('Overall Analysis Charts', level=1)
-            
-            # Add enhanced enrollment analysis chart
-            if 'enhanced_enrollment_analysis' in map_images:
-                doc.add_heading('Enhanced Enrollment vs ITN Distribution Analysis', level=2)
-                doc.add_paragraph("Comprehensive analysis showing total enrollment, ITNs distributed (boys + girls), and remaining ITNs needed across districts:")
-                chart_para = doc.add_paragraph()
-                chart_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                chart_run = chart_para.add_run()
-                map_images['enhanced_enrollment_analysis'].seek(0)
-                chart_run.add_picture(map_images['enhanced_enrollment_analysis'], width=Inches(6.5))
-                doc.add_paragraph()  # Add spacing
-            
-            # Add overall distribution pie chart
-            if 'overall_distribution_pie' in map_images:
-                doc.add_heading('Overall ITN Distribution Status', level=2)
-                doc.add_paragraph("Overall distribution status showing the proportion of students who have received ITNs versus those still waiting:")
-                chart_para = doc.add_paragraph()
-                chart_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                chart_run = chart_para.add_run()
-                map_images['overall_distribution_pie'].seek(0)
-                chart_run.add_picture(map_images['overall_distribution_pie'], width=Inches(5.5))
-                doc.add_paragraph()  # Add spacing
-            
-            # Close matplotlib figures to free memory
-            plt.close('all')
+            # Download button for chiefdom summary
+            chiefdom_csv = chiefdom_summary.to_csv(index=False)
+            st.download_button(
+                label="📥 Download Chiefdom Summary as CSV",
+                data=chiefdom_csv,
+                file_name="chiefdom_summary.csv",
+                mime="text/csv"
+            )
             
-            # Save to BytesIO
-            word_buffer = BytesIO()
-            doc.save(word_buffer)
-            word_data = word_buffer.getvalue()
+            # Create a temporary label for the chart
+            chiefdom_summary['Label'] = chiefdom_summary['District'] + '\n' + chiefdom_summary['Chiefdom']
             
-            # Success message
-            st.success("✅ Comprehensive Word report generated successfully with all maps and summaries!")
+            # Create a bar chart for chiefdom summary
+            fig, ax = new_figure((14, 10))
+            chiefdom_summary.plot(kind="barh", x="Label", y="Total Enrollment", ax=ax, color="blue")
+            ax.set_title("📊 Total Enrollment by District and Chiefdom")
+            ax.set_ylabel("")
+            ax.set_xlabel("Number of Students")
+            fig.tight_layout()
+            st.pyplot(fig)
+    
+    elif section == "🔍 Detailed Filtering":
+        detailed_filtering(extracted_df, lambda: load_search_index(dataset_key, extracted_df))
+    
+    elif section == "📥 Export":
+        # Final Data Export Section
+        st.subheader("📥 Export Complete Dataset")
+        st.write("Download the complete extracted dataset in your preferred format:")
+        
+        # Create download buttons in columns
+        download_col1, download_col2, download_col3 = st.columns(3)
+        
+        with stage(perf_records, "exports"):
+            with download_col1:
+                # CSV Download
+                csv_data = extracted_df.to_csv(index=False)
+                st.download_button(
+                    label="📄 Download Complete Data as CSV",
+                    data=csv_data,
+                    file_name="complete_extracted_data.csv",
+                    mime="text/csv",
+                    help="Download all extracted data in CSV format"
+                )
             
-            st.download_button(
-                label="💾 Download Complete Report with All Maps & Summaries",
-                data=word_data,
-                file_name=f"SBD_Complete_Report_Maps_Summaries_{current_datetime.strftime('%Y%m%d_%H%M')}.docx",
-                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                help="Download comprehensive report with maps, district/chiefdom/gender summaries, charts, and analysis in Word format"
-            )
-
+            with download_col2:
+                # Excel Download
+                excel_data = excel_bytes(extracted_df)
+                
+                st.download_button(
+                    label="📊 Download Complete Data as Excel",
+                    data=excel_data,
+                    file_name="complete_extracted_data.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    help="Download all extracted data in Excel format"
+                )
+        
+        with download_col3:
+            # Word Report Download
+            if st.button("📋 Generate Comprehensive Word Report", help="Generate and download comprehensive report with all maps and summaries in Word format"):
+                # Generate Word report content
+                from datetime import datetime
+                
+                current_datetime = datetime.now()
+                gdf, boundaries = shapefile_layers()
+                with stage(perf_records, "word_report"):
+                    # Charts of sections that were never opened are rendered now
+                    shape_districts = load_shapefile_names(dataset_key, extracted_df, gdf)['District'] if gdf is not None else None
+                    report_charts = chart_specs(extracted_df, summaries, district_df, gdf, boundaries, shape_districts)
+                    folder = dataset_folder(dataset_key)
+                    map_images = {key: BytesIO(render_chart(dataset_key, folder, key, filename_prefix, build))
+                                  for key, (filename_prefix, build) in report_charts.items()}
+                    # Only files whose queued writes have landed are listed
+                    wait_for_artifacts()
+                    map_files = [artifact_path(dataset_key, filename_prefix) for filename_prefix, _ in report_charts.values()]
+                    map_files = [map_file for map_file in map_files if os.path.exists(map_file)]
+                    word_data = build_word_report(summaries, map_images, current_datetime)
+                
+                # Success message
+                st.success("✅ Comprehensive Word report generated successfully with all maps and summaries!")
+                
+                st.download_button(
+                    label="💾 Download Complete Report with All Maps & Summaries",
+                    data=word_data,
+                    file_name=f"SBD_Complete_Report_Maps_Summaries_{current_datetime.strftime('%Y%m%d_%H%M')}.docx",
+                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                    help="Download comprehensive report with maps, district/chiefdom/gender summaries, charts, and analysis in Word format"
+                )
+                
+                # Display map files saved notification
+                st.success(f"✅ **Maps Saved**: {len(map_files)} visualization maps have been saved as PNG files")
+                
+                # Show list of saved maps
+                with st.expander("📁 View Saved Map Files"):
+                    for map_file in map_files:
+                        st.write(f"• {map_file}")
+    
     # Display final summary
     st.info(f"📋 **Dataset Summary**: {len(extracted_df)} total records processed with comprehensive district, chiefdom, and gender analysis")
-    
-    # Display map files saved notification
-    if map_images:
-        st.success(f"✅ **Maps Saved**: {len(map_images)} visualization maps have been saved as PNG files")
-        
-        # Show list of saved maps
-        with st.expander("📁 View Saved Map Files"):
-            for map_name in map_images.keys():
-                st.write(f"• {map_name}.png")
+
+    # Record where this rerun spent its time
+    append_log(perf_records, workbook=uploaded_file, rows=len(extracted_df), section=section)
+    if show_performance:
+        with st.expander("⏱️ Performance", expanded=True):
+            perf_df = performance_table(perf_records)
+            st.write(f"**Instrumented sections: {perf_df['wall_s'].sum():.2f}s wall, {perf_df['cpu_s'].sum():.2f}s CPU**")
+            st.dataframe(perf_df)
+            st.caption("peak_rss_mb is the server process's peak memory since it started, not the stage's own use; "
+                       "traced_peak_mb is the stage's allocation peak.")
+
+# Warm the caches of the sections this visitor has not opened yet
+warm_up_default_workbook()
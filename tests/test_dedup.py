@@ -0,0 +1,22 @@
+import pandas as pd
+
+from sbd.dedup import find_duplicates
+
+
+def numbered_schools(gps):
+    return pd.DataFrame({
+        'District': 'Bo', 'Chiefdom': 'Kakua', 'Community Name': 'Town',
+        'School Name': ["RC Primary School 1", "RC Primary School 2", "RC Primary School II", "RC Primary School 1 "],
+        'GPS Location': gps,
+    })
+
+
+def test_colocated_numbered_schools_stay_apart():
+    # All four on one compound, a few metres apart
+    df = numbered_schools(["7.9640, -11.7380", "7.9641, -11.7380", "7.9640, -11.7381", "7.9641, -11.7381"])
+    assert find_duplicates(df).tolist() == [0, 1, 2, 0]
+
+
+def test_numbered_schools_with_and_without_gps_stay_apart():
+    df = numbered_schools(["7.9640, -11.7380", None, "7.9640, -11.7381", None])
+    assert find_duplicates(df).tolist() == [0, 1, 2, 0]